@@ -37,7 +37,68 @@ TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 TIMEOUT_SECONDS = int(os.getenv("TIMEOUT_SECONDS", "30"))
 
+# Retry policy: exponential backoff with full jitter, capped
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "8"))
+# Retries allowed per window: ratio of requests + a per-second floor
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("RETRY_BUDGET_MIN_PER_SECOND", "1"))
+RETRY_BUDGET_WINDOW_SECONDS = float(os.getenv("RETRY_BUDGET_WINDOW_SECONDS", "10"))
+# Circuit breaker (per provider)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Client-side rate limiting, per provider (0 = no limit). Match your plan's quotas.
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0"))
+# Completion tokens reserved per call before the real usage is known
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "600"))
+# Token accounting (services/tokens.py): tiktoken encoding used when the
+# package is installed ("estimate" = always use the local estimate)
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base").strip()
+# Refuse prompts over their template's budget and size max_tokens per template
+ENABLE_TOKEN_BUDGETS = _bool_env("ENABLE_TOKEN_BUDGETS", True)
+# Context window of the smallest model in use (prompt + completion)
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "8192"))
+# Override prompt limits per template, e.g. "recipe_extraction:4000,meal_suggestion:1200"
+PROMPT_TOKEN_BUDGETS = os.getenv("PROMPT_TOKEN_BUDGETS", "")
+RATE_LIMIT_MAX_QUEUE = int(os.getenv("RATE_LIMIT_MAX_QUEUE", "100"))
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "10"))
+
+# Provider failover / hedging (only matters when both API keys are set)
+LLM_PROVIDER_ORDER = os.getenv("LLM_PROVIDER_ORDER", "openai,groq")
+ENABLE_PROVIDER_FAILOVER = _bool_env("ENABLE_PROVIDER_FAILOVER", True)
+ENABLE_HEDGING = _bool_env("ENABLE_HEDGING", False)
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.25"))
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "200"))
+
+# Local fake provider for tests and load benchmarks (no API key, no cost)
+USE_FAKE_LLM = _bool_env("USE_FAKE_LLM", False)
+# Latency in ms: 0 | fixed:MS | uniform:MIN,MAX | lognormal:MEDIAN,SIGMA
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "0")
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "42"))
+
+# Connection pool shared by the provider SDK clients (httpx)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2 = _bool_env("HTTP2", True)
+
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Expose Prometheus metrics at /metrics
+ENABLE_METRICS = _bool_env("ENABLE_METRICS", True)
+# Per-request traces: none | jsonl | otlp
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").strip().lower()
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH", (ROOT / ".cache" / "traces.jsonl").as_posix())
+OTLP_ENDPOINT = os.getenv("OTLP_ENDPOINT", "http://127.0.0.1:4318")
+# Add a Server-Timing header with per-stage durations to every response
+SERVER_TIMING = _bool_env("SERVER_TIMING", True)
 DEBUG = _bool_env("DEBUG", False)
 API_VERSION = "1.0.0"
 
@@ -49,6 +110,36 @@ ENABLE_MEAL_SUGGESTIONS = _bool_env("ENABLE_MEAL_SUGGESTIONS", True)
 ENABLE_RECIPE_EXTRACTION = _bool_env("ENABLE_RECIPE_EXTRACTION", True)
 ENABLE_SUPPORTIVE_MESSAGES = _bool_env("ENABLE_SUPPORTIVE_MESSAGES", True)
 ENABLE_CACHING = _bool_env("ENABLE_CACHING", False)
+# Share one provider call between identical prompts that are in flight together
+ENABLE_REQUEST_COALESCING = _bool_env("ENABLE_REQUEST_COALESCING", True)
+
+# Cut pasted pages down to the ingredient/instruction sections before
+# extraction (services/recipe_text.py); the full text is used below the
+# confidence threshold or for texts shorter than TEXT_REDUCER_MIN_CHARS
+ENABLE_TEXT_REDUCER = _bool_env("ENABLE_TEXT_REDUCER", True)
+TEXT_REDUCER_MIN_CONFIDENCE = float(os.getenv("TEXT_REDUCER_MIN_CONFIDENCE", "0.7"))
+TEXT_REDUCER_MIN_CHARS = int(os.getenv("TEXT_REDUCER_MIN_CHARS", "800"))
+
+# Serve well-structured texts from the rule-based extractor
+# (services/rule_extractor.py) without an LLM call when its confidence is
+# at least RULE_EXTRACTOR_MIN_CONFIDENCE
+ENABLE_RULE_EXTRACTOR = _bool_env("ENABLE_RULE_EXTRACTOR", True)
+RULE_EXTRACTOR_MIN_CONFIDENCE = float(os.getenv("RULE_EXTRACTOR_MIN_CONFIDENCE", "0.85"))
+
+# Max LLM calls in flight for one /ai/suggest-meals/batch request
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Response cache (only used when ENABLE_CACHING is on)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory | sqlite
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", (ROOT / ".cache" / "responses.sqlite3").as_posix())
+
+# Corpus of validated meal suggestions (services/recipe_corpus.py): matching
+# requests are answered from it without an LLM call
+ENABLE_RECIPE_CORPUS = _bool_env("ENABLE_RECIPE_CORPUS", False)
+RECIPE_CORPUS_PATH = os.getenv("RECIPE_CORPUS_PATH", (ROOT / ".cache" / "recipes.sqlite3").as_posix())
+RECIPE_CORPUS_MAX_ENTRIES = int(os.getenv("RECIPE_CORPUS_MAX_ENTRIES", "5000"))
 
 @dataclass
 class Settings:
@@ -59,7 +150,46 @@ class Settings:
     temperature: float = TEMPERATURE
     max_retries: int = MAX_RETRIES
     timeout_seconds: int = TIMEOUT_SECONDS
+    retry_base_delay: float = RETRY_BASE_DELAY
+    retry_max_delay: float = RETRY_MAX_DELAY
+    retry_budget_ratio: float = RETRY_BUDGET_RATIO
+    retry_budget_min_per_second: float = RETRY_BUDGET_MIN_PER_SECOND
+    retry_budget_window_seconds: float = RETRY_BUDGET_WINDOW_SECONDS
+    circuit_failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD
+    circuit_reset_seconds: float = CIRCUIT_RESET_SECONDS
+    llm_requests_per_minute: int = LLM_REQUESTS_PER_MINUTE
+    llm_tokens_per_minute: int = LLM_TOKENS_PER_MINUTE
+    llm_max_concurrency: int = LLM_MAX_CONCURRENCY
+    llm_expected_completion_tokens: int = LLM_EXPECTED_COMPLETION_TOKENS
+    tokenizer_encoding: str = TOKENIZER_ENCODING
+    enable_token_budgets: bool = ENABLE_TOKEN_BUDGETS
+    llm_context_tokens: int = LLM_CONTEXT_TOKENS
+    prompt_token_budgets: str = PROMPT_TOKEN_BUDGETS
+    rate_limit_max_queue: int = RATE_LIMIT_MAX_QUEUE
+    rate_limit_max_wait_seconds: float = RATE_LIMIT_MAX_WAIT_SECONDS
+    llm_provider_order: str = LLM_PROVIDER_ORDER
+    enable_provider_failover: bool = ENABLE_PROVIDER_FAILOVER
+    enable_hedging: bool = ENABLE_HEDGING
+    hedge_percentile: float = HEDGE_PERCENTILE
+    hedge_min_samples: int = HEDGE_MIN_SAMPLES
+    hedge_min_delay_seconds: float = HEDGE_MIN_DELAY_SECONDS
+    latency_window: int = LATENCY_WINDOW
+    use_fake_llm: bool = USE_FAKE_LLM
+    fake_llm_latency: str = FAKE_LLM_LATENCY
+    fake_llm_error_rate: float = FAKE_LLM_ERROR_RATE
+    fake_llm_malformed_rate: float = FAKE_LLM_MALFORMED_RATE
+    fake_llm_seed: int = FAKE_LLM_SEED
+    http_max_connections: int = HTTP_MAX_CONNECTIONS
+    http_max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS
+    http_keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY
+    http_connect_timeout: float = HTTP_CONNECT_TIMEOUT
+    http2: bool = HTTP2
     log_level: str = LOG_LEVEL
+    enable_metrics: bool = ENABLE_METRICS
+    tracing_exporter: str = TRACING_EXPORTER
+    trace_jsonl_path: str = TRACE_JSONL_PATH
+    otlp_endpoint: str = OTLP_ENDPOINT
+    server_timing: bool = SERVER_TIMING
     debug: bool = DEBUG
     max_servings: int = MAX_SERVINGS
     max_cook_time: int = MAX_COOK_TIME
@@ -68,18 +198,58 @@ class Settings:
     enable_recipe_extraction: bool = ENABLE_RECIPE_EXTRACTION
     enable_supportive_messages: bool = ENABLE_SUPPORTIVE_MESSAGES
     enable_caching: bool = ENABLE_CACHING
+    enable_request_coalescing: bool = ENABLE_REQUEST_COALESCING
+    enable_text_reducer: bool = ENABLE_TEXT_REDUCER
+    text_reducer_min_confidence: float = TEXT_REDUCER_MIN_CONFIDENCE
+    text_reducer_min_chars: int = TEXT_REDUCER_MIN_CHARS
+    enable_rule_extractor: bool = ENABLE_RULE_EXTRACTOR
+    rule_extractor_min_confidence: float = RULE_EXTRACTOR_MIN_CONFIDENCE
+    batch_max_concurrency: int = BATCH_MAX_CONCURRENCY
+    cache_backend: str = CACHE_BACKEND
+    cache_ttl_seconds: int = CACHE_TTL_SECONDS
+    cache_max_entries: int = CACHE_MAX_ENTRIES
+    cache_sqlite_path: str = CACHE_SQLITE_PATH
+    enable_recipe_corpus: bool = ENABLE_RECIPE_CORPUS
+    recipe_corpus_path: str = RECIPE_CORPUS_PATH
+    recipe_corpus_max_entries: int = RECIPE_CORPUS_MAX_ENTRIES
 
 settings = Settings()
 
 # Validation (non-fatal) — warn if critical settings appear missing
 def _validate_config():
     errors = []
-    if not settings.openai_api_key and not settings.groq_api_key:
+    if not settings.openai_api_key and not settings.groq_api_key and not settings.use_fake_llm:
         errors.append("No LLM API key found: set OPENAI_API_KEY or GROQ_API_KEY in .env")
     if not (0.0 <= settings.temperature <= 2.0):
         errors.append(f"Invalid TEMPERATURE: {settings.temperature}. Must be between 0 and 2.")
     if settings.max_retries < 1:
         errors.append(f"Invalid MAX_RETRIES: {settings.max_retries}. Must be >= 1.")
+    if settings.retry_base_delay < 0 or settings.retry_max_delay < settings.retry_base_delay:
+        errors.append(
+            f"Invalid RETRY_BASE_DELAY/RETRY_MAX_DELAY: {settings.retry_base_delay}/{settings.retry_max_delay}."
+        )
+    if min(settings.llm_requests_per_minute, settings.llm_tokens_per_minute, settings.llm_max_concurrency) < 0:
+        errors.append("Invalid rate limits: LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE and LLM_MAX_CONCURRENCY must be >= 0.")
+    if settings.llm_context_tokens < 1:
+        errors.append(f"Invalid LLM_CONTEXT_TOKENS: {settings.llm_context_tokens}. Must be >= 1.")
+    if settings.circuit_failure_threshold < 1:
+        errors.append(f"Invalid CIRCUIT_FAILURE_THRESHOLD: {settings.circuit_failure_threshold}. Must be >= 1.")
+    if not (0.0 < settings.hedge_percentile <= 100.0):
+        errors.append(f"Invalid HEDGE_PERCENTILE: {settings.hedge_percentile}. Must be in (0, 100].")
+    if not (0.0 <= settings.fake_llm_error_rate <= 1.0 and 0.0 <= settings.fake_llm_malformed_rate <= 1.0):
+        errors.append("Invalid FAKE_LLM_ERROR_RATE/FAKE_LLM_MALFORMED_RATE: must be between 0 and 1.")
+    if not (0.0 <= settings.text_reducer_min_confidence <= 1.0):
+        errors.append(f"Invalid TEXT_REDUCER_MIN_CONFIDENCE: {settings.text_reducer_min_confidence}. Must be between 0 and 1.")
+    if not (0.0 <= settings.rule_extractor_min_confidence <= 1.0):
+        errors.append(f"Invalid RULE_EXTRACTOR_MIN_CONFIDENCE: {settings.rule_extractor_min_confidence}. Must be between 0 and 1.")
+    if settings.http_max_connections < 1:
+        errors.append(f"Invalid HTTP_MAX_CONNECTIONS: {settings.http_max_connections}. Must be >= 1.")
+    if settings.batch_max_concurrency < 1:
+        errors.append(f"Invalid BATCH_MAX_CONCURRENCY: {settings.batch_max_concurrency}. Must be >= 1.")
+    if settings.tracing_exporter not in ("none", "jsonl", "otlp"):
+        errors.append(f"Invalid TRACING_EXPORTER: {settings.tracing_exporter}. Must be 'none', 'jsonl' or 'otlp'.")
+    if settings.cache_backend.strip().lower() not in ("memory", "sqlite"):
+        errors.append(f"Invalid CACHE_BACKEND: {settings.cache_backend}. Must be 'memory' or 'sqlite'.")
     if errors:
         warnings.warn("Configuration issues:\n" + "\n".join(errors))
 
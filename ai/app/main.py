@@ -3,28 +3,50 @@ AI Orchestrator - Main FastAPI Application
 Handles meal suggestions, recipe extraction, and supportive messaging
 """
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
 import logging
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from ai.app.models import (
     RecipeDraft,
     MealSuggestionRequest,
+    MealSuggestionBatchRequest,
+    MealSuggestionBatchItem,
+    MealSuggestionBatchResponse,
     RecipeExtractionRequest,
     SupportiveMessageRequest,
     HealthCheckResponse,
 )
 
-from ai.services.llm_client import LLMClient
+from ai.services.llm_client import AsyncLLMClient
+from ai.services.json_repair import json_repair_stats
+from ai.services.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from ai.services.tracing import TracingMiddleware, stage
+from ai.services.retry import ProviderUnavailableError
+from ai.services.tokens import TokenBudgetExceeded
 from ai.app.prompts import (
     get_meal_suggestion_prompt,
+    get_batch_meal_suggestion_prompt,
     get_recipe_extraction_prompt,
     get_supportive_message_prompt,
+    prefix_stats,
+)
+from ai.app.config import API_VERSION, LOG_LEVEL, settings
+from ai.services.cache import build_response_cache, make_cache_key
+from ai.services.recipe_corpus import RecipeCorpus
+from ai.services.recipe_text import record_reduction, reduce_recipe_text
+from ai.services.rule_extractor import extract_with_rules, record_rule_extraction
+from ai.services.streaming import RecipeStreamParser
+from ai.services.utils import (
+    ingredient_cache_stats,
+    normalize_ingredients,
+    shopping_list_from_recipes,
 )
-from ai.app.config import API_VERSION, LOG_LEVEL
-from ai.services.utils import normalize_ingredients, shopping_list_from_recipes
 
 # Set up logging
 logging.basicConfig(
@@ -49,8 +71,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency / in-flight metrics for /metrics
+if settings.enable_metrics:
+    app.add_middleware(MetricsMiddleware)
+
+# Per-request trace keyed by X-Request-ID; adds Server-Timing to responses
+app.add_middleware(TracingMiddleware)
+
 # Initialize LLM client
-llm_client = LLMClient()
+llm_client = AsyncLLMClient()
+
+# Prompt templates are compiled at import; log their cacheable prefixes
+for _name, _prefix in prefix_stats().items():
+    logger.info(
+        f"Prompt template {_name}: static prefix ~{_prefix['static_tokens']} tokens "
+        f"({_prefix['static_chars']} chars, digest {_prefix['digest']})"
+    )
+
+# Response cache for meal suggestions (ENABLE_CACHING)
+response_cache = (
+    build_response_cache(
+        backend=settings.cache_backend,
+        ttl_seconds=settings.cache_ttl_seconds,
+        max_entries=settings.cache_max_entries,
+        sqlite_path=settings.cache_sqlite_path,
+    )
+    if settings.enable_caching
+    else None
+)
+
+# Corpus of validated meal suggestions (ENABLE_RECIPE_CORPUS)
+recipe_corpus = (
+    RecipeCorpus(settings.recipe_corpus_path, settings.recipe_corpus_max_entries)
+    if settings.enable_recipe_corpus
+    else None
+)
+
+# Repeated batch slots packed into one prompt (the slots_per_prompt limit)
+_MAX_SLOTS_PER_PROMPT = 7
+
+
+def _meal_suggestion_cache_key(request: MealSuggestionRequest) -> str:
+    """
+    Cache key for a meal suggestion: equivalent requests share one entry
+    (case, whitespace and restriction order do not matter)
+    """
+    return make_cache_key(
+        "suggest-meal",
+        {
+            "model": llm_client.model,
+            "meal_type": request.meal_type.strip().lower(),
+            "num_people": request.num_people,
+            "time_available": request.time_available,
+            "dietary_restrictions": sorted(
+                {r.strip().lower() for r in request.dietary_restrictions or [] if r.strip()}
+            ),
+            "preferences": " ".join((request.preferences or "").split()),
+        },
+    )
 
 
 @app.get("/", response_model=HealthCheckResponse)
@@ -66,11 +144,160 @@ async def health_check():
     }
 
 
+def _cached_meal_suggestion(request: MealSuggestionRequest) -> Tuple[Optional[RecipeDraft], Optional[str]]:
+    """
+    Look a meal suggestion up in the response cache, then in the recipe
+    corpus (skipped when the request asks for variety)
+
+    Returns:
+        (stored recipe or None, cache key or None when caching is disabled)
+    """
+    cache_key = _meal_suggestion_cache_key(request) if response_cache is not None else None
+    if request.variety:
+        return None, cache_key
+
+    if cache_key is not None:
+        with stage("cache_lookup"):
+            cached = response_cache.get(cache_key)
+        if cached is not None:
+            return RecipeDraft(**cached), cache_key
+
+    if recipe_corpus is not None:
+        with stage("corpus_lookup") as lookup_span:
+            stored = recipe_corpus.find(
+                meal_type=request.meal_type,
+                num_people=request.num_people,
+                time_available=request.time_available,
+                dietary_restrictions=request.dietary_restrictions,
+                preferences=request.preferences,
+            )
+            lookup_span.set_attribute("corpus.hit", stored is not None)
+        if stored is not None:
+            logger.info(f"Meal suggestion served from recipe corpus: {stored['title']}")
+            return RecipeDraft(**stored), cache_key
+    return None, cache_key
+
+
+def _remember_meal_suggestion(request: MealSuggestionRequest, recipe: RecipeDraft, cache_key: Optional[str]) -> None:
+    """Store a validated LLM recipe in the response cache and the recipe corpus"""
+    if cache_key is not None:
+        response_cache.set(cache_key, recipe.model_dump())
+    if recipe_corpus is not None:
+        try:
+            recipe_corpus.add(
+                recipe.model_dump(),
+                meal_type=request.meal_type,
+                num_people=request.num_people,
+                time_available=request.time_available,
+                dietary_restrictions=request.dietary_restrictions,
+            )
+        except Exception as e:  # noqa: BLE001 - the recipe is served either way
+            logger.warning(f"Could not store recipe in the corpus: {e}")
+
+
+def _meal_suggestion_prompt(request: MealSuggestionRequest) -> str:
+    return get_meal_suggestion_prompt(
+        meal_type=request.meal_type,
+        num_people=request.num_people,
+        time_available=request.time_available,
+        dietary_restrictions=request.dietary_restrictions,
+        preferences=request.preferences,
+    )
+
+
+def _recipe_from_response(response: dict) -> RecipeDraft:
+    """
+    Normalize ingredients using canonical names and validate an LLM recipe
+    """
+    if "ingredients" in response:
+        with stage("normalize"):
+            response["ingredients"] = normalize_ingredients(response["ingredients"])
+    with stage("validate"):
+        return RecipeDraft(**response)
+
+
+async def _generate_meal_suggestion(request: MealSuggestionRequest) -> RecipeDraft:
+    """
+    Produce one meal suggestion: cache lookup, prompt, LLM call, validation
+
+    Raises:
+        TokenBudgetExceeded: If the prompt is over its token budget
+        ValueError: If the LLM output is not a valid recipe
+        Exception: If the LLM call fails
+    """
+    cached, cache_key = _cached_meal_suggestion(request)
+    if cached is not None:
+        logger.info("Meal suggestion served from cache or corpus")
+        return cached
+
+    # Build prompt
+    with stage("prompt"):
+        prompt = _meal_suggestion_prompt(request)
+        plan = llm_client.token_plan(prompt)
+    logger.debug(f"Prompt (~{plan.prompt_tokens} tokens, max_tokens {plan.max_tokens}): {prompt[:200]}...")
+
+    # Call LLM
+    with stage("llm_call"):
+        response = await llm_client.call_llm(prompt)
+    logger.debug(f"LLM response received: {response}")
+
+    # Normalize and validate
+    recipe = _recipe_from_response(response)
+    logger.info(f"Successfully generated recipe: {recipe.title}")
+
+    _remember_meal_suggestion(request, recipe, cache_key)
+    return recipe
+
+
+async def _generate_packed_meal_suggestions(
+    requests: List[MealSuggestionRequest],
+    avoid: Optional[List[str]] = None,
+) -> List[Optional[RecipeDraft]]:
+    """
+    Answer several meal slots with a single LLM call
+
+    Args:
+        requests: The slots to fill
+        avoid: Titles already planned, which the answer must not repeat
+
+    Returns:
+        One entry per request, in order; None where the model's answer for
+        that slot was missing or invalid
+
+    Raises:
+        Exception: If the LLM call itself fails
+    """
+    with stage("prompt"):
+        prompt = get_batch_meal_suggestion_prompt([r.model_dump() for r in requests], avoid=avoid)
+    with stage("llm_call"):
+        response = await llm_client.call_llm(prompt)
+    raw_recipes = response.get("recipes")
+    if not isinstance(raw_recipes, list):
+        raw_recipes = []
+
+    recipes: List[Optional[RecipeDraft]] = []
+    for i, request in enumerate(requests):
+        recipe = None
+        if i < len(raw_recipes) and isinstance(raw_recipes[i], dict):
+            try:
+                recipe = _recipe_from_response(raw_recipes[i])
+            except ValueError as e:
+                logger.warning(f"Packed recipe {i} failed validation: {e}")
+        if recipe is not None:
+            cache_key = _meal_suggestion_cache_key(request) if response_cache is not None else None
+            _remember_meal_suggestion(request, recipe, cache_key)
+        recipes.append(recipe)
+    return recipes
+
+
 @app.post("/ai/suggest-meal", response_model=RecipeDraft)
 async def suggest_meal(request: MealSuggestionRequest):
     """
     Generate meal suggestion based on user preferences
 
+    Answered from the response cache or the recipe corpus when they hold a
+    match (unless the request asks for variety), otherwise by the LLM.
+
     Args:
         request: MealSuggestionRequest with meal preferences
 
@@ -81,31 +308,14 @@ async def suggest_meal(request: MealSuggestionRequest):
         logger.info(
             f"Meal suggestion requested: {request.meal_type} for {request.num_people} people"
         )
-
-        # Build prompt
-        prompt = get_meal_suggestion_prompt(
-            meal_type=request.meal_type,
-            num_people=request.num_people,
-            time_available=request.time_available,
-            dietary_restrictions=request.dietary_restrictions,
-            preferences=request.preferences,
-        )
-
-        logger.debug(f"Prompt: {prompt[:200]}...")
-
-        # Call LLM
-        response = llm_client.call_llm(prompt)
-        logger.debug(f"LLM response received: {response}")
-
-        # Normalize ingredients using canonical names
-        if "ingredients" in response:
-            response["ingredients"] = normalize_ingredients(response["ingredients"])
-
-        # Validate and return
-        recipe = RecipeDraft(**response)
-        logger.info(f"Successfully generated recipe: {recipe.title}")
-        return recipe
-
+        return await _generate_meal_suggestion(request)
+
+    except ProviderUnavailableError as e:
+        logger.warning(f"Meal suggestion refused: {e}")
+        raise _unavailable(e) from e
+    except TokenBudgetExceeded as e:
+        logger.warning(f"Meal suggestion refused: {e}")
+        raise _too_large(e) from e
     except ValueError as e:
         logger.error(f"Validation error in meal suggestion: {e}")
         raise HTTPException(
@@ -118,11 +328,217 @@ async def suggest_meal(request: MealSuggestionRequest):
         ) from e
 
 
+def _unavailable(e: ProviderUnavailableError) -> HTTPException:
+    """503 for requests refused while the LLM providers are unavailable"""
+    headers = None
+    if e.retry_after is not None:
+        headers = {"Retry-After": str(max(1, int(round(e.retry_after))))}
+    return HTTPException(status_code=503, detail=f"AI service unavailable: {str(e)}", headers=headers)
+
+
+def _too_large(e: TokenBudgetExceeded) -> HTTPException:
+    """413 for prompts over their token budget (refused before any provider call)"""
+    return HTTPException(status_code=413, detail=f"Request too large: {str(e)}")
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/ai/suggest-meal/stream")
+async def suggest_meal_stream(request: MealSuggestionRequest):
+    """
+    Streaming variant of /ai/suggest-meal (Server-Sent Events)
+
+    Events, in order:
+    - title: {"title": ...} as soon as the title is complete
+    - ingredient: {"index": n, "text": ...} for each ingredient (normalized)
+    - step: {"index": n, "text": ...} for each step
+    - recipe: the final validated RecipeDraft
+    - error: {"detail": ...} if generation or validation fails
+
+    Args:
+        request: MealSuggestionRequest with meal preferences
+
+    Returns:
+        StreamingResponse: text/event-stream
+    """
+    logger.info(
+        f"Streaming meal suggestion requested: {request.meal_type} for {request.num_people} people"
+    )
+    prompt = _meal_suggestion_prompt(request)
+    try:
+        llm_client.token_plan(prompt)  # refuse before the 200 and the event stream start
+    except TokenBudgetExceeded as e:
+        logger.warning(f"Streaming meal suggestion refused: {e}")
+        raise _too_large(e) from e
+
+    async def events():
+        cached, cache_key = _cached_meal_suggestion(request)
+        if cached is not None:
+            logger.info("Streaming meal suggestion served from cache or corpus")
+            yield _sse("title", {"title": cached.title})
+            for i, text in enumerate(cached.ingredients):
+                yield _sse("ingredient", {"index": i, "text": text})
+            for i, text in enumerate(cached.steps):
+                yield _sse("step", {"index": i, "text": text})
+            yield _sse("recipe", cached.model_dump())
+            return
+
+        parser = RecipeStreamParser()
+        counts = {"ingredient": 0, "step": 0}
+        try:
+            async for delta in llm_client.stream_llm(prompt):
+                for kind, value in parser.feed(delta):
+                    if kind == "title":
+                        yield _sse("title", {"title": value})
+                        continue
+                    if kind == "ingredient":
+                        value = normalize_ingredients([value])[0]
+                    yield _sse(kind, {"index": counts[kind], "text": value})
+                    counts[kind] += 1
+
+            recipe = _recipe_from_response(llm_client.parse_content(parser.text))
+            logger.info(f"Successfully streamed recipe: {recipe.title}")
+            _remember_meal_suggestion(request, recipe, cache_key)
+            yield _sse("recipe", recipe.model_dump())
+
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Error in streaming meal suggestion: {e}", exc_info=True)
+            yield _sse("error", {"detail": f"AI generation failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/ai/suggest-meals/batch", response_model=MealSuggestionBatchResponse)
+async def suggest_meals_batch(request: MealSuggestionBatchRequest):
+    """
+    Generate meal suggestions for many slots at once (e.g. a whole week)
+
+    Slots run concurrently, capped by BATCH_MAX_CONCURRENCY (or the lower
+    max_concurrency in the request). With slots_per_prompt > 1, uncached
+    slots are packed into shared prompts; any slot the packed answer misses
+    is retried on its own. A failing slot reports its error without failing
+    the rest of the batch.
+
+    Identical slots (e.g. the same dinner every day of a week) get different
+    recipes: only the first may come from the cache or the corpus, and the
+    others are asked for slots_per_prompt at a time, one prompt after
+    another, each naming the dishes already planned, never as identical
+    prompts that would be coalesced into one answer.
+
+    Args:
+        request: MealSuggestionBatchRequest with the slots to fill
+
+    Returns:
+        MealSuggestionBatchResponse: One result per slot, in request order
+    """
+    items = request.items
+    limit = min(request.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    logger.info(
+        f"Batch meal suggestion requested: {len(items)} slots, "
+        f"concurrency {limit}, {request.slots_per_prompt} per prompt"
+    )
+    semaphore = asyncio.Semaphore(limit)
+    results: List[Optional[MealSuggestionBatchItem]] = [None] * len(items)
+
+    async def run_single(index: int, item: MealSuggestionRequest) -> None:
+        async with semaphore:
+            try:
+                recipe = await _generate_meal_suggestion(item)
+                results[index] = MealSuggestionBatchItem(index=index, recipe=recipe)
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"Batch slot {index} failed: {e}")
+                results[index] = MealSuggestionBatchItem(index=index, error=str(e))
+
+    async def run_packed(chunk: List[Tuple[int, MealSuggestionRequest]]) -> None:
+        try:
+            async with semaphore:
+                recipes = await _generate_packed_meal_suggestions([item for _, item in chunk])
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Packed prompt for slots {[i for i, _ in chunk]} failed: {e}")
+            recipes = [None] * len(chunk)
+
+        retry = []
+        for (index, item), recipe in zip(chunk, recipes):
+            if recipe is None:
+                retry.append((index, item))
+            else:
+                results[index] = MealSuggestionBatchItem(index=index, recipe=recipe)
+        await asyncio.gather(*(run_single(index, item) for index, item in retry))
+
+    async def run_repeated(slots: List[Tuple[int, MealSuggestionRequest]], planned: List[str]) -> None:
+        retry = []
+        size = min(request.slots_per_prompt, _MAX_SLOTS_PER_PROMPT)
+        for start in range(0, len(slots), size):
+            chunk = slots[start:start + size]
+            try:
+                async with semaphore:
+                    recipes = await _generate_packed_meal_suggestions([item for _, item in chunk], avoid=planned)
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"Packed prompt for repeated slots {[i for i, _ in chunk]} failed: {e}")
+                recipes = [None] * len(chunk)
+            for (index, item), recipe in zip(chunk, recipes):
+                if recipe is None:
+                    retry.append((index, item))
+                else:
+                    results[index] = MealSuggestionBatchItem(index=index, recipe=recipe)
+                    planned.append(recipe.title)
+        # One at a time: identical prompts in flight together would share one answer
+        for index, item in retry:
+            await run_single(index, item)
+
+    # Cache and corpus hits are answered up front so they never take a prompt slot.
+    # Only the first of several identical slots may be reused; the rest must differ.
+    planned: Dict[str, List[str]] = {}
+    waiting: Dict[str, List[Tuple[int, MealSuggestionRequest]]] = {}
+    for index, item in enumerate(items):
+        key = _meal_suggestion_cache_key(item)
+        if key in planned:
+            item = item.model_copy(update={"variety": True})
+        else:
+            planned[key] = []
+            cached, _ = _cached_meal_suggestion(item)
+            if cached is not None:
+                results[index] = MealSuggestionBatchItem(index=index, recipe=cached)
+                planned[key].append(cached.title)
+                continue
+        waiting.setdefault(key, []).append((index, item))
+    repeated = {key: slots for key, slots in waiting.items() if len(slots) > 1 or planned[key]}
+    pending = sorted(slot for key, slots in waiting.items() if key not in repeated for slot in slots)
+
+    size = request.slots_per_prompt
+    repeats = [run_repeated(slots, planned[key]) for key, slots in repeated.items()]
+    if size > 1:
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        await asyncio.gather(*repeats, *(
+            run_packed(chunk) if len(chunk) > 1 else run_single(*chunk[0]) for chunk in chunks
+        ))
+    else:
+        await asyncio.gather(*repeats, *(run_single(index, item) for index, item in pending))
+
+    succeeded = sum(1 for r in results if r.recipe is not None)
+    logger.info(f"Batch meal suggestion finished: {succeeded}/{len(items)} succeeded")
+    return MealSuggestionBatchResponse(
+        results=results, succeeded=succeeded, failed=len(items) - succeeded
+    )
+
+
 @app.post("/ai/extract-recipe", response_model=RecipeDraft)
-async def extract_recipe(request: RecipeExtractionRequest):
+async def extract_recipe(request: RecipeExtractionRequest, http_response: Response):
     """
     Extract structured recipe from unstructured text
 
+    Well-structured texts are parsed by local rules; the LLM is only called
+    when their confidence is below RULE_EXTRACTOR_MIN_CONFIDENCE. The
+    X-Extraction-Path response header says which path served the request
+    (rules or llm).
+
     Args:
         request: RecipeExtractionRequest with raw recipe text
 
@@ -133,22 +549,60 @@ async def extract_recipe(request: RecipeExtractionRequest):
         logger.info("Recipe extraction requested")
         logger.debug(f"Recipe text length: {len(request.recipe_text)} characters")
 
-        # Build prompt
-        prompt = get_recipe_extraction_prompt(request.recipe_text)
-
-        # Call LLM
-        response = llm_client.call_llm(prompt)
-        logger.debug(f"Extraction response: {response}")
+        # Keep only the recipe sections of pasted pages
+        with stage("reduce") as reduce_span:
+            reduced = reduce_recipe_text(request.recipe_text)
+            record_reduction(reduced)
+            for key, value in reduced.stats().items():
+                reduce_span.set_attribute(f"reducer.{key}", value)
+        logger.info(
+            f"Recipe text {reduced.reason}: {reduced.original_chars} -> {reduced.reduced_chars} chars "
+            f"({reduced.reduction:.0%} removed, confidence {reduced.confidence:.2f})"
+        )
 
-        # Normalize ingredients
-        if "ingredients" in response:
-            response["ingredients"] = normalize_ingredients(response["ingredients"])
+        # Parse locally when the text is structured enough
+        with stage("rules") as rules_span:
+            local = extract_with_rules(reduced)
+            record_rule_extraction(local)
+            rules_span.set_attribute("rules.confidence", round(local.confidence, 2))
+            rules_span.set_attribute("rules.outcome", local.reason)
+
+        if local.accepted:
+            path = "rules"
+            response = local.draft
+        else:
+            path = "llm"
+            logger.debug(f"Rule extraction {local.reason} (confidence {local.confidence:.2f}, missing {local.missing})")
+
+            # Build prompt
+            with stage("prompt"):
+                prompt = get_recipe_extraction_prompt(reduced.text)
+                plan = llm_client.token_plan(prompt)
+            logger.debug(f"Extraction prompt: ~{plan.prompt_tokens} tokens, max_tokens {plan.max_tokens}")
+
+            # Call LLM
+            with stage("llm_call"):
+                response = await llm_client.call_llm(prompt)
+            logger.debug(f"Extraction response: {response}")
+
+            # Normalize ingredients
+            if "ingredients" in response:
+                with stage("normalize"):
+                    response["ingredients"] = normalize_ingredients(response["ingredients"])
 
         # Validate and return
-        recipe = RecipeDraft(**response)
-        logger.info(f"Successfully extracted recipe: {recipe.title}")
+        with stage("validate"):
+            recipe = RecipeDraft(**response)
+        http_response.headers["X-Extraction-Path"] = path
+        logger.info(f"Successfully extracted recipe via {path}: {recipe.title}")
         return recipe
 
+    except ProviderUnavailableError as e:
+        logger.warning(f"Recipe extraction refused: {e}")
+        raise _unavailable(e) from e
+    except TokenBudgetExceeded as e:
+        logger.warning(f"Recipe extraction refused: {e}")
+        raise _too_large(e) from e
     except ValueError as e:
         logger.error(f"Validation error in recipe extraction: {e}")
         raise HTTPException(
@@ -184,7 +638,8 @@ async def generate_shopping_list(recipes: List[dict]):
                 recipe["ingredients"] = []
 
         # Generate aggregated shopping list using your utils function
-        shopping_list = shopping_list_from_recipes(recipes)
+        with stage("shopping_list"):
+            shopping_list = shopping_list_from_recipes(recipes)
 
         logger.info(f"Successfully generated shopping list with {len(shopping_list)} items")
         return shopping_list
@@ -212,10 +667,12 @@ async def generate_supportive_message(request: SupportiveMessageRequest):
         logger.info("Supportive message requested")
 
         # Build prompt
-        prompt = get_supportive_message_prompt(request.context)
+        with stage("prompt"):
+            prompt = get_supportive_message_prompt(request.context)
 
         # Call LLM
-        response = llm_client.call_llm(prompt)
+        with stage("llm_call"):
+            response = await llm_client.call_llm(prompt)
         logger.debug(f"Message response: {response}")
 
         if "message" not in response:
@@ -224,6 +681,12 @@ async def generate_supportive_message(request: SupportiveMessageRequest):
         logger.info("Successfully generated supportive message")
         return response
 
+    except ProviderUnavailableError as e:
+        logger.warning(f"Supportive message refused: {e}")
+        raise _unavailable(e) from e
+    except TokenBudgetExceeded as e:
+        logger.warning(f"Supportive message refused: {e}")
+        raise _too_large(e) from e
     except Exception as e:  # noqa: BLE001
         logger.error(f"Error generating message: {e}", exc_info=True)
         raise HTTPException(
@@ -231,6 +694,86 @@ async def generate_supportive_message(request: SupportiveMessageRequest):
         ) from e
 
 
+@app.get("/ai/cache-stats")
+async def cache_stats():
+    """
+    Cache statistics for monitoring
+
+    Returns:
+        dict: Response cache counters (null when caching is disabled),
+              recipe corpus counters (null when the corpus is disabled),
+              parsed-ingredient cache counters, LLM request coalescing counters
+              per-provider failover/hedging counters, JSON repair counters
+              and the static prefix size of each prompt template
+    """
+    return {
+        "enabled": response_cache is not None,
+        "responses": response_cache.stats() if response_cache is not None else None,
+        "recipe_corpus": recipe_corpus.stats() if recipe_corpus is not None else None,
+        "ingredients": ingredient_cache_stats(),
+        "coalescing": llm_client.single_flight.stats(),
+        "providers": llm_client.provider_stats(),
+        "json_repair": json_repair_stats(),
+        "prompt_prefixes": prefix_stats(),
+    }
+
+
+def _collect_service_stats():
+    """Scrape-time samples for counters kept by the caches, client and repair stage"""
+    if response_cache is not None:
+        stats = response_cache.stats()
+        for key in ("hits", "misses", "expirations", "evictions"):
+            yield f"ai_response_cache_{key}_total", "counter", f"Response cache {key}", {}, stats.get(key)
+        yield "ai_response_cache_entries", "gauge", "Response cache entries", {}, stats.get("size")
+    if recipe_corpus is not None:
+        stats = recipe_corpus.stats()
+        for key in ("hits", "misses", "added", "evictions"):
+            yield f"ai_recipe_corpus_{key}_total", "counter", f"Recipe corpus {key}", {}, stats[key]
+        yield "ai_recipe_corpus_entries", "gauge", "Recipes in the corpus", {}, stats["size"]
+    for cache, stats in ingredient_cache_stats().items():
+        for key in ("hits", "misses", "evictions"):
+            yield (
+                f"ai_ingredient_cache_{key}_total", "counter",
+                f"Parsed-ingredient cache {key}", {"cache": cache}, stats.get(key),
+            )
+    coalescing = llm_client.single_flight.stats()
+    yield "ai_llm_coalesced_total", "counter", "LLM calls served by an identical in-flight call", {}, coalescing["deduplicated"]
+    repair = json_repair_stats()
+    yield "ai_json_repaired_total", "counter", "Malformed LLM outputs repaired locally (retries avoided)", {}, repair["repaired"]
+    yield "ai_json_repair_failed_total", "counter", "Malformed LLM outputs that could not be repaired", {}, repair["failed"]
+    for name, prefix in prefix_stats().items():
+        yield (
+            "ai_prompt_static_prefix_tokens", "gauge", "Estimated tokens in a prompt template's cacheable system prefix",
+            {"template": name}, prefix["static_tokens"],
+        )
+    for backend in llm_client.backends:
+        labels = {"provider": backend.name}
+        yield (
+            "ai_llm_circuit_open", "gauge", "1 while the provider's circuit breaker refuses calls",
+            labels, int(backend.breaker.state != "closed"),
+        )
+        limiter = backend.limiter.stats()
+        yield "ai_llm_rate_limit_waiting", "gauge", "Calls queued by the client-side rate limiter", labels, limiter["waiting"]
+        yield "ai_llm_rate_limit_rejected_total", "counter", "Calls shed by the client-side rate limiter", labels, limiter["rejected"]
+
+
+REGISTRY.register_collector(_collect_service_stats)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics (text exposition format)
+
+    Route and stage latency histograms, LLM attempt/retry counters by
+    provider and error class, token usage, in-flight gauges and the
+    cache / coalescing / repair counters.
+    """
+    if not settings.enable_metrics:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/ai/test")
 async def test_endpoint():
     """
@@ -6,6 +6,8 @@ Defines request/response schemas using Pydantic
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
+from ai.app.config import MAX_RECIPE_TEXT_LENGTH
+
 
 class RecipeDraft(BaseModel):
     """
@@ -94,6 +96,11 @@ class MealSuggestionRequest(BaseModel):
         description="Any additional preferences or context",
         example="something with pasta and lots of vegetables"
     )
+    variety: bool = Field(
+        False,
+        description="Always generate a new recipe instead of reusing a stored or cached one",
+        example=False
+    )
 
     class Config:
         json_schema_extra = {
@@ -107,6 +114,64 @@ class MealSuggestionRequest(BaseModel):
         }
 
 
+class MealSuggestionBatchRequest(BaseModel):
+    """
+    Request model for batch meal suggestions (e.g. a whole week's plan)
+    """
+    items: List[MealSuggestionRequest] = Field(
+        ...,
+        description="Meal slots to fill, answered in the same order",
+        min_length=1,
+        max_length=50,
+    )
+    max_concurrency: Optional[int] = Field(
+        None,
+        description="Max LLM calls in flight for this batch (capped by server config)",
+        ge=1,
+        le=50,
+        example=4
+    )
+    slots_per_prompt: int = Field(
+        1,
+        description="Meal slots packed into one LLM prompt (1 = one call per slot, identical slots asked for one after another)",
+        ge=1,
+        le=7,
+        example=3
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "items": [
+                    {"meal_type": "breakfast", "num_people": 4, "time_available": 15},
+                    {"meal_type": "lunch", "num_people": 4, "time_available": 30},
+                    {"meal_type": "dinner", "num_people": 4, "time_available": 45,
+                     "dietary_restrictions": ["vegetarian"]}
+                ],
+                "max_concurrency": 4,
+                "slots_per_prompt": 3
+            }
+        }
+
+
+class MealSuggestionBatchItem(BaseModel):
+    """
+    One result of a batch meal suggestion: either a recipe or an error
+    """
+    index: int = Field(..., description="Position of the slot in the request", example=0)
+    recipe: Optional[RecipeDraft] = Field(None, description="Generated recipe, if successful")
+    error: Optional[str] = Field(None, description="Why this slot failed, if it did")
+
+
+class MealSuggestionBatchResponse(BaseModel):
+    """
+    Response model for batch meal suggestions
+    """
+    results: List[MealSuggestionBatchItem]
+    succeeded: int = Field(..., example=3)
+    failed: int = Field(..., example=0)
+
+
 class RecipeExtractionRequest(BaseModel):
     """
     Request model for recipe extraction endpoint
@@ -115,6 +180,7 @@ class RecipeExtractionRequest(BaseModel):
         ...,
         description="Raw recipe text to parse (from website, book, or manual entry)",
         min_length=10,
+        max_length=MAX_RECIPE_TEXT_LENGTH,
         example="Spaghetti Carbonara\n\nIngredients:\n- 400g spaghetti\n- 200g bacon\n- 3 eggs\n\nSteps:\n1. Boil pasta..."
     )
 
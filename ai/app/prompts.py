@@ -2,45 +2,92 @@
 AI Prompt Templates
 Contains all prompts used to interact with LLMs
 Modify these to improve AI output quality
+
+Each template is split into a static part (rules and JSON schema) and a
+variable part (the request's own values). The static part is appended to
+SYSTEM_PROMPT and sent as the system message, so every call of a template
+starts with the same bytes and providers with prompt-prefix caching can
+bill those tokens as cached and start generating sooner. Only the short
+variable part goes into the user message.
+
+Templates are compiled once at import; prefix_stats() reports the size of
+each static prefix.
 """
 
-from typing import List, Optional
+import hashlib
+from string import Formatter
+from typing import Any, Dict, List, Optional
 
+from ai.services.llm_client import SYSTEM_PROMPT
+from ai.services.tokens import TokenPlan, estimate_tokens
 
-def get_meal_suggestion_prompt(
-    meal_type: str,
-    num_people: int,
-    time_available: int,
-    dietary_restrictions: Optional[List[str]] = None,
-    preferences: Optional[str] = None
-) -> str:
+
+class Prompt(str):
     """
-    Generate prompt for meal suggestion
-    
-    This is the most important prompt - tune it carefully!
-    Tips:
-    - Be very specific about the JSON structure
-    - Include examples if AI struggles
-    - Add constraints to prevent weird outputs
+    User message of a rendered template
+
+    Behaves as the plain prompt string everywhere (logs, coalescing, tests)
+    and carries what the LLM client needs besides the text: the template's
+    static system message and its precounted tokens, and the number of
+    recipes the answer should hold (sizes max_tokens, see services/tokens.py).
     """
-    
-    # Build dietary restrictions text
-    restrictions_text = ""
-    if dietary_restrictions:
-        restrictions_text = f"\n- Dietary restrictions: {', '.join(dietary_restrictions)}"
-    
-    # Build preferences text
-    preferences_text = ""
-    if preferences:
-        preferences_text = f"\n- Additional preferences: {preferences}"
-    
-    return f"""Suggest a {meal_type} recipe with the following requirements:
 
-REQUIREMENTS:
-- Servings: {num_people} people
-- Total time available: {time_available} minutes (including prep AND cooking)
-{restrictions_text}
-{preferences_text}
+    system: str
+    template: str
+    static_tokens: Optional[int]
+    items: int
+    token_plan: Optional[TokenPlan]
+
+    def __new__(
+        cls,
+        user: str,
+        system: str = SYSTEM_PROMPT,
+        template: str = "",
+        static_tokens: Optional[int] = None,
+        items: int = 1,
+    ):
+        prompt = super().__new__(cls, user)
+        prompt.system = system
+        prompt.template = template
+        prompt.static_tokens = static_tokens
+        prompt.items = items
+        prompt.token_plan = None
+        return prompt
+
+
+class PromptTemplate:
+    """
+    A prompt split into a cacheable static prefix and a variable tail
+
+    Args:
+        name: Template name used in logs and stats
+        instructions: Static rules and JSON schema (must not vary per request)
+        user: str.format template for the variable part
+    """
+
+    def __init__(self, name: str, instructions: str, user: str):
+        self.name = name
+        self.system = f"{SYSTEM_PROMPT}\n\n{instructions.strip()}"
+        self.user = user.strip()
+        self.fields = frozenset(f for _, f, _, _ in Formatter().parse(self.user) if f)
+        self.static_tokens = estimate_tokens(self.system)
+        self.static_digest = hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:16]
+
+    def render(self, items: int = 1, **values: Any) -> Prompt:
+        """The prompt for these values; items is the number of recipes expected back"""
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt template {self.name!r} is missing {', '.join(sorted(missing))}")
+        return Prompt(self.user.format(**values), self.system, self.name, self.static_tokens, items)
+
+
+_JSON_ONLY = """DO NOT include any text outside the JSON structure.
+DO NOT use markdown formatting.
+Return ONLY the JSON object."""
+
+MEAL_SUGGESTION = PromptTemplate(
+    "meal_suggestion",
+    instructions=f"""You suggest one recipe for the requirements given by the user.
 
 IMPORTANT RULES:
 - Recipe must be realistic and achievable in the time limit
@@ -48,7 +95,8 @@ IMPORTANT RULES:
 - Use common ingredients that most kitchens have
 - Steps should be clear, numbered, and easy to follow
 - Make it family-friendly and practical for busy parents
-- Prep time + cook time should not exceed {time_available} minutes
+- Prep time + cook time should not exceed the total time available
+- Respect every dietary restriction and additional preference listed
 
 Return ONLY valid JSON with this EXACT structure:
 {{
@@ -67,25 +115,49 @@ Return ONLY valid JSON with this EXACT structure:
   "cook_time": 20
 }}
 
-DO NOT include any text outside the JSON structure.
-DO NOT use markdown formatting.
-Return ONLY the JSON object."""
+{_JSON_ONLY}""",
+    user="""Suggest a {meal_type} recipe with the following requirements:
 
+REQUIREMENTS:
+- Servings: {num_people} people
+- Total time available: {time_available} minutes (including prep AND cooking){extra}""",
+)
 
-def get_recipe_extraction_prompt(recipe_text: str) -> str:
-    """
-    Generate prompt for recipe extraction
-    
-    This prompt handles messy input from various sources:
-    - Website copy-paste
-    - Handwritten recipes typed in
-    - Screenshot text
-    """
-    
-    return f"""Extract the recipe information from the following text and convert it into a structured format.
+BATCH_MEAL_SUGGESTION = PromptTemplate(
+    "batch_meal_suggestion",
+    instructions=f"""You suggest one recipe for EACH meal slot listed by the user.
 
-RECIPE TEXT:
-{recipe_text}
+IMPORTANT RULES:
+- Each recipe must be realistic and achievable in its slot's time limit
+- Ingredients must include SPECIFIC quantities (e.g., "2 chicken breasts", "1 cup rice")
+- Use common ingredients that most kitchens have
+- Steps should be clear, numbered, and easy to follow
+- Make it family-friendly and practical for busy parents
+- Vary the recipes; do not repeat the same dish across slots
+- Prep time + cook time should not exceed each slot's time limit
+
+Return ONLY valid JSON with this EXACT structure, with one recipe per slot in slot order:
+{{
+  "recipes": [
+    {{
+      "title": "Recipe Name Here",
+      "ingredients": ["2 chicken breasts", "1 cup rice"],
+      "steps": ["First step with clear instructions", "Final step and serving suggestion"],
+      "prep_time": 10,
+      "cook_time": 20
+    }}
+  ]
+}}
+
+{_JSON_ONLY}""",
+    user="""Suggest one recipe for EACH of the following {count} meal slots (exactly {count} recipes):
+
+{slots}""",
+)
+
+RECIPE_EXTRACTION = PromptTemplate(
+    "recipe_extraction",
+    instructions="""Extract the recipe information from the text given by the user and convert it into a structured format.
 
 YOUR TASK:
 1. Identify the recipe title
@@ -102,7 +174,7 @@ CLEANING RULES:
 - If ingredient quantities are vague, use reasonable amounts
 
 Return ONLY valid JSON with this EXACT structure:
-{{
+{
   "title": "Recipe Name",
   "ingredients": [
     "400g spaghetti",
@@ -117,7 +189,7 @@ Return ONLY valid JSON with this EXACT structure:
   ],
   "prep_time": 10,
   "cook_time": 15
-}}
+}
 
 IMPORTANT:
 - If prep_time or cook_time are not mentioned in the text, use null
@@ -125,22 +197,14 @@ IMPORTANT:
 - Keep the original recipe's spirit but clean up the formatting
 - If the text is incomplete or unclear, make reasonable assumptions
 
-Return ONLY the JSON object, no additional text."""
+Return ONLY the JSON object, no additional text.""",
+    user="""RECIPE TEXT:
+{recipe_text}""",
+)
 
-
-def get_supportive_message_prompt(context: Optional[str] = None) -> str:
-    """
-    Generate prompt for supportive message
-    
-    These messages should feel genuine and helpful, not cheesy or patronizing
-    Think: supportive friend, not corporate motivational poster
-    """
-    
-    context_text = ""
-    if context:
-        context_text = f"\n\nCONTEXT: {context}"
-    
-    return f"""Create a brief, warm, and genuinely supportive message for a busy parent managing household tasks and meal planning.{context_text}
+SUPPORTIVE_MESSAGE = PromptTemplate(
+    "supportive_message",
+    instructions="""Create a brief, warm, and genuinely supportive message for a busy parent managing household tasks and meal planning.
 
 MESSAGE GUIDELINES:
 - Keep it to 1-2 sentences maximum
@@ -150,13 +214,14 @@ MESSAGE GUIDELINES:
 - Feel like a caring friend, not a corporate motivational poster
 - Be specific to meal planning and household management if possible
 - Make it feel personal and understanding
+- Take the user's context into account when one is given
 
 TONE: Warm, genuine, understanding, practical
 
 Return ONLY valid JSON:
-{{
+{
   "message": "Your supportive message here"
-}}
+}
 
 GOOD EXAMPLES:
 - "Planning ahead like this gives you back mental space for the things that matter most."
@@ -168,7 +233,117 @@ BAD EXAMPLES (avoid these):
 - "You've got this!" (too generic)
 - "Keep pushing through!" (sounds exhausting)
 
-Return ONLY the JSON object with your message."""
+Return ONLY the JSON object with your message.""",
+    user="""Write the supportive message now.{context}""",
+)
+
+TEMPLATES: Dict[str, PromptTemplate] = {
+    t.name: t for t in (MEAL_SUGGESTION, BATCH_MEAL_SUGGESTION, RECIPE_EXTRACTION, SUPPORTIVE_MESSAGE)
+}
+
+
+def prefix_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Static prefix of every template, for logs and /ai/cache-stats
+
+    Returns:
+        {template name: {"static_tokens": estimated tokens of the system
+        message, "static_chars": its length, "digest": short sha256 that
+        changes whenever the prefix does (and the provider cache resets)}}
+    """
+    return {
+        name: {
+            "static_tokens": t.static_tokens,
+            "static_chars": len(t.system),
+            "digest": t.static_digest,
+        }
+        for name, t in TEMPLATES.items()
+    }
+
+
+def get_meal_suggestion_prompt(
+    meal_type: str,
+    num_people: int,
+    time_available: int,
+    dietary_restrictions: Optional[List[str]] = None,
+    preferences: Optional[str] = None
+) -> Prompt:
+    """
+    Generate prompt for meal suggestion
+    
+    This is the most important prompt - tune it carefully!
+    Tips:
+    - Be very specific about the JSON structure
+    - Include examples if AI struggles
+    - Add constraints to prevent weird outputs
+    """
+    
+    extra = ""
+    if dietary_restrictions:
+        extra += f"\n- Dietary restrictions: {', '.join(dietary_restrictions)}"
+    if preferences:
+        extra += f"\n- Additional preferences: {preferences}"
+    
+    return MEAL_SUGGESTION.render(
+        meal_type=meal_type, num_people=num_people, time_available=time_available, extra=extra
+    )
+
+
+def get_batch_meal_suggestion_prompt(slots: List[dict], avoid: Optional[List[str]] = None) -> Prompt:
+    """
+    Generate one prompt covering several meal slots
+
+    Each slot is a dict with the get_meal_suggestion_prompt arguments
+    (meal_type, num_people, time_available, dietary_restrictions, preferences).
+    The model must answer with one recipe per slot, in the same order.
+    Dishes named in avoid (already planned elsewhere) must not be suggested.
+    """
+
+    slot_lines = []
+    for i, slot in enumerate(slots, start=1):
+        line = (
+            f"{i}. {slot['meal_type']} for {slot['num_people']} people, "
+            f"max {slot['time_available']} minutes total"
+        )
+        if slot.get("dietary_restrictions"):
+            line += f"; dietary restrictions: {', '.join(slot['dietary_restrictions'])}"
+        if slot.get("preferences"):
+            line += f"; preferences: {slot['preferences']}"
+        slot_lines.append(line)
+
+    slots_text = "\n".join(slot_lines)
+    if avoid:
+        slots_text += f"\n\nAlready planned, suggest different dishes: {'; '.join(avoid)}"
+
+    return BATCH_MEAL_SUGGESTION.render(items=len(slots), count=len(slots), slots=slots_text)
+
+
+def get_recipe_extraction_prompt(recipe_text: str) -> Prompt:
+    """
+    Generate prompt for recipe extraction
+    
+    This prompt handles messy input from various sources:
+    - Website copy-paste
+    - Handwritten recipes typed in
+    - Screenshot text
+    """
+    
+    return RECIPE_EXTRACTION.render(recipe_text=recipe_text)
+
+
+def get_supportive_message_prompt(context: Optional[str] = None) -> Prompt:
+    """
+    Generate prompt for supportive message
+    
+    These messages should feel genuine and helpful, not cheesy or patronizing
+    Think: supportive friend, not corporate motivational poster
+    """
+    
+    context_text = ""
+    if context:
+        context_text = f"\n\nCONTEXT: {context}"
+    
+    return SUPPORTIVE_MESSAGE.render(context=context_text)
 
 
 # Additional prompts for future features
@@ -0,0 +1,310 @@
+"""
+Ingredient parsing and shopping-list micro-benchmarks
+Measures parse_ingredient, normalize_ingredients, aggregate_shopping_list and
+shopping_list_from_recipes on synthetic corpora built from the canonical and
+unit maps, reporting throughput (lines/s) and peak memory per corpus size
+
+Results are compared with stored baselines (baseline_ingredients.json next to
+this file); the run exits with status 1 when a benchmark is slower or uses
+more memory than its baseline by more than --threshold. Each sample runs
+the case repeatedly for at least MIN_SAMPLE_SECONDS and is paired with a
+pure-Python calibration loop taken around it; the median of the
+samples' throughput relative to their calibration is compared, so
+baselines recorded on one machine stay meaningful on a faster, slower or
+busier one. Corpora smaller than GATE_MIN_LINES are reported but never
+fail the run: their timings are dominated by noise.
+
+Usage:
+    python -m ai.benchmarks.bench_ingredients
+    python -m ai.benchmarks.bench_ingredients --sizes 1000,10000,100000,1000000
+    python -m ai.benchmarks.bench_ingredients --benchmarks parse_ingredient --threshold 0.1
+    python -m ai.benchmarks.bench_ingredients --update-baseline
+"""
+
+import argparse
+import copy
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ai.services import utils
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline_ingredients.json"
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+RECIPE_SIZE = 10  # ingredient lines per synthetic recipe
+# Memory growth below this is noise (allocator slack, interned strings)
+MEMORY_NOISE_KIB = 64
+# Each timing sample repeats the case until it has run this long
+MIN_SAMPLE_SECONDS = 0.2
+# Smaller corpora are reported but not checked against the baseline
+GATE_MIN_LINES = 10_000
+
+QUANTITIES = ["1", "2", "3", "4", "6", "1/2", "1/4", "3/4", "1 1/2", "2 1/2", "0.5", "1.5"] + [
+    str(n) for n in (50, 100, 125, 150, 200, 250, 300, 400, 500, 750, 1000)
+]
+
+
+# -------------------------
+# Corpus
+# -------------------------
+def make_corpus(n: int, seed: int = 11) -> List[str]:
+    """
+    n ingredient lines in the shapes LLMs and users produce
+
+    Names come from the canonical map and its variants, units from the unit
+    map's variations; a share of lines has no unit, no quantity or a unit
+    glued to the name, so every parsing branch is exercised.
+    """
+    rng = random.Random(seed)
+    names = list(utils.CANONICAL_INGREDIENTS) + [v for v, _ in utils._ING_VARIANTS]
+    units = [v for entry in utils.UNIT_MAP for v in entry.get("variations", [])]
+    lines = []
+    for _ in range(n):
+        roll = rng.random()
+        name = rng.choice(names)
+        qty = rng.choice(QUANTITIES)
+        if roll < 0.55:
+            lines.append(f"{qty} {rng.choice(units)} {name}")
+        elif roll < 0.65:
+            lines.append(f"{qty} {rng.choice(units)} of {name}")
+        elif roll < 0.85:
+            lines.append(f"{qty} {name}")
+        elif roll < 0.95:
+            lines.append(f"{name} to taste")
+        else:
+            lines.append(f"{qty}{rng.choice(units)}{name}")
+    return lines
+
+
+def as_recipes(lines: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {"title": f"Recipe {i // RECIPE_SIZE}", "ingredients": lines[i:i + RECIPE_SIZE]}
+        for i in range(0, len(lines), RECIPE_SIZE)
+    ]
+
+
+# -------------------------
+# Benchmarks: (prepare input from the corpus, function under test)
+# Preparation is excluded from timing and memory measurement.
+# -------------------------
+def _parse_all(lines: List[str]) -> None:
+    parse = utils.parse_ingredient
+    for line in lines:
+        parse(line)
+
+
+BENCHMARKS: Dict[str, Tuple[Callable[[List[str]], Any], Callable[[Any], Any]]] = {
+    "parse_ingredient": (lambda lines: lines, _parse_all),
+    "normalize_ingredients": (lambda lines: lines, utils.normalize_ingredients),
+    "aggregate_shopping_list": (as_recipes, utils.aggregate_shopping_list),
+    # shopping_list_from_recipes rewrites the recipes in place: fresh copy per run
+    "shopping_list_from_recipes": (lambda lines: copy.deepcopy(as_recipes(lines)), utils.shopping_list_from_recipes),
+}
+
+
+def _reset_caches() -> None:
+    """Start every measurement cold so repeats measure the same work"""
+    utils._PARSE_CACHE.clear()
+    utils._CLEAN_CACHE.clear()
+
+
+def calibrate(min_seconds: float = MIN_SAMPLE_SECONDS / 4) -> float:
+    """Operations per second of a fixed dict/str workload (machine speed reference)"""
+    words = [f"word{i}" for i in range(1000)]
+    operations, elapsed = 0, 0.0
+    while elapsed < min_seconds:
+        start = time.perf_counter()
+        counts: Dict[str, int] = {}
+        for _ in range(10):
+            for word in words:
+                key = word.lower().strip()
+                counts[key] = counts.get(key, 0) + 1
+        elapsed += time.perf_counter() - start
+        operations += 10 * len(words)
+    return operations / elapsed
+
+
+def _sample(prepare: Callable[[List[str]], Any], fn: Callable[[Any], Any], lines: List[str]) -> float:
+    """Lines per second of fn over at least MIN_SAMPLE_SECONDS of cold runs"""
+    runs, elapsed = 0, 0.0
+    while elapsed < MIN_SAMPLE_SECONDS:
+        data = prepare(lines)
+        _reset_caches()
+        gc.collect()
+        gc.disable()  # as timeit does: collections land on whichever run crosses the threshold
+        try:
+            start = time.perf_counter()
+            fn(data)
+            elapsed += time.perf_counter() - start
+        finally:
+            gc.enable()
+        runs += 1
+    return runs * len(lines) / elapsed
+
+
+def measure(name: str, lines: List[str], repeat: int, memory: bool = True) -> Dict[str, Any]:
+    """Median throughput (absolute and calibration-relative) and peak traced memory for one case"""
+    prepare, fn = BENCHMARKS[name]
+    throughputs, relatives, calibrations = [], [], []
+    for _ in range(repeat):
+        before = calibrate()
+        rate = _sample(prepare, fn, lines)
+        reference = (before + calibrate()) / 2
+        throughputs.append(rate)
+        relatives.append(rate / reference)
+        calibrations.append(reference)
+
+    rate = statistics.median(throughputs)
+    result = {
+        "lines": len(lines),
+        "seconds": round(len(lines) / rate, 6),
+        "lines_per_second": round(rate, 1),
+        "calibration": round(statistics.median(calibrations), 1),
+        "relative": round(statistics.median(relatives), 8),
+        "peak_kib": None,
+    }
+    if memory:
+        data = prepare(lines)
+        _reset_caches()
+        tracemalloc.start()
+        try:
+            fn(data)
+            result["peak_kib"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+# -------------------------
+# Baselines
+# -------------------------
+def _key(name: str, size: int) -> str:
+    return f"{name}@{size}"
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def relative_change(current: Dict[str, Any], expected: Dict[str, Any]) -> float:
+    """Calibration-normalized throughput change vs the baseline (-0.1 = 10% slower)"""
+    return current["relative"] / expected["relative"] - 1
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Optional[Dict[str, Any]],
+    threshold: float,
+) -> List[str]:
+    """
+    Check results against the baseline
+
+    Cases on corpora smaller than GATE_MIN_LINES, and baseline entries
+    recorded without a relative throughput, are skipped.
+
+    Returns:
+        One message per regression (empty when everything is within threshold)
+    """
+    if not baseline:
+        return []
+    regressions = []
+    for key, current in results.items():
+        expected = baseline["results"].get(key)
+        if expected is None or "relative" not in expected or current["lines"] < GATE_MIN_LINES:
+            continue
+        change = relative_change(current, expected)
+        if change < -threshold:
+            regressions.append(f"{key}: throughput {change:+.1%} vs baseline (allowed -{threshold:.0%})")
+        now_kib, base_kib = current.get("peak_kib"), expected.get("peak_kib")
+        if now_kib is not None and base_kib is not None:
+            if now_kib > base_kib * (1 + threshold) and now_kib - base_kib > MEMORY_NOISE_KIB:
+                regressions.append(
+                    f"{key}: peak memory {now_kib:,.0f} KiB > baseline {base_kib:,.0f} KiB + {threshold:.0%}"
+                )
+    return regressions
+
+
+def write_baseline(path: Path, results: Dict[str, Dict[str, Any]]) -> None:
+    """Record results as the baseline, keeping entries for cases not re-run"""
+    merged = dict((load_baseline(path) or {}).get("results", {}))
+    merged.update(results)
+    payload = {
+        "python": platform.python_version(),
+        "results": dict(sorted(merged.items())),
+    }
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+# -------------------------
+# CLI
+# -------------------------
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--sizes", type=lambda s: [int(float(v)) for v in s.split(",")], default=list(DEFAULT_SIZES),
+        help="comma-separated corpus sizes in lines (e.g. 1000,10000,1e6)",
+    )
+    parser.add_argument(
+        "--benchmarks", type=lambda s: [b.strip() for b in s.split(",") if b.strip()],
+        default=list(BENCHMARKS), help="comma-separated subset of: " + ", ".join(BENCHMARKS),
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="timing samples per case (the median is compared)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression, e.g. 0.25 = 25%%")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="record these results as the baseline")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    unknown = [b for b in args.benchmarks if b not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    baseline = None if args.update_baseline else load_baseline(args.baseline)
+
+    print(f"{'benchmark':28s} {'lines':>9s} {'lines/s':>12s} {'peak KiB':>10s} {'vs baseline':>12s}")
+    results: Dict[str, Dict[str, Any]] = {}
+    for size in args.sizes:
+        lines = make_corpus(size)
+        for name in args.benchmarks:
+            result = measure(name, lines, args.repeat, memory=not args.no_memory)
+            key = _key(name, size)
+            results[key] = result
+            expected = (baseline or {}).get("results", {}).get(key)
+            delta = f"{relative_change(result, expected):+.1%}" if expected and "relative" in expected else "-"
+            if delta != "-" and size < GATE_MIN_LINES:
+                delta = f"({delta})"  # reported, not gated
+            peak = f"{result['peak_kib']:,.0f}" if result["peak_kib"] is not None else "-"
+            print(f"{name:28s} {size:9d} {result['lines_per_second']:12,.0f} {peak:>10s} {delta:>12s}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump({"results": results}, fh, indent=2)
+    if args.update_baseline:
+        write_baseline(args.baseline, results)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if baseline is None:
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
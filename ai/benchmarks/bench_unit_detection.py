@@ -0,0 +1,122 @@
+"""
+Unit detection micro-benchmark
+Compares the old per-variant regex loop with the precompiled alternation
+
+Usage: python -m ai.benchmarks.bench_unit_detection [num_lines]
+"""
+
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+from ai.services import utils
+
+
+# -------------------------
+# Previous implementation (one regex per unit variant)
+# -------------------------
+def legacy_normalize_unit_in_text(text: str) -> str:
+    if not text:
+        return text
+    for var, canon in utils._UNIT_VARIANT_TO_CANON.items():
+        if re.search(r"\b" + re.escape(var) + r"\b", text, flags=re.IGNORECASE):
+            return re.sub(r"\b" + re.escape(var) + r"\b", canon, text, flags=re.IGNORECASE, count=1)
+    return text
+
+
+def legacy_extract_unit_if_any(text: str) -> Tuple[Optional[str], str]:
+    if not text:
+        return None, text
+    text_l = text.strip().lower()
+    tokens = text_l.split()
+    for length in (2, 1):
+        candidate = " ".join(tokens[:length])
+        if candidate in utils._UNIT_VARIANT_TO_CANON:
+            pattern = re.compile(re.escape(candidate), re.IGNORECASE)
+            original = text.strip()
+            m = pattern.match(original.lower())
+            if m:
+                remaining = original[m.end():].lstrip()
+            else:
+                remaining = pattern.sub("", original, count=1).lstrip()
+            return utils._UNIT_VARIANT_TO_CANON[candidate], remaining
+    return None, text
+
+
+def legacy_parse_unit(line: str) -> Tuple[Optional[str], str]:
+    """Unit detection part of the old parse_ingredient (prefix, then fallback loop)"""
+    _, remaining = utils._parse_quantity(line.strip())
+    unit, name = legacy_extract_unit_if_any(remaining)
+    if unit is None:
+        for var, canon in utils._UNIT_VARIANT_TO_CANON.items():
+            if var in name.lower():
+                unit = canon
+                name = re.sub(r"\b" + re.escape(var) + r"\b", "", name, flags=re.IGNORECASE).strip()
+                break
+    return unit, name
+
+
+# -------------------------
+# Current implementation (single alternation pass)
+# -------------------------
+def current_parse_unit(line: str) -> Tuple[Optional[str], str]:
+    """Unit detection part of the current parse_ingredient"""
+    _, remaining = utils._parse_quantity(line.strip())
+    unit, name = utils._extract_unit_if_any(remaining)
+    if unit is None:
+        m = utils._UNIT_RE.search(name)
+        if m:
+            unit = utils._unit_canon(m)
+            name = utils._WS_RE.sub(" ", name[:m.start()] + name[m.end():]).strip()
+    return unit, name
+
+
+def make_lines(n: int, seed: int = 7) -> List[str]:
+    """Build realistic ingredient lines from the bundled canonical and unit maps"""
+    rng = random.Random(seed)
+    names = list(utils.CANONICAL_INGREDIENTS) + [v for v, _ in utils._ING_VARIANTS]
+    units = [v for entry in utils.UNIT_MAP for v in entry.get("variations", [])]
+    qtys = ["1", "2", "3", "1/2", "1 1/2", "0.5", "250", "400"]
+    lines = []
+    for _ in range(n):
+        roll = rng.random()
+        name = rng.choice(names)
+        if roll < 0.6:
+            lines.append(f"{rng.choice(qtys)} {rng.choice(units)} {name}")
+        elif roll < 0.85:
+            lines.append(f"{rng.choice(qtys)} {name}")
+        else:
+            lines.append(f"{name} to taste")
+    return lines
+
+
+def _time(fn: Callable[[str], object], lines: List[str], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n: int = 5000) -> None:
+    lines = make_lines(n)
+    cases = [
+        ("normalize_unit_in_text", legacy_normalize_unit_in_text, utils.normalize_unit_in_text),
+        ("parse_ingredient unit detection", legacy_parse_unit, current_parse_unit),
+    ]
+    print(f"{n} lines, {len(utils._UNIT_VARIANT_TO_CANON)} unit variants")
+    for label, before, after in cases:
+        t_before = _time(before, lines)
+        t_after = _time(after, lines)
+        print(
+            f"{label:32s} before {t_before * 1e6 / n:7.2f} us/line   "
+            f"after {t_after * 1e6 / n:7.2f} us/line   x{t_before / t_after:5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
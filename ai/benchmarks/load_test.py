@@ -0,0 +1,232 @@
+"""
+Load benchmark for the AI orchestrator endpoints
+Drives /ai/suggest-meal, /ai/extract-recipe and /ai/generate-shopping-list
+at a fixed concurrency and reports throughput and p50/p95/p99 latency
+
+By default the app runs in-process (httpx ASGI transport) against the local
+fake provider, so the numbers are the orchestrator's own overhead plus the
+configured fake latency. Pass --url to load a running server instead.
+
+Usage:
+    python -m ai.benchmarks.load_test
+    python -m ai.benchmarks.load_test --requests 2000 --concurrency 50 --latency lognormal:300,0.5
+    python -m ai.benchmarks.load_test --error-rate 0.05 --malformed-rate 0.1 --json report.json
+    python -m ai.benchmarks.load_test --url http://127.0.0.1:8000 --endpoints suggest-meal
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+DISHES = ["Carbonara", "Chili", "Curry", "Frittata", "Risotto", "Tacos", "Minestrone"]
+INGREDIENTS = [
+    "2 tomatoes", "1 tablespoon olive oil", "1 cup rice", "200g chicken breast", "2 cloves garlic",
+    "1 onion", "400g spaghetti", "3 eggs", "100g parmesan", "1 tsp salt", "2 carrots", "1 cup milk",
+]
+
+
+def suggest_meal_payload(i: int) -> Dict[str, Any]:
+    # Vary the request so concurrent calls are not all coalesced into one
+    return {
+        "meal_type": MEAL_TYPES[i % len(MEAL_TYPES)],
+        "num_people": 1 + i % 6,
+        "time_available": 15 + (i * 7) % 90,
+        "preferences": f"variation {i}",
+    }
+
+
+def extract_recipe_payload(i: int) -> Dict[str, Any]:
+    lines = [f"{DISHES[i % len(DISHES)]} #{i}", "", "Ingredients:"]
+    lines += [f"- {INGREDIENTS[(i + k) % len(INGREDIENTS)]}" for k in range(6)]
+    lines += ["", "Steps:"] + [f"{k}. Step {k} of the method" for k in range(1, 6)]
+    return {"recipe_text": "\n".join(lines)}
+
+
+def shopping_list_payload(i: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "title": f"Recipe {i}-{r}",
+            "ingredients": [INGREDIENTS[(i + r + k) % len(INGREDIENTS)] for k in range(8)],
+        }
+        for r in range(5)
+    ]
+
+
+ENDPOINTS: Dict[str, Any] = {
+    "suggest-meal": ("/ai/suggest-meal", suggest_meal_payload),
+    "extract-recipe": ("/ai/extract-recipe", extract_recipe_payload),
+    "generate-shopping-list": ("/ai/generate-shopping-list", shopping_list_payload),
+}
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient,
+    path: str,
+    payload: Callable[[int], Any],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    """Send `requests` POSTs with `concurrency` workers; returns the summary"""
+    for i in range(warmup):
+        await client.post(path, json=payload(-1 - i))
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < requests:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload(i))
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": len(latencies) - ok,
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": _ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "max_ms": _ms(latencies[-1]) if latencies else None,
+    }
+
+
+def in_process_app(args: argparse.Namespace):
+    """The FastAPI app wired to the fake provider with the requested behaviour"""
+    os.environ["USE_FAKE_LLM"] = "true"
+    from ai.app import main
+    from ai.services.llm_client import AsyncLLMClient
+
+    main.settings.use_fake_llm = True
+    main.settings.fake_llm_latency = args.latency
+    main.settings.fake_llm_error_rate = args.error_rate
+    main.settings.fake_llm_malformed_rate = args.malformed_rate
+    main.settings.fake_llm_seed = args.seed
+    main.llm_client = AsyncLLMClient()
+    main.response_cache = None  # measure the full path, not cache hits
+    return main.app
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.url:
+        transport, base_url = None, args.url.rstrip("/")
+    else:
+        transport, base_url = httpx.ASGITransport(app=in_process_app(args)), "http://bench"
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    report: Dict[str, Any] = {
+        "target": args.url or "in-process (fake provider)",
+        "fake_provider": None if args.url else {
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "malformed_rate": args.malformed_rate,
+            "seed": args.seed,
+        },
+        "endpoints": {},
+    }
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        for name in args.endpoints:
+            path, payload = ENDPOINTS[name]
+            report["endpoints"][name] = await run_endpoint(
+                client, path, payload, args.requests, args.concurrency, args.warmup
+            )
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"target: {report['target']}")
+    if report["fake_provider"]:
+        fake = report["fake_provider"]
+        print(
+            f"fake provider: latency={fake['latency']} error_rate={fake['error_rate']} "
+            f"malformed_rate={fake['malformed_rate']} seed={fake['seed']}"
+        )
+    print(
+        f"{'endpoint':24s} {'reqs':>6s} {'conc':>5s} {'errors':>6s} {'req/s':>9s} "
+        f"{'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}"
+    )
+    for name, r in report["endpoints"].items():
+        print(
+            f"{name:24s} {r['requests']:6d} {r['concurrency']:5d} {r['errors']:6d} {r['throughput_rps']:9.1f} "
+            f"{r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['max_ms']:9.2f}"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per endpoint")
+    parser.add_argument(
+        "--endpoints", type=lambda s: [e.strip() for e in s.split(",") if e.strip()],
+        default=list(ENDPOINTS), help="comma-separated subset of: " + ", ".join(ENDPOINTS),
+    )
+    parser.add_argument("--url", help="load a running server instead of the in-process app")
+    parser.add_argument("--latency", default="fixed:50", help="fake provider latency (FAKE_LLM_LATENCY syntax)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--log-level", default="ERROR", help="app log level while loading")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    unknown = [e for e in args.endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)  # keep per-request logs out of the timings
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# app/services/cache.py
+"""
+In-process caches shared by the AI services.
+
+- LRUCache: size-bounded, thread-safe least-recently-used cache with
+  hit/miss/eviction counters. Used by utils.py to memoize parsed
+  ingredient lines.
+- ResponseCache: TTL + size-bounded cache for LLM endpoint responses, on
+  top of a pluggable backend (MemoryBackend or SQLiteBackend).
+"""
+
+import abc
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Size-bounded LRU cache safe to share between threads
+
+    Values are stored as given; callers that hand out cached objects should
+    store immutable values so one caller cannot corrupt another's result.
+
+    A cache can be tied to a "generation" (any comparable token, e.g. a
+    data version). When get_or_compute is called with a different
+    generation than the one the entries were computed under, the cache is
+    cleared first.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Args:
+            maxsize: Maximum number of entries; 0 disables caching
+        """
+        self.maxsize = max(0, int(maxsize))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        generation: Any = None,
+    ) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the value
+            generation: Data version the value depends on; a change clears the cache
+
+        Returns:
+            The cached or freshly computed value
+        """
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    self._data.clear()
+                    self._generation = generation
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # computed outside the lock; a concurrent duplicate is harmless
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Return counters for monitoring"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# -------------------------
+# Response cache (TTL + size bound, pluggable storage)
+# -------------------------
+class CacheBackend(abc.ABC):
+    """
+    Storage interface used by ResponseCache
+
+    Backends store (value, expires_at) pairs and enforce their own size
+    bound, evicting least recently used entries first.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        """Store a value; returns the number of entries evicted to make room"""
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend; values are kept as Python objects"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(1, int(max_entries))
+        self._data: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    On-disk backend; survives restarts and can be shared by workers on one host
+
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024):
+        self.max_entries = max(1, int(max_entries))
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS response_cache_accessed ON response_cache (accessed_at)"
+        )
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key IN ("
+                    " SELECT key FROM response_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                return overflow
+        return 0
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+        return count
+
+
+class ResponseCache:
+    """
+    TTL cache for endpoint responses with hit/miss statistics
+
+    Keys are built with make_cache_key() from a normalized request payload,
+    so requests that differ only in ordering or whitespace share an entry.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: float = 3600):
+        self.backend = backend
+        self.ttl_seconds = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.backend.get(key)
+        if entry is not None and entry[1] < time.time():
+            self.backend.delete(key)
+            entry = None
+            with self._lock:
+                self.expirations += 1
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any) -> None:
+        evicted = self.backend.set(key, value, time.time() + self.ttl_seconds)
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "size": len(self.backend),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+
+def make_cache_key(namespace: str, payload: Dict[str, Any]) -> str:
+    """
+    Build a stable key from a namespace and a JSON-serializable payload
+
+    Args:
+        namespace: Endpoint or purpose, e.g. "suggest-meal"
+        payload: Already-normalized request fields
+
+    Returns:
+        "namespace:sha256-hex" key
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return f"{namespace}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+def build_response_cache(
+    backend: str = "memory",
+    ttl_seconds: float = 3600,
+    max_entries: int = 1024,
+    sqlite_path: str = "",
+) -> ResponseCache:
+    """
+    Create a ResponseCache from config values
+
+    Args:
+        backend: "memory" or "sqlite"
+        ttl_seconds: Entry lifetime
+        max_entries: Size bound before LRU eviction
+        sqlite_path: Database file for the sqlite backend
+    """
+    backend = (backend or "memory").strip().lower()
+    if backend == "memory":
+        store: CacheBackend = MemoryBackend(max_entries)
+    elif backend == "sqlite":
+        store = SQLiteBackend(sqlite_path or "response_cache.sqlite3", max_entries)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend!r} (expected 'memory' or 'sqlite')")
+    return ResponseCache(store, ttl_seconds)
@@ -0,0 +1,343 @@
+# app/services/fake_provider.py
+"""
+Local stand-in for the OpenAI/Groq chat completion APIs.
+
+With USE_FAKE_LLM=true the LLM client talks to FakeLLM instead of a real
+provider, so tests and load benchmarks run offline, cost nothing and
+measure only the orchestrator's own overhead. FakeLLM mimics the SDK
+surface the client uses (chat.completions.create, usage, streaming) and
+answers each prompt kind with a plausible JSON body:
+
+- meal suggestion / batch prompts: a recipe sized to the slot's servings
+  and time limit
+- extraction prompts: title, "-" bullet ingredients and numbered steps
+  lifted from the recipe text
+- supportive message and connection test prompts
+
+Like providers with prompt-prefix caching, usage reports a system message
+seen before as cached (usage.prompt_tokens_details.cached_tokens).
+
+Provider behaviour is configurable and reproducible for a given seed and
+call order:
+
+- FAKE_LLM_LATENCY: "0", "fixed:50", "uniform:20,200" or
+  "lognormal:300,0.5" (milliseconds; lognormal takes median and sigma)
+- FAKE_LLM_ERROR_RATE: share of calls failing with a 503, 429 or 408
+- FAKE_LLM_MALFORMED_RATE: share of answers that are fenced, wrapped in
+  prose, carry trailing commas, are truncated or are not JSON at all
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from ai.app.config import settings
+from ai.services.tokens import estimate_tokens
+
+MODEL_NAME = "fake-chef-1"
+
+_BATCH_SLOT_RE = re.compile(r"^\d+\.\s+(\w+) for (\d+) people, max (\d+) minutes", re.MULTILINE)
+_MEAL_RE = re.compile(r"Suggest an? (\w+) recipe")
+_SERVINGS_RE = re.compile(r"Servings:\s*(\d+)")
+_TIME_RE = re.compile(r"Total time available:\s*(\d+)")
+_RECIPE_TEXT_RE = re.compile(r"RECIPE TEXT:\n(.*?)(?:\n\s*YOUR TASK:|\Z)", re.DOTALL)
+_BULLET_RE = re.compile(r"^\s*[-*•]\s*(.+?)\s*$")
+_STEP_RE = re.compile(r"^\s*\d+[.)]\s*(.+?)\s*$")
+_INLINE_STEP_RE = re.compile(r"\d+[.)]\s*")
+_MINUTES_RE = re.compile(r"(prep|cook)(?:ing)?\s*time\s*[:=]?\s*(\d+)", re.IGNORECASE)
+
+# (ingredient, quantity per serving, unit)
+_PANTRY = [
+    ("chicken breast", 1, ""),
+    ("rice", 0.5, "cup"),
+    ("olive oil", 1, "tablespoon"),
+    ("garlic cloves", 1, ""),
+    ("onion", 0.5, ""),
+    ("canned tomatoes", 100, "g"),
+    ("pasta", 100, "g"),
+    ("broccoli florets", 0.5, "cup"),
+    ("eggs", 1, ""),
+    ("cheddar cheese", 25, "g"),
+    ("carrots", 1, ""),
+    ("soy sauce", 1, "teaspoon"),
+]
+_DISHES = ["Stir-Fry", "Pasta Bake", "Rice Bowl", "Skillet", "Soup", "Frittata", "Traybake"]
+_MESSAGES = [
+    "Planning ahead like this gives you back mental space for the things that matter most.",
+    "Every meal you map out now is one less decision at the end of a long day.",
+    "Taking time to organize your meals is an investment in calmer, easier days ahead.",
+]
+_ERROR_STATUSES = (503, 429, 408)
+_MALFORMED_KINDS = ("fenced", "prose", "trailing_comma", "truncated", "garbage")
+
+
+class FakeAPIError(Exception):
+    """Provider-style HTTP error (exposes status_code and response like the SDK errors)"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.status_code = status_code
+        self.response = httpx.Response(status_code, headers=headers)
+        super().__init__(f"Fake provider returned HTTP {status_code}")
+
+
+def parse_latency(spec: str) -> Tuple[str, Tuple[float, ...]]:
+    """
+    Parse a FAKE_LLM_LATENCY value
+
+    Returns:
+        (distribution, parameters in milliseconds)
+
+    Raises:
+        ValueError: If the spec is not one of the supported forms
+    """
+    spec = (spec or "0").strip().lower()
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "fixed", kind
+    try:
+        values = tuple(float(v) for v in params.split(","))
+    except ValueError:
+        raise ValueError(f"Invalid FAKE_LLM_LATENCY: {spec!r}")
+    expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+    if kind not in expected or len(values) != expected[kind] or min(values) < 0:
+        raise ValueError(
+            f"Invalid FAKE_LLM_LATENCY: {spec!r}. "
+            "Use 'fixed:MS', 'uniform:MIN,MAX' or 'lognormal:MEDIAN,SIGMA'."
+        )
+    return kind, values
+
+
+class FakeLLM:
+    """
+    SDK-shaped fake provider client
+
+    Args:
+        asynchronous: Await-based create() (like AsyncGroq) instead of blocking
+        latency: Latency spec (see parse_latency)
+        error_rate: Probability that a call raises FakeAPIError
+        malformed_rate: Probability that a successful answer is malformed
+        seed: Seed for every random draw (latency, errors, content)
+    """
+
+    def __init__(
+        self,
+        asynchronous: bool = False,
+        latency: str = "0",
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int = 42,
+    ):
+        self.asynchronous = asynchronous
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.malformed = 0
+        self._seen_prefixes: set = set()
+        create = self._acreate if asynchronous else self._create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    # -------------------------
+    # SDK surface
+    # -------------------------
+    def _create(
+        self, messages: List[Dict[str, str]], stream: bool = False, max_tokens: Optional[int] = None, **kwargs
+    ):
+        delay, error, content = self._plan(messages, max_tokens)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        if stream:
+            return iter(self._chunks(content))
+        return self._completion(messages, content, max_tokens)
+
+    async def _acreate(
+        self, messages: List[Dict[str, str]], stream: bool = False, max_tokens: Optional[int] = None, **kwargs
+    ):
+        delay, error, content = self._plan(messages, max_tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        if stream:
+            return self._astream(content)
+        return self._completion(messages, content, max_tokens)
+
+    async def _astream(self, content: str) -> AsyncIterator[Any]:
+        for chunk in self._chunks(content):
+            await asyncio.sleep(0)
+            yield chunk
+
+    @staticmethod
+    def _chunks(content: str, size: int = 16) -> List[Any]:
+        return [
+            SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))])
+            for i in range(0, len(content), size)
+        ]
+
+    def _completion(self, messages: List[Dict[str, str]], content: str, max_tokens: Optional[int] = None) -> Any:
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        finish_reason = "length" if max_tokens is not None and completion_tokens >= max_tokens else "stop"
+        prefix = messages[0].get("content", "") if len(messages) > 1 else ""
+        with self._lock:
+            cached_tokens = estimate_tokens(prefix) if prefix in self._seen_prefixes else 0
+            self._seen_prefixes.add(prefix)
+        return SimpleNamespace(
+            model=MODEL_NAME,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+            ),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "malformed": self.malformed}
+
+    # -------------------------
+    # Behaviour
+    # -------------------------
+    def _plan(
+        self, messages: List[Dict[str, str]], max_tokens: Optional[int] = None
+    ) -> Tuple[float, Optional[FakeAPIError], str]:
+        """Draw latency, failure and answer for one call under a single lock"""
+        # Templates keep their rules and schema in the system message
+        prompt = "\n\n".join(m.get("content", "") for m in messages)
+        with self._lock:
+            self.calls += 1
+            delay = self._sample_latency()
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                status = self._rng.choice(_ERROR_STATUSES)
+                return delay, FakeAPIError(status, retry_after=0 if status == 429 else None), ""
+            content = json.dumps(self._answer(prompt))
+            if self._rng.random() < self.malformed_rate:
+                self.malformed += 1
+                content = self._malform(content, self._rng.choice(_MALFORMED_KINDS))
+        if max_tokens is not None:
+            # Cut off like a provider hitting max_tokens (finish_reason "length")
+            tokens = estimate_tokens(content)
+            if tokens > max_tokens:
+                content = content[: len(content) * max_tokens // tokens]
+        return delay, None, content
+
+    def _sample_latency(self) -> float:
+        kind, params = self.latency
+        if kind == "fixed":
+            ms = params[0]
+        elif kind == "uniform":
+            ms = self._rng.uniform(params[0], params[1])
+        else:
+            median, sigma = params
+            ms = median * math.exp(self._rng.gauss(0.0, sigma)) if median else 0.0
+        return ms / 1000.0
+
+    @staticmethod
+    def _malform(content: str, kind: str) -> str:
+        if kind == "fenced":
+            return f"```json\n{content}\n```"
+        if kind == "prose":
+            return f"Here is your recipe:\n{content}\nEnjoy!"
+        if kind == "trailing_comma":
+            return content[:-1] + ",}" if content.endswith("}") else content
+        if kind == "truncated":
+            return content[: max(1, int(len(content) * 0.8))]
+        return "I'm sorry, I can't help with that request."
+
+    def _answer(self, prompt: str) -> Dict[str, Any]:
+        if '"status": "connected"' in prompt:
+            return {"status": "connected", "test": True}
+        if "RECIPE TEXT:" in prompt:
+            return self._extracted_recipe(prompt)
+        if '"message"' in prompt and "supportive" in prompt:
+            return {"message": self._rng.choice(_MESSAGES)}
+        if '"recipes"' in prompt:
+            slots = _BATCH_SLOT_RE.findall(prompt)
+            return {"recipes": [self._recipe(m, int(n), int(t)) for m, n, t in slots]}
+        meal = _MEAL_RE.search(prompt)
+        servings = _SERVINGS_RE.search(prompt)
+        minutes = _TIME_RE.search(prompt)
+        return self._recipe(
+            meal.group(1) if meal else "dinner",
+            int(servings.group(1)) if servings else 2,
+            int(minutes.group(1)) if minutes else 30,
+        )
+
+    def _recipe(self, meal_type: str, servings: int, minutes: int) -> Dict[str, Any]:
+        picks = self._rng.sample(_PANTRY, 5)
+        ingredients = []
+        for name, per_serving, unit in picks:
+            qty = per_serving * max(1, servings)
+            qty_text = f"{qty:g}"
+            ingredients.append(f"{qty_text} {unit} {name}" if unit else f"{qty_text} {name}")
+        main = picks[0][0].split()[0].title()
+        prep = max(1, minutes // 3)
+        return {
+            "title": f"{main} {self._rng.choice(_DISHES)} ({meal_type})",
+            "ingredients": ingredients,
+            "steps": [
+                f"Prepare the {picks[0][0]} and {picks[1][0]}",
+                f"Cook everything with the {picks[2][0]} until done",
+                f"Serve {servings} portions warm",
+            ],
+            "prep_time": prep,
+            "cook_time": max(1, minutes - prep),
+        }
+
+    @staticmethod
+    def _extracted_recipe(prompt: str) -> Dict[str, Any]:
+        match = _RECIPE_TEXT_RE.search(prompt)
+        lines = [line.strip() for line in (match.group(1) if match else "").splitlines()]
+        lines = [line for line in lines if line]
+        title = lines[0] if lines else "Untitled Recipe"
+        ingredients: List[str] = []
+        steps: List[str] = []
+        times: Dict[str, Optional[int]] = {"prep": None, "cook": None}
+        for line in lines[1:]:
+            for label, value in _MINUTES_RE.findall(line):
+                times[label.lower()] = int(value)
+            bullet = _BULLET_RE.match(line)
+            step = _STEP_RE.match(line)
+            lowered = line.lower()
+            if bullet:
+                ingredients.append(bullet.group(1))
+            elif lowered.startswith("ingredients:") and line.partition(":")[2].strip():
+                ingredients += [i.strip() for i in line.partition(":")[2].split(",") if i.strip()]
+            elif lowered.startswith("steps:") and line.partition(":")[2].strip():
+                steps += [s.strip() for s in _INLINE_STEP_RE.split(line.partition(":")[2]) if s.strip()]
+            elif step:
+                steps.append(step.group(1))
+        return {
+            "title": title,
+            "ingredients": ingredients or ["1 serving of the main ingredient"],
+            "steps": steps or ["Follow the original recipe"],
+            "prep_time": times["prep"],
+            "cook_time": times["cook"],
+        }
+
+
+def build_fake_client(asynchronous: bool = False) -> FakeLLM:
+    """FakeLLM configured from settings (FAKE_LLM_*)"""
+    return FakeLLM(
+        asynchronous=asynchronous,
+        latency=settings.fake_llm_latency,
+        error_rate=settings.fake_llm_error_rate,
+        malformed_rate=settings.fake_llm_malformed_rate,
+        seed=settings.fake_llm_seed,
+    )
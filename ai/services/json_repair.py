@@ -0,0 +1,178 @@
+# app/services/json_repair.py
+"""
+Local repair of almost-JSON LLM output.
+
+Models without response_format enforcement (Groq) regularly wrap the JSON
+in a markdown fence, add a sentence before it, leave a trailing comma or
+stop mid-array when they hit max_tokens. Re-asking the provider costs a
+full completion; most of these can be fixed here in microseconds:
+
+- strip ``` / ```json fences
+- keep only the outermost {...} object (drop prose around it)
+- remove trailing commas before } and ]
+- close a truncated string / array / object, dropping a dangling
+  partial entry if needed
+
+repair_json only runs after a strict parse failed, so valid output never
+pays for it. Counters are kept so monitoring can show how many provider
+retries the repair avoided.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {
+    "attempts": 0,
+    "repaired": 0,
+    "failed": 0,
+    "fences": 0,
+    "extracted": 0,
+    "trailing_commas": 0,
+    "truncated": 0,
+}
+
+
+def _strip_fences(text: str) -> str:
+    start = text.find("```")
+    if start < 0:
+        return text
+    body_start = text.find("\n", start)
+    if body_start < 0:
+        return text[start + 3:]
+    end = text.find("```", body_start)
+    return text[body_start + 1:end if end >= 0 else len(text)]
+
+
+def _remove_trailing_comma(out: List[str]) -> bool:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+        return True
+    return False
+
+
+def _scan(text: str) -> Tuple[str, int, bool, int, List[Tuple[int, Tuple[str, ...]]], Optional[List[str]]]:
+    """
+    Copy the outermost object from text, dropping trailing commas
+
+    Returns:
+        (copied text, characters of text consumed, still inside a string
+        at the end, trailing commas removed, safe cut points, open
+        containers at the end or None if the object was closed)
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = escape = False
+    commas = 0
+    for i, ch in enumerate(text):
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            commas += _remove_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                return "".join(out), i + 1, False, commas, cuts, None
+            continue
+        elif ch == ",":
+            # everything before this comma is a complete entry
+            cuts.append((len(out), tuple(stack)))
+        out.append(ch)
+    return "".join(out), len(text), in_string, commas, cuts, stack
+
+
+def _close(body: str, stack) -> str:
+    return body + "".join(reversed(stack))
+
+
+def repair_json(content: str) -> Tuple[Any, List[str]]:
+    """
+    Parse LLM output that strict JSON parsing rejected
+
+    Args:
+        content: Raw completion text
+
+    Returns:
+        (parsed value, names of the fixes applied)
+
+    Raises:
+        ValueError: If the text cannot be turned into valid JSON
+    """
+    fixes: List[str] = []
+    text = content
+    if "```" in text:
+        text = _strip_fences(text)
+        fixes.append("fences")
+
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object found in LLM output")
+    if text[:start].strip():
+        fixes.append("extracted")
+
+    body, end, in_string, commas, cuts, stack = _scan(text[start:])
+    if commas:
+        fixes.append("trailing_commas")
+    if stack is None:
+        if text[start + end:].strip() and "extracted" not in fixes:
+            fixes.append("extracted")
+        return orjson.loads(body), fixes
+
+    # Truncated: first try closing what is open, then fall back to cutting
+    # at the last complete entry (drops e.g. a half-written key or literal)
+    fixes.append("truncated")
+    if in_string:
+        if body.endswith("\\"):
+            body = body[:-1]
+        body += '"'
+    candidates = [_close(body.rstrip().rstrip(","), stack)]
+    candidates += [_close(body[:pos], open_) for pos, open_ in reversed(cuts[-3:])]
+    for candidate in candidates:
+        try:
+            return orjson.loads(candidate), fixes
+        except orjson.JSONDecodeError:
+            continue
+    raise ValueError("Truncated JSON could not be closed")
+
+
+def record_repair(fixes: Optional[List[str]]) -> None:
+    """Count one repair attempt; fixes is None when the repair failed"""
+    with _stats_lock:
+        _stats["attempts"] += 1
+        if fixes is None:
+            _stats["failed"] += 1
+            return
+        _stats["repaired"] += 1
+        for fix in fixes:
+            _stats[fix] += 1
+
+
+def json_repair_stats() -> Dict[str, int]:
+    """
+    Return repair counters for monitoring
+
+    "repaired" is the number of provider retries avoided; the per-fix
+    counts show which problems the models produce most.
+    """
+    with _stats_lock:
+        return dict(_stats)
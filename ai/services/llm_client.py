@@ -1,80 +1,525 @@
 """
 LLM Client - Wrapper for OpenAI/Groq API calls
 Handles retries, error handling, and JSON validation
+
+Failures are classified (see services/retry.py): fatal errors such as bad
+credentials are returned at once, retryable ones back off with jitter
+within a process-wide retry budget, and each provider has a circuit
+breaker so an outage fails fast instead of burning MAX_RETRIES timeouts.
+
+Two flavours are provided:
+- LLMClient: blocking client for scripts and tests
+- AsyncLLMClient: awaitable client used by the FastAPI routes so a slow
+  provider round-trip never blocks the event loop
 """
 
 import os
+import copy
 import json
 import time
-from typing import Dict, Any
+import asyncio
+import hashlib
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
+import httpx
+import orjson
 import logging
 
+from ai.app.config import settings
+from ai.services.json_repair import record_repair, repair_json
+from ai.services.metrics import (
+    LLM_ATTEMPTS,
+    LLM_CALL_SECONDS,
+    LLM_IN_FLIGHT,
+    LLM_RETRIES,
+    record_usage,
+)
+from ai.services.tokens import TokenPlan, plan_tokens
+from ai.services.tracing import Trace, adopt, record_llm_usage, run_in_trace, span, stage
+from ai.services.retry import (
+    PROVIDER_FAILURES,
+    RETRYABLE_ERRORS,
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderUnavailableError,
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+)
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+# -------------------------
+# Shared HTTP connection pool
+# -------------------------
+_HTTP_CLIENTS: Dict[bool, Any] = {}
+
+
+def _http2_enabled() -> bool:
+    if not settings.http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("HTTP2 is enabled but the 'h2' package is missing; using HTTP/1.1")
+        return False
+
+
+def get_http_client(asynchronous: bool = False):
+    """
+    Return the process-wide httpx client injected into provider SDK clients
+    
+    One pool per flavour (sync/async) means every LLMClient in the process
+    reuses the same warm keep-alive connections instead of paying a TLS
+    handshake per burst. Pool size, keep-alive expiry and HTTP/2 come from
+    Settings (HTTP_* env vars).
+    
+    Args:
+        asynchronous: Return the httpx.AsyncClient instead of httpx.Client
+    """
+    client = _HTTP_CLIENTS.get(asynchronous)
+    if client is None:
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        timeout = httpx.Timeout(settings.timeout_seconds, connect=settings.http_connect_timeout)
+        http2 = _http2_enabled()
+        if asynchronous:
+            transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+            client = httpx.AsyncClient(transport=transport, timeout=timeout)
+        else:
+            transport = httpx.HTTPTransport(limits=limits, http2=http2)
+            client = httpx.Client(transport=transport, timeout=timeout)
+        _HTTP_CLIENTS[asynchronous] = client
+        logger.info(
+            f"HTTP pool created (async={asynchronous}, max={settings.http_max_connections}, "
+            f"keepalive={settings.http_max_keepalive_connections}, http2={http2})"
+        )
+    return client
+
+
+# Shared by every client in the process so retries are bounded globally
+RETRY_BUDGET = RetryBudget(
+    ratio=settings.retry_budget_ratio,
+    min_per_second=settings.retry_budget_min_per_second,
+    window_seconds=settings.retry_budget_window_seconds,
+)
+
+
+# Base system message. Prompt templates (ai/app/prompts.py) extend it with
+# their static rules so each template's system message is a stable prefix.
+SYSTEM_PROMPT = (
+    "You are a helpful cooking assistant that ALWAYS responds with valid JSON. "
+    "Never include explanations or text outside the JSON structure. "
+    "Be practical, family-friendly, and considerate of busy parents."
+)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to capacity tokens, refilled continuously
+    
+    The level may go negative when a call turns out to cost more than was
+    reserved (see RateLimiter.reconcile); the debt is paid off by refill.
+    """
+    
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self._updated = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+    
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount tokens are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+    
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+
+class RateLimitExceeded(ProviderUnavailableError):
+    """The client-side rate limiter shed this call (queue full or wait too long)"""
+
+
+class RateLimiter:
+    """
+    Client-side governor for one provider's quotas
+    
+    Callers are admitted in arrival order (FIFO) once the request bucket
+    (requests per minute), the token bucket (estimated tokens per minute)
+    and the concurrency cap all allow it. A caller that cannot be admitted
+    within max_wait_seconds, or that arrives when max_queue callers are
+    already waiting, gets RateLimitExceeded (HTTP 503) right away instead
+    of being sent to the provider to collect a 429.
+    
+    A limit of 0 disables that dimension; with all three at 0 the limiter
+    is a no-op. Only the async client is governed.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 0,
+        max_queue: int = 100,
+        max_wait_seconds: float = 10.0,
+        name: str = "llm",
+    ):
+        self.name = name
+        self.requests = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+            if requests_per_minute > 0 else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+            if tokens_per_minute > 0 else None
+        )
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.enabled = bool(self.requests or self.tokens or max_concurrency > 0)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._loop = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._released: Optional[asyncio.Event] = None
+    
+    def _primitives(self):
+        # asyncio primitives belong to one event loop; rebuild them if the
+        # limiter is used from a new loop (e.g. separate test runs)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._released = asyncio.Event()
+        return loop, self._lock, self._released
+    
+    def _quota_wait(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.time_until(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.time_until(tokens))
+        return wait
+    
+    def _reject(self, reason: str, retry_after: Optional[float] = None) -> RateLimitExceeded:
+        self.rejected += 1
+        logger.warning(f"Rate limiter for {self.name} shed a call: {reason}")
+        return RateLimitExceeded(f"{self.name} rate limit: {reason}", retry_after=retry_after)
+    
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait (FIFO) until a call costing the given tokens may start
+        
+        Raises:
+            RateLimitExceeded: If the queue is full or admission would take
+                longer than max_wait_seconds
+        """
+        if not self.enabled:
+            return
+        if self.waiting >= self.max_queue:
+            raise self._reject("queue full", retry_after=self.max_wait_seconds)
+        
+        loop, lock, released = self._primitives()
+        deadline = loop.time() + self.max_wait_seconds
+        self.waiting += 1
+        try:
+            if lock.locked():
+                try:
+                    await asyncio.wait_for(lock.acquire(), self.max_wait_seconds)
+                except asyncio.TimeoutError:
+                    raise self._reject("queue wait exceeded", retry_after=self.max_wait_seconds)
+            else:
+                await lock.acquire()  # uncontended: no timer task needed
+            try:
+                while self.max_concurrency and self.in_flight >= self.max_concurrency:
+                    released.clear()
+                    try:
+                        await asyncio.wait_for(released.wait(), max(0.0, deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        raise self._reject("too many calls in flight", retry_after=self.max_wait_seconds)
+                
+                wait = self._quota_wait(tokens)
+                if loop.time() + wait > deadline:
+                    raise self._reject("quota exhausted", retry_after=wait)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if self.requests is not None:
+                    self.requests.consume(1)
+                if self.tokens is not None:
+                    self.tokens.consume(min(tokens, self.tokens.capacity))
+                self.in_flight += 1
+                self.admitted += 1
+            finally:
+                lock.release()
+        finally:
+            self.waiting -= 1
+    
+    def release(self) -> None:
+        """Mark an admitted call as finished"""
+        if not self.enabled:
+            return
+        self.in_flight -= 1
+        if self._released is not None:
+            self._released.set()
+    
+    def reconcile(self, estimated: int, actual: Optional[int]) -> None:
+        """Charge (or refund) the difference once the provider reports real usage"""
+        if self.tokens is not None and actual is not None:
+            self.tokens.consume(actual - min(estimated, self.tokens.capacity))
+    
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        """async with limiter.slot(n): ... — acquire, then always release"""
+        await self.acquire(tokens)
+        try:
+            yield
+        finally:
+            self.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return limiter counters for monitoring"""
+        return {
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "request_tokens": round(self.requests.level, 2) if self.requests else None,
+            "llm_tokens": round(self.tokens.level, 2) if self.tokens else None,
+        }
+
+
+class ProviderBackend:
+    """
+    One configured provider: its SDK client, model, recent latencies and
+    circuit breaker
+    
+    Successful call latencies are kept in a bounded window so the client
+    can derive a hedging delay (e.g. p95) from how the provider is
+    behaving right now rather than from a fixed guess.
+    """
+    
+    def __init__(self, name: str, client: Any, model: str, window: int = 200):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.latencies: deque = deque(maxlen=max(1, window))
+        self.successes = 0
+        self.failures = 0
+        self.breaker = CircuitBreaker(
+            settings.circuit_failure_threshold, settings.circuit_reset_seconds
+        )
+        # Quotas are enforced per provider account, so each backend has its own
+        self.limiter = RateLimiter(
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            max_concurrency=settings.llm_max_concurrency,
+            max_queue=settings.rate_limit_max_queue,
+            max_wait_seconds=settings.rate_limit_max_wait_seconds,
+            name=name,
+        )
+    
+    def record_success(self, seconds: float) -> None:
+        self.successes += 1
+        self.latencies.append(seconds)
+        self.breaker.record_success()
+        LLM_ATTEMPTS.inc(self.name, "success")
+        LLM_CALL_SECONDS.observe(seconds, self.name)
+    
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        self.failures += 1
+        kind = classify_error(error) if error is not None else "unknown"
+        LLM_ATTEMPTS.inc(self.name, kind)
+        if error is not None:
+            # The retry scheduled after this failure is counted against this provider
+            try:
+                error.provider = self.name
+            except AttributeError:
+                pass
+        if kind in PROVIDER_FAILURES:
+            self.breaker.record_failure()
+    
+    def unavailable(self) -> CircuitOpenError:
+        """Error reported when this backend's breaker refuses a call"""
+        return CircuitOpenError(
+            f"{self.name} circuit breaker is open", retry_after=self.breaker.retry_after()
+        )
+    
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of recent successful latencies (None if no samples)"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(1, int(round(percentile / 100.0 * len(ordered))))
+        return ordered[min(rank, len(ordered)) - 1]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and recent latency percentiles for monitoring"""
+        return {
+            "provider": self.name,
+            "model": self.model,
+            "successes": self.successes,
+            "failures": self.failures,
+            "samples": len(self.latencies),
+            "p50_seconds": self.latency_percentile(50),
+            "p95_seconds": self.latency_percentile(95),
+            "circuit": self.breaker.stats(),
+            "rate_limit": self.limiter.stats(),
+        }
+
+
 class LLMClient:
     """
-    Unified client for LLM APIs (OpenAI or Groq)
-    Automatically detects which provider to use based on env variables
+    Unified client for LLM APIs (OpenAI and/or Groq)
+    Automatically detects which providers to use based on env variables
+    
+    When both API keys are set both providers are kept as backends: the
+    first one in LLM_PROVIDER_ORDER serves requests and the other takes
+    over immediately when it errors or times out (ENABLE_PROVIDER_FAILOVER).
     """
     
     def __init__(self):
         """
         Initialize LLM client
-        Checks for API keys and sets up the appropriate provider
+        Checks for API keys and sets up every provider that has one
         """
-        self.provider = self._detect_provider()
         self.max_retries = int(os.getenv("MAX_RETRIES", "3"))
         self.timeout = int(os.getenv("TIMEOUT_SECONDS", "30"))
+        self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
+        self.failover = settings.enable_provider_failover
+        self.retry_policy = RetryPolicy(settings.retry_base_delay, settings.retry_max_delay)
+        self.retry_budget = RETRY_BUDGET
         
-        if self.provider == "openai":
-            self._init_openai()
-        elif self.provider == "groq":
-            self._init_groq()
-        else:
+        initializers = {"openai": self._init_openai, "groq": self._init_groq, "fake": self._init_fake}
+        self.backends: List[ProviderBackend] = [
+            initializers[name]() for name in self._detect_providers()
+        ]
+        if not self.backends:
             raise ValueError(
-                "No API key found! Set either OPENAI_API_KEY or GROQ_API_KEY in .env file"
+                "No API key found! Set either OPENAI_API_KEY or GROQ_API_KEY in .env file "
+                "(or USE_FAKE_LLM=true to run against the local fake provider)"
             )
         
-        logger.info(f"LLM Client initialized with provider: {self.provider}, model: {self.model}")
+        logger.info(
+            "LLM Client initialized with providers: "
+            + ", ".join(f"{b.name} ({b.model})" for b in self.backends)
+        )
+    
+    # The primary backend is what single-provider code paths (streaming,
+    # cache keys, diagnostics) see as "the" provider.
+    @property
+    def provider(self) -> str:
+        return self.backends[0].name
+    
+    @property
+    def model(self) -> str:
+        return self.backends[0].model
     
-    def _detect_provider(self) -> str:
+    @property
+    def client(self):
+        return self.backends[0].client
+    
+    @client.setter
+    def client(self, value) -> None:
+        self.backends[0].client = value
+    
+    def _detect_provider(self) -> Optional[str]:
         """
-        Detect which LLM provider to use based on available API keys
-        Priority: OpenAI > Groq
+        Detect which LLM provider is primary based on available API keys
+        Priority follows LLM_PROVIDER_ORDER (default: OpenAI > Groq)
         """
-        if os.getenv("OPENAI_API_KEY"):
-            return "openai"
-        elif os.getenv("GROQ_API_KEY"):
-            return "groq"
-        return None
+        providers = self._detect_providers()
+        return providers[0] if providers else None
     
-    def _init_openai(self):
+    def _detect_providers(self) -> List[str]:
+        """
+        List every provider with an API key, in LLM_PROVIDER_ORDER
+        
+        Providers missing from the configured order are appended in the
+        default OpenAI > Groq order, so a typo never hides a key.
+        USE_FAKE_LLM replaces every real provider with the local fake.
+        """
+        if settings.use_fake_llm:
+            return ["fake"]
+        keys = {"openai": "OPENAI_API_KEY", "groq": "GROQ_API_KEY"}
+        order = [p.strip().lower() for p in settings.llm_provider_order.split(",")]
+        order = [p for p in order if p in keys] + [p for p in keys if p not in order]
+        available = []
+        for name in order:
+            if name not in available and os.getenv(keys[name]):
+                available.append(name)
+        return available
+    
+    def _init_openai(self) -> ProviderBackend:
         """Initialize OpenAI client"""
         try:
             from openai import OpenAI
-            self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
+            client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), http_client=get_http_client()
+            )
             logger.info("OpenAI client initialized")
+            return ProviderBackend(
+                "openai", client, os.getenv("OPENAI_MODEL", "gpt-4o-mini"), settings.latency_window
+            )
         except ImportError:
             raise ImportError("OpenAI library not installed. Run: pip install openai")
     
-    def _init_groq(self):
+    def _init_groq(self) -> ProviderBackend:
         """Initialize Groq client"""
         try:
             from groq import Groq
-            self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-            self.model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile") #llama-3.1-8b-instant
-            self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
+            client = Groq(
+                api_key=os.getenv("GROQ_API_KEY"), http_client=get_http_client()
+            )
             logger.info("Groq client initialized")
+            return ProviderBackend(
+                "groq", client,
+                os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"),  #llama-3.1-8b-instant
+                settings.latency_window,
+            )
         except ImportError:
             raise ImportError("Groq library not installed. Run: pip install groq")
     
+    def _init_fake(self) -> ProviderBackend:
+        """Initialize the local fake provider (USE_FAKE_LLM)"""
+        from ai.services.fake_provider import MODEL_NAME, build_fake_client
+        logger.info("Fake LLM provider initialized")
+        return ProviderBackend("fake", build_fake_client(), MODEL_NAME, settings.latency_window)
+    
+    def _failover_order(self) -> List[ProviderBackend]:
+        """Backends one attempt may use, primary first"""
+        return self.backends if self.failover else self.backends[:1]
+    
+    def provider_stats(self) -> Dict[str, Any]:
+        """Return per-provider counters, breaker states and retry budget"""
+        return {
+            "failover": self.failover and len(self.backends) > 1,
+            "backends": [b.stats() for b in self.backends],
+            "retry_budget": self.retry_budget.stats(),
+        }
+    
     def call_llm(self, prompt: str) -> Dict[str, Any]:
         """
         Call LLM with retry logic and JSON enforcement
@@ -86,89 +531,233 @@ class LLMClient:
             Dict containing the parsed JSON response
             
         Raises:
+            TokenBudgetExceeded: If the prompt is over its token budget (nothing is sent)
             ValueError: If JSON parsing fails after all retries
+            ProviderUnavailableError: If every provider's circuit is open
             Exception: If API call fails after all retries
         """
+        plan = self.token_plan(prompt)
+        self.retry_budget.record_request()
         for attempt in range(self.max_retries):
             try:
                 logger.debug(f"Attempt {attempt + 1}/{self.max_retries}")
-                
-                # Make the API call
-                response = self._make_api_call(prompt)
-                
-                # Extract content
-                content = response.choices[0].message.content
-                logger.debug(f"Raw response: {content[:200]}...")
-                
-                # Parse JSON
-                parsed = json.loads(content)
-                logger.info("Successfully parsed JSON response")
-                return parsed
-                
-            except json.JSONDecodeError as e:
-                logger.warning(f"Attempt {attempt + 1}: JSON parsing failed - {e}")
-                if attempt == self.max_retries - 1:
-                    logger.error(f"All retries exhausted. Last response: {content}")
-                    raise ValueError(
-                        f"LLM returned invalid JSON after {self.max_retries} attempts. "
-                        f"Last error: {str(e)}"
-                    )
-                time.sleep(1)  # Brief pause before retry
+                return self._call_backends(prompt, self._failover_order(), plan)
                 
             except Exception as e:
-                logger.warning(f"Attempt {attempt + 1}: API call failed - {e}")
-                if attempt == self.max_retries - 1:
-                    logger.error("All retries exhausted")
-                    raise Exception(
-                        f"LLM API call failed after {self.max_retries} attempts. "
-                        f"Last error: {str(e)}"
-                    )
-                time.sleep(2)  # Longer pause for API errors
+                # JSONDecodeError carries the rejected completion as .doc
+                time.sleep(self._retry_delay(attempt, e, getattr(e, "doc", None)))
         
         raise ValueError("Max retries exceeded")
     
-    def _make_api_call(self, prompt: str):
+    def _call_backends(self, prompt: str, backends: List[ProviderBackend], plan: TokenPlan) -> Dict[str, Any]:
         """
-        Make the actual API call to the LLM provider
+        One attempt: try each backend in order until one answers
+        
+        Backends whose circuit is open are skipped.
+        
+        Raises:
+            Exception: The last backend error (CircuitOpenError if none could be called)
+        """
+        last_error: Optional[Exception] = None
+        for backend in backends:
+            if not backend.breaker.allow():
+                last_error = last_error or backend.unavailable()
+                continue
+            if last_error is not None:
+                logger.warning(f"Failing over to {backend.name} after error: {last_error}")
+            LLM_IN_FLIGHT.inc(backend.name)
+            try:
+                with span("llm.attempt", provider=backend.name, model=backend.model) as attempt:
+                    start = time.perf_counter()
+                    response = self._make_api_call(prompt, backend, plan)
+                    self._record_usage(backend, response, plan, attempt)
+                    result = self.parse_content(self._extract_content(response))
+            except Exception as e:
+                backend.record_failure(e)
+                last_error = e
+                continue
+            finally:
+                LLM_IN_FLIGHT.dec(backend.name)
+            backend.record_success(time.perf_counter() - start)
+            return result
+        raise last_error
+    
+    def _extract_content(self, response) -> str:
+        """Pull the completion text out of a provider response"""
+        content = response.choices[0].message.content
+        logger.debug(f"Raw response: {content[:200]}...")
+        return content
+    
+    def parse_content(self, content: str) -> Dict[str, Any]:
+        """
+        Parse the completion text as JSON (also for text assembled from
+        stream_llm deltas)
+        
+        Almost-JSON (fenced, wrapped in prose, trailing commas, truncated)
+        is repaired locally before giving up, which saves a full provider
+        retry (see services/json_repair.py).
+        
+        Raises:
+            json.JSONDecodeError: If the content is not valid JSON and
+                cannot be repaired
+        """
+        with stage("json_parse"):
+            return self._parse_json(content)
+    
+    def _parse_json(self, content: str) -> Dict[str, Any]:
+        try:
+            parsed = orjson.loads(content)
+        except orjson.JSONDecodeError as error:
+            try:
+                parsed, fixes = repair_json(content)
+            except ValueError:
+                record_repair(None)
+                raise error
+            record_repair(fixes)
+            logger.info(f"Repaired malformed JSON locally ({', '.join(fixes)}); retry avoided")
+            return parsed
+        logger.info("Successfully parsed JSON response")
+        return parsed
+    
+    def _retry_delay(self, attempt: int, error: Exception, content: Optional[str]) -> float:
+        """
+        Decide what to do after a failed attempt
         
         Args:
-            prompt: The prompt to send
+            attempt: Zero-based attempt number that just failed
+            error: The exception raised by the attempt
+            content: Raw completion text, if the provider answered
             
         Returns:
-            API response object
+            Seconds to wait before the next attempt (backoff with jitter)
+            
+        Raises:
+            ProviderUnavailableError: If every provider's circuit is open
+            ValueError: If JSON parsing failed and no retry is allowed
+            Exception: If the API call failed and no retry is allowed
+        """
+        if isinstance(error, ProviderUnavailableError):
+            logger.error(f"Failing fast: {error}")
+            raise error
+        
+        kind = classify_error(error)
+        logger.warning(f"Attempt {attempt + 1}: {kind} error - {error}")
+        
+        delay = None
+        if kind not in RETRYABLE_ERRORS:
+            reason = f"{kind} errors are not retried"
+        elif attempt == self.max_retries - 1:
+            reason = "all retries exhausted"
+        elif not self.retry_budget.try_acquire():
+            reason = "retry budget exhausted"
+        else:
+            delay = self.retry_policy.delay(attempt, error)
+            reason = "provider asked to wait longer than RETRY_MAX_DELAY"
+        if delay is not None:
+            LLM_RETRIES.inc(getattr(error, "provider", None) or self.backends[0].name, kind)
+            return delay
+        
+        logger.error(f"Giving up after {attempt + 1} attempts: {reason}")
+        if isinstance(error, json.JSONDecodeError):
+            logger.error(f"Last response: {content}")
+            raise ValueError(
+                f"LLM returned invalid JSON after {attempt + 1} attempts ({reason}). "
+                f"Last error: {str(error)}"
+            )
+        raise Exception(
+            f"LLM API call failed after {attempt + 1} attempts ({reason}). "
+            f"Last error: {str(error)}"
+        )
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
         """
-        messages = [
+        Build the chat messages sent to the provider
+
+        The system message comes first and is the template's static prefix
+        when the prompt was rendered from one (see ai/app/prompts.py), so
+        only the user message differs between calls of the same template.
+
+        Args:
+            prompt: The user prompt (a prompts.Prompt carries its system message)
+
+        Returns:
+            List of chat messages (system + user)
+        """
+        return [
             {
                 "role": "system",
-                "content": (
-                    "You are a helpful cooking assistant that ALWAYS responds with valid JSON. "
-                    "Never include explanations or text outside the JSON structure. "
-                    "Be practical, family-friendly, and considerate of busy parents."
-                )
+                "content": getattr(prompt, "system", SYSTEM_PROMPT),
             },
             {
                 "role": "user",
                 "content": prompt
             }
         ]
+    
+    def token_plan(self, prompt: str) -> TokenPlan:
+        """
+        Prompt tokens and completion max_tokens for a prompt (see services/tokens.py)
+
+        Raises:
+            TokenBudgetExceeded: If the prompt is over its template's budget
+        """
+        return plan_tokens(prompt, getattr(prompt, "system", SYSTEM_PROMPT))
+
+    def _record_usage(self, backend: ProviderBackend, response, plan: TokenPlan, attempt: span) -> None:
+        """Count provider-reported tokens in /metrics, on the attempt span and on the request"""
+        usage = record_usage(backend.name, response)
+        estimated = plan.prompt_tokens
+        attempt.set_attribute("llm.estimated_prompt_tokens", estimated)
+        for kind, tokens in usage.items():
+            attempt.set_attribute(f"llm.{kind}_tokens", tokens)
+        record_llm_usage(estimated_prompt=estimated, **usage)
+
+    def _completion_kwargs(
+        self, prompt: str, backend: Optional[ProviderBackend] = None, plan: Optional[TokenPlan] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the keyword arguments for chat.completions.create
+        Shared by the sync and async clients so both send identical requests
         
-        if self.provider == "openai":
-            return self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                response_format={"type": "json_object"},  # Forces JSON output
-                timeout=self.timeout
-            )
+        Args:
+            prompt: The prompt to send
+            backend: Provider to build the request for (default: primary)
+            plan: The call's token plan (computed from prompt if not given)
+            
+        Returns:
+            Dict of request parameters for that provider
+        """
+        backend = backend or self.backends[0]
+        kwargs = {
+            "model": backend.model,
+            "messages": self._build_messages(prompt),
+            "temperature": self.temperature,
+            "timeout": self.timeout,
+        }
+        max_tokens = (plan or self.token_plan(prompt)).max_tokens
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if backend.name == "openai":
+            kwargs["response_format"] = {"type": "json_object"}  # Forces JSON output
+        # Groq doesn't support response_format yet, but is usually good at JSON
+        return kwargs
+    
+    def _make_api_call(
+        self, prompt: str, backend: Optional[ProviderBackend] = None, plan: Optional[TokenPlan] = None
+    ):
+        """
+        Make the actual API call to the LLM provider
         
-        elif self.provider == "groq":
-            # Groq doesn't support response_format yet, but is usually good at JSON
-            return self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                timeout=self.timeout
-            )
+        Args:
+            prompt: The prompt to send
+            backend: Provider to call (default: primary)
+            plan: The call's token plan (computed from prompt if not given)
+            
+        Returns:
+            API response object
+        """
+        backend = backend or self.backends[0]
+        return backend.client.chat.completions.create(**self._completion_kwargs(prompt, backend, plan))
     
     def test_connection(self) -> bool:
         """
@@ -188,6 +777,377 @@ class LLMClient:
             return False
 
 
+class SingleFlight:
+    """
+    Coalesce concurrent identical async calls into one upstream call
+    
+    The first caller for a key starts the work; callers arriving while it
+    is still running wait for the same result. Each caller receives its own
+    deep copy so one route normalizing the response cannot affect another.
+    The shared work runs as its own task, so a cancelled caller (e.g. a
+    client disconnect) does not cancel it for everyone else.
+    
+    The task records its spans and LLM token usage in a trace of its own;
+    once it finishes every caller copies them into its request trace
+    (followers' copies are marked llm.coalesced), so each request's trace,
+    token totals and Server-Timing show the call it waited on.
+    """
+    
+    def __init__(self):
+        self._in_flight: Dict[str, Tuple["asyncio.Future[Any]", Trace]] = {}
+        self.calls = 0
+        self.upstream_calls = 0
+        self.deduplicated = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once per key among concurrent callers
+        
+        Args:
+            key: Identity of the call (identical keys share one execution)
+            fn: Zero-argument coroutine function doing the real work
+            
+        Returns:
+            A private copy of fn()'s result
+        """
+        self.calls += 1
+        entry = self._in_flight.get(key)
+        leader = entry is None
+        if leader:
+            self.upstream_calls += 1
+            shared = Trace(key)
+            task = asyncio.ensure_future(run_in_trace(shared, fn()))
+            self._in_flight[key] = entry = (task, shared)
+            task.add_done_callback(lambda _t, k=key: self._in_flight.pop(k, None))
+        else:
+            self.deduplicated += 1
+            logger.debug(f"Coalesced identical in-flight LLM call ({self.deduplicated} so far)")
+        task, shared = entry
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if task.done():
+                adopt(shared, **({} if leader else {"llm.coalesced": True}))
+        return copy.deepcopy(result)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return coalescing counters for monitoring"""
+        return {
+            "calls": self.calls,
+            "upstream_calls": self.upstream_calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._in_flight),
+        }
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    Awaitable variant of LLMClient for use inside async routes
+    
+    Uses the providers' async SDK clients and asyncio.sleep between retries,
+    so the event loop keeps serving other requests (including the health
+    check) while a completion is in flight.
+    
+    Identical prompts that are in flight at the same time share a single
+    provider call (see SingleFlight) unless ENABLE_REQUEST_COALESCING is off.
+    
+    With several backends and ENABLE_HEDGING on, an attempt that has not
+    answered within the provider's recent p95 latency also goes to the next
+    provider; the first valid answer wins and the other request is
+    cancelled. Only the slowest ~5% of calls are duplicated, so the tail
+    shrinks without doubling provider spend.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.coalesce = settings.enable_request_coalescing
+        self.single_flight = SingleFlight()
+        self.hedge = settings.enable_hedging
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+    
+    def _init_openai(self) -> ProviderBackend:
+        """Initialize async OpenAI client"""
+        try:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"), http_client=get_http_client(asynchronous=True)
+            )
+            logger.info("Async OpenAI client initialized")
+            return ProviderBackend(
+                "openai", client, os.getenv("OPENAI_MODEL", "gpt-4o-mini"), settings.latency_window
+            )
+        except ImportError:
+            raise ImportError("OpenAI library not installed. Run: pip install openai")
+    
+    def _init_groq(self) -> ProviderBackend:
+        """Initialize async Groq client"""
+        try:
+            from groq import AsyncGroq
+            client = AsyncGroq(
+                api_key=os.getenv("GROQ_API_KEY"), http_client=get_http_client(asynchronous=True)
+            )
+            logger.info("Async Groq client initialized")
+            return ProviderBackend(
+                "groq", client, os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"), settings.latency_window
+            )
+        except ImportError:
+            raise ImportError("Groq library not installed. Run: pip install groq")
+    
+    def _init_fake(self) -> ProviderBackend:
+        """Initialize the async local fake provider (USE_FAKE_LLM)"""
+        from ai.services.fake_provider import MODEL_NAME, build_fake_client
+        logger.info("Async fake LLM provider initialized")
+        return ProviderBackend("fake", build_fake_client(asynchronous=True), MODEL_NAME, settings.latency_window)
+    
+    async def call_llm(self, prompt: str) -> Dict[str, Any]:
+        """
+        Call LLM with retry logic and JSON enforcement, without blocking
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            
+        Returns:
+            Dict containing the parsed JSON response
+            
+        Raises:
+            TokenBudgetExceeded: If the prompt is over its token budget (nothing is sent)
+            ValueError: If JSON parsing fails after all retries
+            Exception: If API call fails after all retries
+        """
+        plan = self.token_plan(prompt)
+        if not self.coalesce:
+            return await self._call_llm_with_retries(prompt, plan)
+        return await self.single_flight.do(
+            self._prompt_key(prompt), lambda: self._call_llm_with_retries(prompt, plan)
+        )
+    
+    def _prompt_key(self, prompt: str) -> str:
+        """Identity of a request for coalescing: same model, temperature and messages"""
+        system = getattr(prompt, "system", SYSTEM_PROMPT)
+        raw = f"{self.provider}\x00{self.model}\x00{self.temperature}\x00{system}\x00{prompt}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    async def _call_llm_with_retries(self, prompt: str, plan: TokenPlan) -> Dict[str, Any]:
+        self.retry_budget.record_request()
+        for attempt in range(self.max_retries):
+            try:
+                logger.debug(f"Attempt {attempt + 1}/{self.max_retries}")
+                return await self._call_backends(prompt, self._failover_order(), plan)
+                
+            except Exception as e:
+                # JSONDecodeError carries the rejected completion as .doc
+                await asyncio.sleep(self._retry_delay(attempt, e, getattr(e, "doc", None)))
+        
+        raise ValueError("Max retries exceeded")
+    
+    def _estimated_cost(self, plan: TokenPlan) -> int:
+        """Tokens reserved from the quota for one call: prompt + expected completion"""
+        completion = settings.llm_expected_completion_tokens
+        if plan.max_tokens is not None:
+            completion = min(completion, plan.max_tokens)
+        return plan.prompt_tokens + completion
+    
+    async def _call_backend(self, prompt: str, backend: ProviderBackend, plan: TokenPlan) -> Dict[str, Any]:
+        """One request to one provider: rate limited, timed and parsed"""
+        cost = self._estimated_cost(plan)
+        async with backend.limiter.slot(cost):
+            LLM_IN_FLIGHT.inc(backend.name)
+            try:
+                with span("llm.attempt", provider=backend.name, model=backend.model) as attempt:
+                    start = time.perf_counter()
+                    response = await self._make_api_call(prompt, backend, plan)
+                    self._record_usage(backend, response, plan, attempt)
+                    backend.limiter.reconcile(
+                        cost, getattr(getattr(response, "usage", None), "total_tokens", None)
+                    )
+                    result = self.parse_content(self._extract_content(response))
+            except Exception as e:
+                backend.record_failure(e)
+                raise
+            finally:
+                LLM_IN_FLIGHT.dec(backend.name)
+        backend.record_success(time.perf_counter() - start)
+        return result
+    
+    def _hedge_delay(self, backend: ProviderBackend) -> Optional[float]:
+        """
+        Seconds to wait on backend before hedging to the next provider
+        
+        None (never hedge) until enough latencies have been observed, so a
+        cold start cannot trigger a burst of duplicate requests.
+        """
+        if not self.hedge or len(backend.latencies) < settings.hedge_min_samples:
+            return None
+        delay = backend.latency_percentile(settings.hedge_percentile)
+        return max(delay, settings.hedge_min_delay_seconds)
+    
+    async def _call_backends(self, prompt: str, backends: List[ProviderBackend], plan: TokenPlan) -> Dict[str, Any]:
+        """
+        One attempt across the given backends, primary first
+        
+        The next backend is started when the running ones have all failed
+        (failover) or when the latest one exceeds its hedge delay (hedging).
+        Backends whose circuit is open are skipped. The first successful
+        answer is returned and the rest are cancelled.
+        
+        Raises:
+            Exception: The last backend error (CircuitOpenError if none could be called)
+        """
+        remaining = list(backends)
+        running: Dict["asyncio.Future[Any]", ProviderBackend] = {}
+        hedges = set()
+        last_error: Optional[BaseException] = None
+        
+        def launch() -> Optional[float]:
+            nonlocal last_error
+            while remaining:
+                backend = remaining.pop(0)
+                if backend.breaker.allow():
+                    running[asyncio.ensure_future(self._call_backend(prompt, backend, plan))] = backend
+                    return self._hedge_delay(backend) if remaining else None
+                last_error = last_error or backend.unavailable()
+            return None
+        
+        hedge_after = launch()
+        try:
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    before = len(running)
+                    hedge_after = launch()
+                    if len(running) > before:
+                        hedge = list(running)[-1]
+                        hedges.add(hedge)
+                        self.hedges_sent += 1
+                        logger.info(f"Hedged slow request to {running[hedge].name}")
+                    continue
+                for task in done:
+                    backend = running.pop(task)
+                    if task.exception() is None:
+                        if task in hedges:
+                            self.hedge_wins += 1
+                        if backend is not backends[0]:
+                            logger.info(f"Request served by {backend.name}")
+                        return task.result()
+                    last_error = task.exception()
+                if not running and remaining:
+                    logger.warning(f"Failing over to {remaining[0].name} after error: {last_error}")
+                    hedge_after = launch()
+        finally:
+            for task in running:
+                task.cancel()
+        raise last_error
+    
+    async def _make_api_call(
+        self, prompt: str, backend: Optional[ProviderBackend] = None, plan: Optional[TokenPlan] = None
+    ):
+        """
+        Make the actual API call to the LLM provider
+        
+        Args:
+            prompt: The prompt to send
+            backend: Provider to call (default: primary)
+            plan: The call's token plan (computed from prompt if not given)
+            
+        Returns:
+            API response object
+        """
+        backend = backend or self.backends[0]
+        return await backend.client.chat.completions.create(
+            **self._completion_kwargs(prompt, backend, plan)
+        )
+    
+    def provider_stats(self) -> Dict[str, Any]:
+        """Return per-provider and hedging counters for monitoring"""
+        stats = super().provider_stats()
+        stats["hedging"] = {
+            "enabled": self.hedge and len(self.backends) > 1,
+            "hedges_sent": self.hedges_sent,
+            "hedge_wins": self.hedge_wins,
+        }
+        return stats
+    
+    async def stream_llm(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the completion text for a prompt as it is generated
+        
+        Providers are tried in failover order like call_llm: backends whose
+        circuit is open are skipped, and a backend that fails before its
+        first delta is recorded against its breaker and the next one is
+        tried. Each stream is rate limited, counted in flight and timed on
+        its provider. There are no retries, hedging or coalescing: once text
+        has been handed to the caller the request cannot be transparently
+        replayed, so a failure mid-stream is raised.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            
+        Yields:
+            Text deltas in order
+            
+        Raises:
+            TokenBudgetExceeded: If the prompt is over its token budget (nothing is sent)
+            ProviderUnavailableError: If every provider's circuit is open
+            Exception: The provider error, if no backend could start the stream
+        """
+        plan = self.token_plan(prompt)
+        record_llm_usage(estimated_prompt=plan.prompt_tokens)
+        last_error: Optional[Exception] = None
+        for backend in self._failover_order():
+            if not backend.breaker.allow():
+                last_error = last_error or backend.unavailable()
+                continue
+            if last_error is not None:
+                logger.warning(f"Failing over stream to {backend.name} after error: {last_error}")
+            started = False
+            async with backend.limiter.slot(self._estimated_cost(plan)):
+                LLM_IN_FLIGHT.inc(backend.name)
+                try:
+                    with span("llm.attempt", provider=backend.name, model=backend.model, stream=True):
+                        start = time.perf_counter()
+                        stream = await backend.client.chat.completions.create(
+                            **self._completion_kwargs(prompt, backend, plan), stream=True
+                        )
+                        async for chunk in stream:
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                started = True
+                                yield delta
+                except Exception as e:
+                    backend.record_failure(e)
+                    if started:
+                        raise
+                    last_error = e
+                    continue
+                finally:
+                    LLM_IN_FLIGHT.dec(backend.name)
+            backend.record_success(time.perf_counter() - start)
+            return
+        raise last_error
+    
+    async def test_connection(self) -> bool:
+        """
+        Test if the LLM connection is working
+        
+        Returns:
+            bool: True if connection successful, False otherwise
+        """
+        try:
+            test_prompt = """Return this exact JSON and nothing else:
+            {"status": "connected", "test": true}"""
+            
+            response = await self.call_llm(test_prompt)
+            return response.get("status") == "connected"
+        except Exception as e:
+            logger.error(f"Connection test failed: {e}")
+            return False
+
+
 # Utility function for quick testing
 def test_llm_client():
     """
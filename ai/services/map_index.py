@@ -0,0 +1,429 @@
+# app/services/map_index.py
+"""
+Precompiled binary index of the canonical ingredient and unit maps.
+
+Parsing IngredientCanonicalMap.json / UnitNormalizationMap.json, sorting
+the variant tables and building the matcher automaton is work every worker
+process (and every test run) would otherwise repeat at import. The index
+holds the result of that work in one flat file that is memory-mapped
+read-only, so the pages are shared by all workers through the OS page
+cache and only touched when used.
+
+File layout (native byte order, sections 8-byte aligned):
+
+    magic "MMAPIDX\\0" | format version u32 | section count u32
+    | byte order u8 + padding | sha256 of the source JSON (32 bytes)
+    | section table: count x (name 8s, offset u64, length u64)
+    | sections...
+
+Sections:
+    strings   u32 count, u32 offsets[count + 1], UTF-8 blob
+    ingvar    i32 (variant, canonical) string-id pairs, priority order
+    unitvar   i32 (variant, canonical) pairs, longest variant first
+    unitconv  i32 (canonical unit, dimension) pairs
+    unitfact  f64 factor to the dimension's base unit, per unitconv row
+    category  i32 (canonical ingredient, category) pairs
+    alphabet  UTF-8 matcher alphabet (see matcher.VariantMatcher.compile)
+    matcher   i32 row-displaced matcher table
+    source    the source maps as JSON, parsed only if someone asks for them
+
+The index is rebuilt whenever the sha256 of the source files or
+FORMAT_VERSION changes; it is written to a temporary file and renamed, so
+workers that still map the old file are unaffected. If the file cannot be
+written, the maps are compiled in memory (SourceIndex) for that process.
+
+Build or check it explicitly with:
+    python -m ai.services.map_index [--check]
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import orjson
+
+from ai.services.matcher import CompiledMatcher, VariantMatcher
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MMAPIDX\0"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sIIB7x32s")
+_SECTION = struct.Struct("<8sQQ")
+_BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+
+
+def source_hash(*paths: Optional[Path]) -> str:
+    """sha256 over the source files (a missing file hashes as empty)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        if path is not None and path.exists():
+            digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# -------------------------
+# Build
+# -------------------------
+def compile_tables(ingredients: Mapping, units: Sequence) -> Dict[str, Any]:
+    """
+    Derive every lookup table from the raw maps
+
+    This is the one place the maps are interpreted; utils.py only reads the
+    resulting index.
+    """
+    unit_to_canon: Dict[str, str] = {}
+    conversions: Dict[str, Tuple[str, float]] = {}
+    for unit_entry in units:
+        canon = unit_entry.get("canonical")
+        for v in unit_entry.get("variations", []):
+            unit_to_canon[v.lower()] = canon
+        if unit_entry.get("dimension") and unit_entry.get("factor"):
+            conversions[canon] = (unit_entry["dimension"], float(unit_entry["factor"]))
+
+    ing_variants: List[Tuple[str, str]] = []
+    categories: Dict[str, str] = {}
+    for canonical, details in ingredients.items():
+        for var in details.get("variations", []):
+            ing_variants.append((var.lower(), canonical))
+        if details.get("category"):
+            categories[canonical] = details["category"]
+    ing_variants.sort(key=lambda t: -len(t[0]))
+
+    return {
+        # longest first so "tbsp" beats "t" in the unit alternation
+        "unit_variants": sorted(unit_to_canon.items(), key=lambda t: (-len(t[0]), t[0])),
+        "conversions": conversions,
+        "ing_variants": ing_variants,
+        "categories": categories,
+        "matcher": VariantMatcher(ing_variants),
+    }
+
+
+def build_index(ingredients: Mapping, units: Sequence, digest: str = "") -> bytes:
+    """Serialize the maps into the index format"""
+    tables = compile_tables(ingredients, units)
+    alphabet, automaton = tables["matcher"].compile()
+    string_ids: Dict[str, int] = {}
+    strings: List[bytes] = []
+
+    def sid(text: str) -> int:
+        found = string_ids.get(text)
+        if found is None:
+            found = string_ids[text] = len(strings)
+            strings.append(text.encode("utf-8"))
+        return found
+
+    def pairs(items) -> bytes:
+        return array("i", [sid(x) for pair in items for x in pair]).tobytes()
+
+    sections = {
+        b"ingvar": pairs(tables["ing_variants"]),
+        b"unitvar": pairs(tables["unit_variants"]),
+        b"unitconv": pairs((canon, dim) for canon, (dim, _) in tables["conversions"].items()),
+        b"unitfact": array("d", [f for _, f in tables["conversions"].values()]).tobytes(),
+        b"category": pairs(tables["categories"].items()),
+        b"alphabet": alphabet.encode("utf-8"),
+        b"matcher": automaton.tobytes(),
+        b"source": orjson.dumps({"ingredients": dict(ingredients), "units": list(units)}),
+    }
+    offsets = array("I", [0])
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    sections = {
+        b"strings": struct.pack("<I", len(strings)) + offsets.tobytes() + b"".join(strings),
+        **sections,
+    }
+
+    header_size = _HEADER.size + _SECTION.size * len(sections)
+    table, body, offset = [], [], _align(header_size)
+    for name, data in sections.items():
+        table.append(_SECTION.pack(name[:8], offset, len(data)))
+        body.append(data + b"\0" * (_align(len(data)) - len(data)))
+        offset += _align(len(data))
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), _BYTE_ORDER, bytes.fromhex(digest or "0" * 64))
+    head = header + b"".join(table)
+    return head + b"\0" * (_align(len(head)) - len(head)) + b"".join(body)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def write_index(path: Path, data: bytes) -> None:
+    """Atomically replace the index file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.chmod(tmp, 0o644)  # mkstemp creates 0600; workers may run as another user
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# -------------------------
+# Read
+# -------------------------
+class _PairView(Sequence):
+    """Read-only (str, str) sequence over an i32 string-id pair section"""
+
+    def __init__(self, index: "MapIndex", ids: memoryview):
+        self._index = index
+        self._ids = ids
+        self._decoded: Dict[int, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids) // 2
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        pair = self._decoded.get(i)
+        if pair is None:
+            if not 0 <= i < len(self):
+                raise IndexError(i)
+            string = self._index.string
+            pair = self._decoded[i] = (string(self._ids[2 * i]), string(self._ids[2 * i + 1]))
+        return pair
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return (self[i] for i in range(len(self)))
+
+
+class _LazySource:
+    """Facade over one source map that parses the stored JSON on first use"""
+
+    def __init__(self, index: "MapIndex", key: str):
+        self._index = index
+        self._key = key
+
+    def _data(self):
+        return self._index.source()[self._key]
+
+    def __getitem__(self, key):
+        return self._data()[key]
+
+    def __iter__(self):
+        return iter(self._data())
+
+    def __len__(self) -> int:
+        return len(self._data())
+
+    def __contains__(self, key) -> bool:
+        return key in self._data()
+
+    def __repr__(self) -> str:
+        return repr(self._data())
+
+
+class _LazyMapping(_LazySource, Mapping):
+    pass
+
+
+class _LazyList(_LazySource, Sequence):
+    pass
+
+
+class MapIndex:
+    """
+    Read-only view of an index file (or bytes)
+
+    Everything derived from the file is built on first access and kept.
+
+    Args:
+        buffer: mmap or bytes holding the index
+        source: Already-parsed (ingredients, units) to return from source()
+            instead of decoding the stored JSON
+        path: File the buffer was mapped from (for diagnostics)
+
+    Raises:
+        ValueError: If the buffer is not an index of this format version
+    """
+
+    def __init__(self, buffer, source: Optional[Tuple[Mapping, Sequence]] = None, path: Optional[Path] = None):
+        self.path = path
+        self._buffer = buffer
+        view = memoryview(buffer)
+        if len(view) < _HEADER.size:
+            raise ValueError("Map index is truncated")
+        magic, version, count, byte_order, digest = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != _BYTE_ORDER:
+            raise ValueError(f"Map index format mismatch (version {version}, expected {FORMAT_VERSION})")
+        self.source_hash = digest.hex()
+        self._sections: Dict[bytes, memoryview] = {}
+        for i in range(count):
+            name, offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            if offset + length > len(view):
+                raise ValueError("Map index is truncated")
+            self._sections[name.rstrip(b"\0")] = view[offset:offset + length]
+
+        strings = self._sections[b"strings"]
+        (n,) = struct.unpack_from("<I", strings)
+        self._offsets = strings[4:8 + 4 * n].cast("I")
+        self._blob = strings[8 + 4 * n:]
+        self._source = source
+        self._categories: Optional[Dict[str, str]] = None
+        self._matcher: Optional[CompiledMatcher] = None
+        self.ing_variants = _PairView(self, self._ints(b"ingvar"))
+        self.canonical_ingredients = _LazyMapping(self, "ingredients")
+        self.unit_map = _LazyList(self, "units")
+
+    @classmethod
+    def open(cls, path: Path) -> "MapIndex":
+        """Memory-map an index file read-only"""
+        with open(path, "rb") as fh:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(mapped, path=path)
+        except (ValueError, KeyError, struct.error) as e:
+            raise ValueError(f"Invalid map index {path}: {e}") from e
+
+    def _ints(self, name: bytes) -> memoryview:
+        return self._sections[name].cast("i")
+
+    def string(self, sid: int) -> str:
+        return str(self._blob[self._offsets[sid]:self._offsets[sid + 1]], "utf-8")
+
+    def unit_variants(self) -> List[Tuple[str, str]]:
+        """(variant, canonical unit) pairs, longest variant first"""
+        return list(_PairView(self, self._ints(b"unitvar")))
+
+    def unit_conversions(self) -> Dict[str, Tuple[str, float]]:
+        factors = self._sections[b"unitfact"].cast("d")
+        return {
+            canon: (dim, factors[i])
+            for i, (canon, dim) in enumerate(_PairView(self, self._ints(b"unitconv")))
+        }
+
+    def categories(self) -> Dict[str, str]:
+        """Canonical ingredient -> category"""
+        if self._categories is None:
+            self._categories = dict(_PairView(self, self._ints(b"category")))
+        return self._categories
+
+    def matcher(self) -> CompiledMatcher:
+        """Ingredient variant matcher running directly on the mapped table"""
+        if self._matcher is None:
+            alphabet = str(self._sections[b"alphabet"], "utf-8")
+            self._matcher = CompiledMatcher(alphabet, self._ints(b"matcher"), self.ing_variants)
+        return self._matcher
+
+    def source(self) -> Dict[str, Any]:
+        """The source maps: {"ingredients": {...}, "units": [...]}"""
+        if self._source is None:
+            self._source = orjson.loads(self._sections[b"source"])
+        elif isinstance(self._source, tuple):
+            self._source = {"ingredients": self._source[0], "units": self._source[1]}
+        return self._source
+
+
+class SourceIndex:
+    """
+    The maps compiled in memory, with the MapIndex interface
+
+    Used when the index file cannot be written and for maps passed in
+    explicitly: nothing is serialized and the matcher is the VariantMatcher
+    automaton itself.
+    """
+
+    path = None
+
+    def __init__(self, ingredients: Mapping, units: Sequence, digest: str = ""):
+        self.source_hash = digest
+        self.canonical_ingredients = ingredients
+        self.unit_map = units
+        self._tables = compile_tables(ingredients, units)
+        self.ing_variants = self._tables["ing_variants"]
+
+    def unit_variants(self) -> List[Tuple[str, str]]:
+        return list(self._tables["unit_variants"])
+
+    def unit_conversions(self) -> Dict[str, Tuple[str, float]]:
+        return dict(self._tables["conversions"])
+
+    def categories(self) -> Dict[str, str]:
+        return self._tables["categories"]
+
+    def matcher(self) -> VariantMatcher:
+        return self._tables["matcher"]
+
+    def source(self) -> Dict[str, Any]:
+        return {"ingredients": self.canonical_ingredients, "units": self.unit_map}
+
+
+def read_sources(ingredients_path: Optional[Path], units_path: Optional[Path]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    ingredients: Dict[str, Any] = {}
+    units: List[Dict[str, Any]] = []
+    if ingredients_path:
+        ingredients = orjson.loads(ingredients_path.read_bytes())
+    if units_path:
+        units = orjson.loads(units_path.read_bytes()).get("units", [])
+    return ingredients, units
+
+
+def load_index(
+    ingredients_path: Optional[Path], units_path: Optional[Path], index_path: Path
+) -> Union[MapIndex, SourceIndex]:
+    """
+    Map the index for these source files, rebuilding it if it is missing,
+    corrupt, of another format version or built from different sources
+
+    If the index cannot be written (read-only filesystem), the maps are
+    compiled in memory for this process only, without serializing them.
+    """
+    digest = source_hash(ingredients_path, units_path)
+    try:
+        index = MapIndex.open(index_path)
+        if index.source_hash == digest:
+            return index
+        logger.info(f"Canonical maps changed; rebuilding {index_path}")
+    except FileNotFoundError:
+        logger.info(f"Building canonical map index {index_path}")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Rebuilding unreadable canonical map index: {e}")
+
+    ingredients, units = read_sources(ingredients_path, units_path)
+    try:
+        write_index(index_path, build_index(ingredients, units, digest))
+        return MapIndex.open(index_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not write canonical map index {index_path} ({e}); compiling the maps in memory")
+        return SourceIndex(ingredients, units, digest)
+
+
+if __name__ == "__main__":
+    from ai.services import utils
+
+    ing_path, units_path = utils.map_source_paths()
+    index_path = utils.MAP_INDEX_PATH
+    if "--check" in sys.argv[1:]:
+        try:
+            fresh = MapIndex.open(index_path).source_hash == source_hash(ing_path, units_path)
+        except (OSError, ValueError):
+            fresh = False
+        print(f"{index_path}: {'up to date' if fresh else 'stale or missing'}")
+        sys.exit(0 if fresh else 1)
+    index = load_index(ing_path, units_path, index_path)
+    if index.path is None:
+        sys.exit(f"{index_path}: could not be written")
+    print(
+        f"{index_path}: {len(index.ing_variants)} ingredient variants, "
+        f"{len(index.unit_variants())} unit variants, {os.path.getsize(index_path)} bytes"
+    )
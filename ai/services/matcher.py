@@ -0,0 +1,230 @@
+# app/services/matcher.py
+"""
+Multi-pattern substring matcher (Aho-Corasick) used for ingredient
+canonicalization.
+
+The automaton is built once from a list of (variant, canonical) pairs.
+Finding the best variant in a line then costs one pass over the line,
+no matter how many variants the canonical map holds.
+
+"Best" follows the order of the input list: the pattern with the lowest
+index that occurs anywhere in the text wins. utils.py passes variants
+sorted longest-first, so this gives longest-variant-wins.
+
+CompiledMatcher is the same automaton flattened into a compact
+row-displaced transition table; it is what the precompiled map index
+(services/map_index.py) stores on disk.
+"""
+
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class VariantMatcher:
+    """
+    Aho-Corasick automaton over lower-cased variant strings
+
+    States are plain integers; per-state data lives in flat lists:
+    - _goto[state]: dict char -> next state
+    - _fail[state]: failure link
+    - _best[state]: index of the highest-priority pattern that ends at this
+      state, following failure links (-1 if none)
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[str, str]]):
+        """
+        Build the automaton
+
+        Args:
+            patterns: (variant, canonical) pairs in priority order.
+                      Variants are expected to be lower-case already.
+        """
+        self.patterns: List[Tuple[str, str]] = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[int] = [-1]
+
+        for idx, (variant, _) in enumerate(self.patterns):
+            if not variant:
+                continue
+            state = 0
+            for ch in variant:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(-1)
+                state = nxt
+            # keep the first (highest-priority) pattern for duplicate variants
+            if self._best[state] == -1:
+                self._best[state] = idx
+
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                inherited = self._best[self._fail[nxt]]
+                if inherited != -1 and (self._best[nxt] == -1 or inherited < self._best[nxt]):
+                    self._best[nxt] = inherited
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find_best(self, text_lower: str) -> Optional[Tuple[str, str]]:
+        """
+        Return the highest-priority (variant, canonical) pair occurring in
+        text_lower, or None if no variant occurs.
+        """
+        goto = self._goto
+        fail = self._fail
+        best = self._best
+        state = 0
+        found = -1
+        for ch in text_lower:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            cand = best[state]
+            if cand != -1 and (found == -1 or cand < found):
+                found = cand
+                if found == 0:
+                    break
+        if found == -1:
+            return None
+        return self.patterns[found]
+
+    def compile(self) -> Tuple[str, array]:
+        """
+        Flatten the automaton into one row-displaced transition table
+
+        Transitions are resolved through the failure links, so matching
+        never loops. Most of them equal the root's (the character starts a
+        new match, or none), so a state only stores the columns where it
+        differs, and the rows are overlapped in shared next/check arrays:
+        the transition of state s on column c is next[base[s] + c] when
+        check[base[s] + c] == s, else root[c].
+
+        Column 0 stands for characters that occur in no pattern (always the
+        root); alphabet[i] is column i + 1.
+
+        Returns:
+            (alphabet, table) where table is one int array:
+            states, columns, slots, best[states], base[states],
+            root[columns], next[slots], check[slots]
+        """
+        alphabet = "".join(sorted({ch for goto in self._goto for ch in goto}))
+        columns = {ch: i + 1 for i, ch in enumerate(alphabet)}
+        width = len(alphabet) + 1
+        states = len(self._goto)
+
+        root = [0] * width
+        for ch, nxt in self._goto[0].items():
+            root[columns[ch]] = nxt
+        # breadth-first, so a state's failure target is always resolved first
+        rows: List[Dict[int, int]] = [{} for _ in range(states)]
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            row = dict(rows[self._fail[state]])
+            for ch, nxt in self._goto[state].items():
+                row[columns[ch]] = nxt
+                queue.append(nxt)
+            rows[state] = {column: nxt for column, nxt in row.items() if nxt != root[column]}
+
+        # first fit, widest rows first; a row is not tried before the last
+        # offset taken by a row as wide (a small loss of density for a fast build)
+        base = [0] * states
+        used = bytearray(width)
+        first_free = 0
+        last_fit: Dict[int, int] = {}
+        for state in sorted(range(1, states), key=lambda s: -len(rows[s])):
+            row = rows[state]
+            if not row:
+                continue
+            cols = sorted(row)
+            free = max(first_free, last_fit.get(len(cols), 0))
+            while True:
+                offset = free - cols[0]
+                if offset >= 0 and not any(used[offset + c] for c in cols if offset + c < len(used)):
+                    break
+                free = used.find(0, free + 1)
+                if free == -1:
+                    free = len(used)
+            if offset + width > len(used):
+                used.extend(bytes(offset + width - len(used)))
+            for c in cols:
+                used[offset + c] = 1
+            base[state] = offset
+            last_fit[len(cols)] = offset + cols[0]
+            while first_free < len(used) and used[first_free]:
+                first_free += 1
+
+        # padded by one row so base[s] + c is always in range
+        slots = len(used)
+        nxt_slots = [0] * slots
+        check = [-1] * slots
+        for state, row in enumerate(rows):
+            for column, nxt in row.items():
+                nxt_slots[base[state] + column] = nxt
+                check[base[state] + column] = state
+        return alphabet, array("i", [states, width, slots, *self._best, *base, *root, *nxt_slots, *check])
+
+
+class CompiledMatcher:
+    """
+    VariantMatcher flattened into a row-displaced table (see VariantMatcher.compile)
+
+    The table can be any int sequence, including a memoryview over a
+    memory-mapped file, so worker processes share one copy of the
+    automaton instead of each building their own.
+    """
+
+    def __init__(self, alphabet: str, table: Sequence[int], patterns: Sequence[Tuple[str, str]]):
+        self._columns = {ch: i + 1 for i, ch in enumerate(alphabet)}
+        states, width, slots = table[0], table[1], table[2]
+        start = 3
+        self._best = table[start:start + states]
+        self._base = table[start + states:start + 2 * states]
+        start += 2 * states
+        self._root = table[start:start + width]
+        self._next = table[start + width:start + width + slots]
+        self._check = table[start + width + slots:start + width + 2 * slots]
+        self.patterns = patterns
+
+    @classmethod
+    def from_matcher(cls, matcher: VariantMatcher) -> "CompiledMatcher":
+        return cls(*matcher.compile(), matcher.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find_best(self, text_lower: str) -> Optional[Tuple[str, str]]:
+        """Same result as VariantMatcher.find_best"""
+        column = self._columns.get
+        best, base, root, nxt, check = self._best, self._base, self._root, self._next, self._check
+        state = 0
+        found = -1
+        for ch in text_lower:
+            c = column(ch, 0)
+            i = base[state] + c
+            state = nxt[i] if check[i] == state else root[c]
+            cand = best[state]
+            if cand != -1 and (found == -1 or cand < found):
+                found = cand
+                if found == 0:
+                    break
+        if found == -1:
+            return None
+        return self.patterns[found]
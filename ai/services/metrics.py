@@ -0,0 +1,367 @@
+# app/services/metrics.py
+"""
+Minimal Prometheus-style metrics for the AI service.
+
+Counters, gauges and fixed-bucket histograms keyed by a tuple of label
+values, rendered in the Prometheus text exposition format by /metrics.
+Recording is a dict lookup plus a few additions under a lock, so it is
+cheap enough for the hot path; everything else (formatting, cumulative
+buckets) happens only when the endpoint is scraped.
+
+Stats that already live elsewhere (response cache, coalescing, JSON
+repair) are not duplicated: register_collector() adds a callback that
+reads them at scrape time.
+
+Usage:
+    LLM_ATTEMPTS.inc("groq", "success")
+    with STAGE_SECONDS.time("prompt"):
+        prompt = build_prompt(...)
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers sub-millisecond parsing up to slow LLM completions
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(labels)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def value(self, *labels: str) -> float:
+        """Current value for a label set (0 if never recorded)"""
+        with self._lock:
+            return self._values.get(tuple(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that goes up and down (e.g. requests in flight)"""
+
+    kind = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, *self._labels)
+        return False
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self, self._key(labels))
+
+    def count(self, *labels: str) -> int:
+        """Number of observations for a label set"""
+        with self._lock:
+            series = self._series.get(tuple(labels))
+            return int(sum(series[:-1])) if series else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]!r}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors; renders the exposition text"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing  # module re-import (e.g. tests) reuses the series
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register_collector(
+        self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]
+    ) -> None:
+        """
+        Add a callback run at scrape time
+
+        The callback yields (name, type, help, labels, value) samples,
+        e.g. ("ai_cache_hits", "counter", "Response cache hits", {}, 12).
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        seen = set()
+        for collector in collectors:
+            for name, kind, documentation, labels, value in collector():
+                if value is None:
+                    continue
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_label_text(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# -------------------------
+# Metrics shared across the service
+# -------------------------
+HTTP_REQUEST_SECONDS = histogram(
+    "ai_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = gauge("ai_http_requests_in_flight", "HTTP requests currently being served")
+STAGE_SECONDS = histogram(
+    "ai_stage_duration_seconds",
+    "Time spent per request stage (prompt, llm_call, json_parse, normalize, validate, ...)",
+    ("stage",),
+)
+LLM_ATTEMPTS = counter(
+    "ai_llm_attempts_total", "Provider calls by outcome (success or error class)", ("provider", "outcome")
+)
+LLM_RETRIES = counter(
+    "ai_llm_retries_total",
+    "Retries scheduled after a failed attempt, by the provider that failed and error class",
+    ("provider", "error_class"),
+)
+LLM_CALL_SECONDS = histogram("ai_llm_call_duration_seconds", "Latency of successful provider calls", ("provider",))
+LLM_IN_FLIGHT = gauge("ai_llm_calls_in_flight", "Provider calls currently in flight", ("provider",))
+LLM_TOKENS = counter(
+    "ai_llm_tokens_total",
+    "Tokens reported by the provider (response.usage); cached_prompt is the prompt share served from the prefix cache",
+    ("provider", "kind"),
+)
+
+
+TEXT_REDUCTION_RATIO = histogram(
+    "ai_recipe_text_reduction_ratio",
+    "Share of pasted recipe text removed before extraction (0 when the full text is used)",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+TEXT_REDUCER_OUTCOMES = counter(
+    "ai_recipe_text_reducer_total",
+    "Recipe text reducer outcomes (reduced, low_confidence, no_gain, short, disabled)",
+    ("outcome",),
+)
+RULE_EXTRACTOR_OUTCOMES = counter(
+    "ai_recipe_rule_extractor_total",
+    "Rule-based recipe extraction outcomes (accepted = served without the LLM; low_confidence, incomplete, disabled)",
+    ("outcome",),
+)
+REQUEST_LLM_TOKENS = histogram(
+    "ai_request_llm_tokens",
+    "LLM tokens spent per HTTP request, all provider calls included (prompt, completion, cached_prompt)",
+    ("route", "kind"),
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+
+def record_usage(provider: str, response) -> Dict[str, int]:
+    """
+    Add the prompt/completion/cached token counts from a provider response
+
+    Returns:
+        The counts found, by kind (empty when the response has no usage)
+    """
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    counts = {}
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            counts[kind] = tokens
+    # OpenAI-style usage.prompt_tokens_details.cached_tokens (Groq uses the same shape)
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    if cached:
+        counts["cached_prompt"] = cached
+    for kind, tokens in counts.items():
+        LLM_TOKENS.inc(provider, kind, amount=tokens)
+    return counts
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency and in-flight requests
+
+    The route label is the matched path template (e.g. /ai/suggest-meal),
+    never the raw path, so label cardinality stays bounded. Unmatched
+    requests are recorded under "unmatched".
+    """
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope.get("method", ""),
+                getattr(route, "path", "unmatched"),
+                str(status["code"]),
+            )
@@ -0,0 +1,225 @@
+# app/services/recipe_corpus.py
+"""
+On-disk corpus of validated meal suggestions, answered without the LLM.
+
+Most meal requests ("dinner, 2 people, 30 minutes, vegetarian") can be
+served by a recipe generated earlier for a similar request. Each validated
+RecipeDraft from /ai/suggest-meal is stored (SQLite) with what it was
+generated for, and indexed by:
+
+- meal type and total time (prep + cook, or the time it was asked for)
+- dietary tags: the exact set of restrictions it was generated under
+- canonical ingredient ids (IngredientCanonicalMap.json keys)
+
+RecipeCorpus.find returns a stored recipe of the same meal type that fits
+the time, was generated under exactly the requested restrictions (one made
+for "vegetarian" is not served for "vegan", nor one made for "vegan" and,
+separately, for "gluten-free" for both) and contains every ingredient the
+preferences name. Only preferences that read as a list of wanted
+ingredients are answered: text that names no known ingredient ("Italian,
+family-friendly") or that excludes something ("no chicken", "allergic to
+milk", "nut-free") cannot be checked against the index, so it is a miss
+and the LLM handles the request. A recipe stored for the same number of
+people is preferred; otherwise its quantities are scaled. Among matches
+the least recently served one is returned, so repeated requests rotate
+through the corpus.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from ai.services.utils import canonical_ingredient_ids, scale_ingredients
+
+# Wording that excludes ingredients instead of asking for them
+_EXCLUSION_RE = re.compile(
+    r"\b(?:no|not|non|none|never|without|except|excluding|avoid\w*|allerg\w*|intoleran\w*"
+    r"|free|hates?|dislikes?|can'?t|cannot|don'?t|doesn'?t|won'?t)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Dietary tags as stored: lower case, words joined by "-" ("Gluten Free" -> "gluten-free")"""
+    return sorted({"-".join(tag.lower().replace("-", " ").split()) for tag in tags or [] if tag.strip()})
+
+
+def total_minutes(recipe: Mapping[str, Any], time_available: int) -> int:
+    """prep_time + cook_time, or the time the recipe was asked for when it gives neither"""
+    prep, cook = recipe.get("prep_time"), recipe.get("cook_time")
+    if prep is None and cook is None:
+        return time_available
+    return (prep or 0) + (cook or 0)
+
+
+def _digest(meal_type: str, tags: str, recipe: Mapping[str, Any]) -> str:
+    payload = json.dumps(
+        [meal_type, tags, recipe["title"].strip().lower(), recipe["ingredients"], recipe["steps"]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecipeCorpus:
+    """
+    SQLite store of validated recipes with a lookup and an ingredient index
+
+    Safe to share between threads; the file can be shared by workers on one
+    host. Recipes are stored as plain dicts (RecipeDraft.model_dump()).
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        """
+        Args:
+            path: SQLite file (":memory:" for a throwaway corpus)
+            max_entries: Recipes kept; the least recently served go first
+        """
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS recipes ("
+            " id INTEGER PRIMARY KEY, digest TEXT NOT NULL UNIQUE, meal_type TEXT NOT NULL,"
+            " tags TEXT NOT NULL, total_time INTEGER NOT NULL, servings INTEGER NOT NULL,"
+            " recipe TEXT NOT NULL, created_at REAL NOT NULL, served_at REAL NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS recipes_lookup ON recipes (meal_type, tags, total_time);"
+            "CREATE INDEX IF NOT EXISTS recipes_served ON recipes (served_at);"
+            "CREATE TABLE IF NOT EXISTS recipe_ingredients ("
+            " ingredient TEXT NOT NULL, recipe_id INTEGER NOT NULL REFERENCES recipes (id) ON DELETE CASCADE,"
+            " PRIMARY KEY (ingredient, recipe_id)) WITHOUT ROWID;"
+        )
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+        self.evictions = 0
+
+    def add(
+        self,
+        recipe: Mapping[str, Any],
+        meal_type: str,
+        num_people: int,
+        time_available: int,
+        dietary_restrictions: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """
+        Store a validated recipe with the request it was generated for
+
+        Returns:
+            True if the recipe is new for these restrictions (the same recipe
+            generated under other restrictions is stored separately)
+        """
+        meal_type = meal_type.strip().lower()
+        tags = ",".join(normalize_tags(dietary_restrictions))
+        ingredients = canonical_ingredient_ids("\n".join(recipe["ingredients"]))
+        digest = _digest(meal_type, tags, recipe)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO recipes (digest, meal_type, tags, total_time, servings, recipe, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    digest, meal_type, tags, total_minutes(recipe, time_available), num_people,
+                    json.dumps(dict(recipe), ensure_ascii=False), time.time(),
+                ),
+            )
+            new = cursor.rowcount == 1
+            if new:
+                recipe_id = cursor.lastrowid
+                self.added += 1
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO recipe_ingredients (ingredient, recipe_id) VALUES (?, ?)",
+                    [(ingredient, recipe_id) for ingredient in ingredients],
+                )
+                self._evict()
+        return new
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM recipes").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM recipes WHERE id IN ("
+                " SELECT id FROM recipes ORDER BY served_at, created_at LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def find(
+        self,
+        meal_type: str,
+        num_people: int,
+        time_available: int,
+        dietary_restrictions: Optional[Iterable[str]] = None,
+        preferences: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        A stored recipe for this request, scaled to num_people, or None
+
+        The recipe is marked as served so the next identical request gets
+        another match when there is one.
+        """
+        tags = ",".join(normalize_tags(dietary_restrictions))
+        wanted: List[str] = []
+        if preferences and preferences.strip():
+            if not _EXCLUSION_RE.search(preferences):
+                wanted = canonical_ingredient_ids(preferences)
+            if not wanted:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+        sql = "SELECT id, servings, recipe FROM recipes r WHERE meal_type = ? AND tags = ? AND total_time <= ?"
+        params: List[Any] = [meal_type.strip().lower(), tags, time_available]
+        if wanted:
+            sql += (
+                " AND (SELECT COUNT(*) FROM recipe_ingredients x WHERE x.recipe_id = r.id"
+                f" AND x.ingredient IN ({', '.join('?' * len(wanted))})) = ?"
+            )
+            params.extend(wanted)
+            params.append(len(wanted))
+        sql += " ORDER BY servings = ? DESC, served_at, id LIMIT 1"
+        params.append(num_people)
+
+        with self._lock:
+            row = self._conn.execute(sql, params).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            recipe_id, servings, payload = row
+            self._conn.execute("UPDATE recipes SET served_at = ? WHERE id = ?", (time.time(), recipe_id))
+            self.hits += 1
+
+        recipe = json.loads(payload)
+        if servings != num_people:
+            recipe["ingredients"] = scale_ingredients(recipe["ingredients"], num_people / servings)
+        return recipe
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM recipes")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM recipes").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "added": self.added,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,340 @@
+# app/services/recipe_text.py
+"""
+Pre-extraction reducer for pasted recipe pages.
+
+Users paste whole blog pages into /ai/extract-recipe: navigation, life
+stories, ads, nutrition panels and comments around the part we need.
+reduce_recipe_text keeps the title, the time/servings lines and the
+ingredient and instruction sections, so the prompt is a fraction of the
+page. It is local and deterministic:
+
+- heading heuristics split the page into sections ("Ingredients",
+  "Directions", "Notes", "Comments", ...); inline headings such as
+  "Ingredients: flour, eggs" count too
+- a line classifier (classify_line) labels each line as ingredient, step,
+  meta, prose or short, using the quantity regex, unit table and
+  ingredient matcher from utils.py; it drops noise inside sections and
+  ends an ingredient section that runs into prose
+- when a page repeats its headings (table of contents, "Jump to recipe"),
+  the ingredient section with the most ingredient lines wins, and so does
+  the instruction section that follows it
+
+The result says how much was removed and how confident the split is.
+Below TEXT_REDUCER_MIN_CONFIDENCE, or when little would be saved, the
+full text is used unchanged.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from ai.app.config import settings
+from ai.services.metrics import TEXT_REDUCER_OUTCOMES, TEXT_REDUCTION_RATIO
+from ai.services.utils import ingredient_line_signals
+
+# Reduced text that keeps more than this share of the original is not worth it
+_MIN_GAIN = 0.1
+
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▢☐□◦▪►✓✔]|\[\s?x?\])\s*", re.IGNORECASE)
+_NUMBERED_RE = re.compile(r"^\s*(?:step\s*)?\d{1,2}\s*[.):]\s*|^\s*step\s+\d{1,2}\b\s*[-:.]?\s*", re.IGNORECASE)
+_UNICODE_QTY_RE = re.compile(r"^\s*\d*\s*[½⅓⅔¼¾⅕⅖⅗⅘⅙⅚⅛⅜⅝⅞]")
+_TO_TASTE_RE = re.compile(r"\b(?:to taste|as needed|for serving|for garnish|pinch of|dash of|handful of)\b", re.IGNORECASE)
+_META_RE = re.compile(
+    r"^(?:prep(?:aration)?|cook(?:ing)?|total|active|bake|baking|inactive)\s*time\b"
+    r"|^(?:servings?|serves|yield|makes)\b",
+    re.IGNORECASE,
+)
+_IMPERATIVE_RE = re.compile(
+    r"^(?:preheat|heat|add|mix|stir|bake|cook|combine|whisk|place|pour|serve|bring|boil|simmer|"
+    r"season|remove|transfer|cut|chop|slice|fry|roast|let|drain|spread|sprinkle|melt|beat|fold|"
+    r"cover|grill|toss|top|mash|knead|roll|line|grease|arrange|reduce|return|garnish|blend|put|"
+    r"set|cool|refrigerate|chill|marinate|peel|dice|mince|saut[eé]|warm|divide|shape|brush|"
+    r"squeeze|rinse|wash|soak|microwave|flip|repeat|meanwhile|once|when|while|in a|using)\b",
+    re.IGNORECASE,
+)
+# Page furniture dropped wherever it appears
+_NOISE_LINE_RE = re.compile(
+    r"^(?:advertisement|ad|sponsored|pin(?: it| this| recipe)?|print(?: recipe)?|save(?: recipe)?|"
+    r"jump to recipe|rate this recipe|share|tweet|email|reply|skip to content|"
+    r"photo (?:by|credit).*|https?://\S+|.*\bclick here\b.*)$",
+    re.IGNORECASE,
+)
+_BREADCRUMB_RE = re.compile(r"[»›|>]")
+_HEADING_TRIM_RE = re.compile(r"^[#*=_\s]+|[#*=_:\s]+$")
+_HEADINGS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = tuple(
+    (kind, re.compile(pattern + r"(?:\s*\(.*\))?", re.IGNORECASE))
+    for kind, pattern in (
+        ("ingredients", r"(?:the\s+)?(?:ingredients?(?:\s+list)?|what\s+you(?:'ll|\s+will)?\s+need|"
+                        r"you(?:'ll|\s+will)\s+need|shopping\s+list)"),
+        ("steps", r"(?:instructions?|directions?|method|steps?|preparation|how\s+to\s+make(?:\s+it)?|"
+                  r"procedure|cooking\s+instructions)"),
+        ("noise", r"(?:recipe\s+)?notes?|nutrition(?:\s+(?:facts|information|info))?|comments?|reviews?|"
+                  r"leave\s+a\s+(?:comment|reply|review)|related(?:\s+(?:recipes|posts))?|"
+                  r"you\s+may\s+also\s+like|more\s+recipes|share(?:\s+this)?|about(?:\s+(?:me|the\s+author))?|"
+                  r"equipment|video|faq|frequently\s+asked\s+questions|storage|tips|reader\s+interactions"),
+    )
+)
+
+
+@dataclass
+class ReducedText:
+    """
+    Outcome of reduce_recipe_text
+
+    Attributes:
+        text: Text to extract from (the reduced text, or the original on fallback)
+        original_chars: Length of the pasted text
+        confidence: 0-1, how clearly the ingredient and instruction sections were found
+        reduced: False when the full text is used
+        reason: reduced | low_confidence | no_gain | short | disabled
+        title, meta, ingredients, steps: The sections found (also on fallback)
+    """
+
+    text: str
+    original_chars: int
+    confidence: float
+    reduced: bool
+    reason: str
+    title: Optional[str] = None
+    meta: List[str] = field(default_factory=list)
+    ingredients: List[str] = field(default_factory=list)
+    steps: List[str] = field(default_factory=list)
+
+    @property
+    def reduced_chars(self) -> int:
+        return len(self.text)
+
+    @property
+    def reduction(self) -> float:
+        """Share of the original text removed (0 when the full text is used)"""
+        if not self.original_chars:
+            return 0.0
+        return max(0.0, 1 - self.reduced_chars / self.original_chars)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "reduced": self.reduced,
+            "reason": self.reason,
+            "confidence": round(self.confidence, 2),
+            "original_chars": self.original_chars,
+            "reduced_chars": self.reduced_chars,
+            "reduction": round(self.reduction, 3),
+        }
+
+
+def _strip_marker(line: str) -> str:
+    return _BULLET_RE.sub("", line, count=1).strip()
+
+
+def heading_kind(line: str) -> Tuple[Optional[str], str]:
+    """
+    Section heading test
+
+    Returns:
+        (ingredients | steps | noise | None, inline content after "Heading:")
+    """
+    text = line.strip()
+    head, colon, rest = text.partition(":")
+    candidates = [(text, "")]
+    if colon and rest.strip():
+        candidates.append((head, rest.strip()))
+    for candidate, inline in candidates:
+        cleaned = _HEADING_TRIM_RE.sub("", candidate)
+        if not cleaned or len(cleaned) > 60 or len(cleaned.split()) > 6:
+            continue
+        for kind, pattern in _HEADINGS:
+            if pattern.fullmatch(cleaned):
+                return kind, inline
+    return None, ""
+
+
+def classify_line(line: str) -> str:
+    """
+    Label one line: ingredient, step, meta, prose (long sentence) or short
+    """
+    text = _strip_marker(line)
+    if _META_RE.match(text) and len(text) <= 60:
+        return "meta"
+    numbered = _NUMBERED_RE.match(text)
+    body = text[numbered.end():] if numbered else text
+    words = len(body.split())
+    has_qty, has_unit, known = ingredient_line_signals(body)
+    has_qty = has_qty or _UNICODE_QTY_RE.match(body) is not None
+    if has_qty and words <= 14 and (has_unit or known or words <= 6):
+        return "ingredient"
+    if numbered or _IMPERATIVE_RE.match(body):
+        return "step"
+    if words <= 8 and ((has_unit and known) or (known and words <= 5) or _TO_TASTE_RE.search(body)):
+        return "ingredient"
+    return "prose" if words > 12 else "short"
+
+
+def _split_inline(inline: str) -> List[str]:
+    """ "Ingredients: 3 bananas, 2 cups flour, 1 egg" lists one ingredient per comma"""
+    if not inline:
+        return []
+    parts = [part.strip() for part in re.split(r"[,;]", inline) if part.strip()]
+    if len(parts) > 1 and all(classify_line(part) == "ingredient" for part in parts):
+        return parts
+    return [inline]
+
+
+def _ingredient_lines(lines: List[str]) -> List[str]:
+    """Ingredient section body: ingredient lines and sub-headings, until prose takes over"""
+    kept: List[str] = []
+    prose_run = 0
+    for line in lines:
+        kind = classify_line(line)
+        if kind == "prose":
+            prose_run += 1
+            if prose_run >= 2 and kept:
+                break
+            continue
+        prose_run = 0
+        text = _strip_marker(line)
+        if kind == "ingredient" or (kind == "short" and (text.endswith(":") or len(text.split()) <= 5)):
+            kept.append(text)
+    return kept
+
+
+def _step_lines(lines: List[str]) -> List[str]:
+    """Instruction section body: every line, numbering and bullets removed"""
+    steps = []
+    for line in lines:
+        text = _strip_marker(line)
+        numbered = _NUMBERED_RE.match(text)
+        text = text[numbered.end():].strip() if numbered else text
+        if text:
+            steps.append(text)
+    return steps
+
+
+def _is_title(line: str) -> bool:
+    return (
+        len(line) <= 100
+        and len(line.split()) <= 12
+        and not line.endswith((".", "!", "?", ":"))
+        and not _BREADCRUMB_RE.search(line)
+        and heading_kind(line)[0] is None
+        and not _META_RE.match(line)
+        and not _NUMBERED_RE.match(line)
+        and not _BULLET_RE.match(line)
+        and not ingredient_line_signals(line)[0]
+        and classify_line(line) != "step"
+    )
+
+
+def _title(lines: List[str], ingredients_at: Optional[int]) -> Optional[str]:
+    """
+    The recipe card's own title (the short line just above its ingredients
+    heading, past description and time lines), else the first line of the page
+    """
+    if ingredients_at is not None:
+        for line in reversed(lines[max(0, ingredients_at - 6):ingredients_at]):
+            if _is_title(line):
+                return line
+    return next((line for line in lines[:3] if _is_title(line)), None)
+
+
+def _confidence(has_ingredient_heading: bool, has_step_heading: bool, ingredients: int, steps: int) -> float:
+    if not ingredients or not steps:
+        return 0.0
+    return (
+        0.25 * has_ingredient_heading
+        + 0.25 * has_step_heading
+        + 0.25 * min(ingredients / 3, 1.0)
+        + 0.25 * min(steps / 2, 1.0)
+    )
+
+
+def _render(title: Optional[str], meta: List[str], ingredients: List[str], steps: List[str]) -> str:
+    parts = []
+    if title:
+        parts.append(title)
+    parts.extend(meta)
+    parts.append("")
+    parts.append("Ingredients:")
+    parts.extend(line if line.endswith(":") else f"- {line}" for line in ingredients)
+    parts.append("")
+    parts.append("Instructions:")
+    parts.extend(f"{i}. {step}" for i, step in enumerate(steps, start=1))
+    return "\n".join(parts).strip()
+
+
+def reduce_recipe_text(text: str) -> ReducedText:
+    """
+    Keep only the parts of a pasted page the extractor needs
+
+    Args:
+        text: Raw pasted text
+
+    Returns:
+        ReducedText; .text is what to put in the extraction prompt
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if line and not _NOISE_LINE_RE.match(line)]
+
+    # Sections: (kind, heading index, body lines); the preamble has no heading
+    sections: List[Tuple[str, int, List[str]]] = [("preamble", -1, [])]
+    for i, line in enumerate(lines):
+        kind, inline = heading_kind(line)
+        if kind is not None:
+            sections.append((kind, i, _split_inline(inline) if kind == "ingredients" else [inline] if inline else []))
+        else:
+            sections[-1][2].append(line)
+
+    ingredient_sections = [
+        (pos, _ingredient_lines(body)) for pos, (kind, _, body) in enumerate(sections) if kind == "ingredients"
+    ]
+    chosen_pos, ingredients = max(
+        ingredient_sections, key=lambda item: (len(item[1]), item[0]), default=(None, [])
+    )
+    if not ingredients:
+        chosen_pos = None
+        # No usable heading: collect ingredient-looking lines from anywhere
+        ingredients = _ingredient_lines([l for l in lines if classify_line(l) == "ingredient"])
+
+    step_sections = [(pos, _step_lines(body)) for pos, (kind, _, body) in enumerate(sections) if kind == "steps"]
+    following = [s for s in step_sections if chosen_pos is not None and s[0] > chosen_pos and s[1]]
+    _, steps = following[0] if following else max(step_sections, key=lambda item: len(item[1]), default=(None, []))
+    has_step_heading = bool(steps)
+    if not steps:
+        steps = _step_lines([l for l in lines if _NUMBERED_RE.match(_strip_marker(l))])
+
+    meta = list(dict.fromkeys(l for l in lines if classify_line(l) == "meta"))
+    title = _title(lines, sections[chosen_pos][1] if chosen_pos is not None else None)
+
+    confidence = _confidence(chosen_pos is not None and bool(ingredients), has_step_heading, len(ingredients), len(steps))
+    result = ReducedText(
+        text=text,
+        original_chars=len(text),
+        confidence=confidence,
+        reduced=False,
+        reason="disabled",
+        title=title,
+        meta=meta,
+        ingredients=ingredients,
+        steps=steps,
+    )
+    if not settings.enable_text_reducer:
+        return result
+    if len(text) < settings.text_reducer_min_chars:
+        result.reason = "short"
+        return result
+    if confidence < settings.text_reducer_min_confidence:
+        result.reason = "low_confidence"
+        return result
+    reduced = _render(title, meta, ingredients, steps)
+    if len(reduced) > len(text) * (1 - _MIN_GAIN):
+        result.reason = "no_gain"
+        return result
+    result.text = reduced
+    result.reduced = True
+    result.reason = "reduced"
+    return result
+
+
+def record_reduction(result: ReducedText) -> None:
+    """Count the outcome and the share of text removed in /metrics"""
+    TEXT_REDUCER_OUTCOMES.inc(result.reason)
+    TEXT_REDUCTION_RATIO.observe(result.reduction)
@@ -0,0 +1,292 @@
+# app/services/retry.py
+"""
+Retry policy for LLM provider calls.
+
+- classify_error: sorts a failure into a small set of kinds (rate_limit,
+  server, timeout, connection, invalid_json, auth, bad_request, unknown)
+  so retryable failures can be told apart from fatal ones.
+- RetryPolicy: capped exponential backoff with full jitter that honours
+  a provider's Retry-After header.
+- RetryBudget: process-wide cap on retries as a fraction of recent
+  requests, so an outage cannot multiply load by MAX_RETRIES.
+- CircuitBreaker: per-provider breaker that fails fast while a provider
+  keeps failing and lets a single probe through after a cool-down.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+
+# Kinds worth another attempt; anything else is returned to the caller at once
+RETRYABLE_ERRORS = frozenset(
+    {"rate_limit", "server", "timeout", "connection", "invalid_json", "unknown"}
+)
+# Kinds that say the provider itself is unhealthy (counted by the breaker)
+PROVIDER_FAILURES = frozenset({"rate_limit", "server", "timeout", "connection"})
+
+
+class ProviderUnavailableError(Exception):
+    """
+    No provider can take the request right now (surfaced as HTTP 503)
+
+    Attributes:
+        retry_after: Suggested seconds before trying again, if known
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ProviderUnavailableError):
+    """The provider's circuit breaker is open"""
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify a failed provider call
+
+    Works on the OpenAI and Groq SDK exceptions (which expose status_code
+    and response) as well as raw httpx/asyncio errors, without importing
+    either SDK.
+
+    Returns:
+        One of: rate_limit, server, timeout, connection, invalid_json,
+        auth, bad_request, unknown
+    """
+    if isinstance(error, json.JSONDecodeError):
+        return "invalid_json"
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    if "Timeout" in type(error).__name__:  # e.g. openai.APITimeoutError
+        return "timeout"
+
+    status = _status_code(error)
+    if status is not None:
+        if status == 429:
+            return "rate_limit"
+        if status in (401, 403):
+            return "auth"
+        if status == 408:
+            return "timeout"
+        if status >= 500:
+            return "server"
+        if status >= 400:
+            return "bad_request"
+
+    if isinstance(error, httpx.TransportError) or "Connection" in type(error).__name__:
+        return "connection"
+    return "unknown"
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """
+    Read a Retry-After hint from a provider error response
+
+    Accepts retry-after-ms, Retry-After in seconds and Retry-After as an
+    HTTP date.
+
+    Returns:
+        Seconds to wait, or None if the response carried no hint
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000.0)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter
+
+    The pause before retry n is uniform in [0, min(max_delay, base * 2**n)],
+    which spreads retries from many callers instead of having them hit the
+    provider in lock-step. A Retry-After hint is treated as a floor.
+    """
+
+    def __init__(self, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Optional[BaseException] = None) -> Optional[float]:
+        """
+        Seconds to wait after the given (zero-based) failed attempt
+
+        Returns:
+            The pause, or None when the provider asked us to wait longer
+            than max_delay (retrying within this request is pointless)
+        """
+        backoff = random.uniform(0.0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hint = retry_after_seconds(error) if error is not None else None
+        if hint is None:
+            return backoff
+        if hint > self.max_delay:
+            return None
+        return max(hint, backoff)
+
+
+class RetryBudget:
+    """
+    Process-wide limit on retries relative to traffic
+
+    Over a sliding window, retries may not exceed ratio * requests plus a
+    small floor (min_per_second * window) so low traffic can still retry.
+    When a provider is down every request fails, the budget runs dry, and
+    further failures are returned immediately instead of tripling load.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_per_second: float = 1.0,
+        window_seconds: float = 10.0,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """Count one logical request (not its retries)"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """Spend budget on one retry; False if the budget is exhausted"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            allowed = self.min_per_second * self.window_seconds + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                self.rejected += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return budget usage over the current window"""
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "window_seconds": self.window_seconds,
+                "requests": len(self._requests),
+                "retries": len(self._retries),
+                "rejected": self.rejected,
+            }
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one provider
+
+    - closed: calls flow; consecutive provider failures are counted
+    - open: after failure_threshold failures in a row, calls are refused
+      for reset_seconds
+    - half_open: one probe call is let through; success closes the
+      breaker, failure opens it again. If the probe never reports back
+      (e.g. it was cancelled), another is allowed after reset_seconds.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._changed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may go to the provider now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._changed_at >= self.reset_seconds:
+                self._state = self.HALF_OPEN
+                self._changed_at = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a probe through"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._changed_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != self.CLOSED:
+                self._state = self.CLOSED
+                self._changed_at = time.monotonic()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._changed_at = time.monotonic()
+                self.opened += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state and counters for monitoring"""
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retry_after_seconds": round(retry_after, 3),
+            }
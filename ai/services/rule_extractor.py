@@ -0,0 +1,141 @@
+# app/services/rule_extractor.py
+"""
+Rule-based recipe extraction for well-structured pasted text.
+
+Most texts sent to /ai/extract-recipe already have a title, an ingredient
+list and numbered steps. extract_with_rules builds the recipe from the
+sections reduce_recipe_text found, without an LLM call:
+
+- ingredients are cleaned with normalize_ingredients; parse_ingredient
+  tells how many of them read as real ingredient lines
+- "Prep time" / "Cook time" lines give prep_time and cook_time in minutes
+- confidence (0-1) combines how clearly the sections were found, the share
+  of ingredient lines that parse, the share of steps that read as
+  instructions, and whether there is a title
+
+The route only serves the result when it is complete and confidence is at
+least RULE_EXTRACTOR_MIN_CONFIDENCE; otherwise the LLM extracts as before.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ai.app.config import settings
+from ai.services.metrics import RULE_EXTRACTOR_OUTCOMES
+from ai.services.recipe_text import ReducedText, classify_line
+from ai.services.utils import ingredient_line_signals, normalize_ingredients, parse_ingredient
+
+_HOURS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:h|hrs?|hours?)\b", re.IGNORECASE)
+_MINUTES_RE = re.compile(r"(\d+)\s*(?:m|mins?|minutes?)\b", re.IGNORECASE)
+_BARE_NUMBER_RE = re.compile(r"[:\s](\d+)\s*$")
+_PREP_RE = re.compile(r"^prep(?:aration)?\s*time\b", re.IGNORECASE)
+_COOK_RE = re.compile(r"^(?:cook(?:ing)?|bake|baking)\s*time\b", re.IGNORECASE)
+
+# Weights of the confidence components (sum to 1)
+_W_SECTIONS = 0.4
+_W_INGREDIENTS = 0.35
+_W_STEPS = 0.15
+_W_TITLE = 0.1
+
+
+@dataclass
+class RuleExtraction:
+    """
+    Outcome of extract_with_rules
+
+    Attributes:
+        draft: RecipeDraft fields (title, ingredients, steps, prep_time, cook_time)
+        confidence: 0-1, how much the draft can be trusted without the LLM
+        accepted: True when the route should serve the draft
+        reason: accepted | low_confidence | incomplete | disabled
+        missing: Required parts not found (title, ingredients, steps)
+    """
+
+    draft: Dict[str, Any]
+    confidence: float
+    accepted: bool
+    reason: str
+    missing: List[str] = field(default_factory=list)
+
+
+def parse_minutes(line: str) -> Optional[int]:
+    """
+    Minutes in a time line: "Cook Time: 1 hour 20 mins" -> 80, "Prep time: 5" -> 5
+    """
+    hours = sum(float(h) for h in _HOURS_RE.findall(line))
+    minutes = sum(int(m) for m in _MINUTES_RE.findall(line))
+    if not hours and not minutes:
+        bare = _BARE_NUMBER_RE.search(line)
+        if bare is None:
+            return None
+        minutes = int(bare.group(1))
+    return int(round(hours * 60 + minutes))
+
+
+def _times(meta: List[str]) -> Dict[str, Optional[int]]:
+    times: Dict[str, Optional[int]] = {"prep_time": None, "cook_time": None}
+    for line in meta:
+        key = "prep_time" if _PREP_RE.match(line) else "cook_time" if _COOK_RE.match(line) else None
+        if key and times[key] is None:
+            times[key] = parse_minutes(line)
+    return times
+
+
+def _parses(line: str) -> bool:
+    """A quantity was read, or the line names a known ingredient"""
+    return parse_ingredient(line)["quantity"] is not None or ingredient_line_signals(line)[2]
+
+
+def _reads_as_step(step: str) -> bool:
+    return 2 <= len(step.split()) <= 80 and classify_line(step) != "ingredient"
+
+
+def extract_with_rules(reduced: ReducedText) -> RuleExtraction:
+    """
+    Build a recipe from the sections of a reduced text
+
+    Args:
+        reduced: reduce_recipe_text result (its sections are set on fallback too)
+
+    Returns:
+        RuleExtraction; .draft is valid RecipeDraft input when .accepted
+    """
+    # Sub-headings such as "For the sauce:" are not ingredients
+    lines = [line for line in reduced.ingredients if not line.endswith(":")]
+    steps = list(reduced.steps)
+    draft: Dict[str, Any] = {
+        "title": reduced.title or "",
+        "ingredients": normalize_ingredients(lines),
+        "steps": steps,
+        **_times(reduced.meta),
+    }
+
+    missing = [
+        name for name, ok in (("title", reduced.title), ("ingredients", len(lines) >= 2), ("steps", steps)) if not ok
+    ]
+    confidence = 0.0
+    if lines and steps:
+        confidence = (
+            _W_SECTIONS * reduced.confidence
+            + _W_INGREDIENTS * sum(map(_parses, lines)) / len(lines)
+            + _W_STEPS * sum(map(_reads_as_step, steps)) / len(steps)
+            + _W_TITLE * bool(reduced.title)
+        )
+
+    result = RuleExtraction(draft=draft, confidence=confidence, accepted=False, reason="disabled", missing=missing)
+    if not settings.enable_rule_extractor:
+        return result
+    if missing:
+        result.reason = "incomplete"
+    elif confidence < settings.rule_extractor_min_confidence:
+        result.reason = "low_confidence"
+    else:
+        result.accepted = True
+        result.reason = "accepted"
+    return result
+
+
+def record_rule_extraction(result: RuleExtraction) -> None:
+    """Count the outcome in /metrics"""
+    RULE_EXTRACTOR_OUTCOMES.inc(result.reason)
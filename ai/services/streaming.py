@@ -0,0 +1,105 @@
+# app/services/streaming.py
+"""
+Incremental parsing of a streamed recipe JSON completion.
+
+The LLM streams text like {"title": "...", "ingredients": ["...", ...], ...}
+in arbitrary chunks. RecipeStreamParser scans the chunks as they arrive and
+reports each top-level "title" value and each "ingredients" / "steps" list
+entry as soon as its closing quote is seen, so the API can push them to
+the client long before the completion ends.
+
+The parser only tracks what it needs (nesting, strings, the current
+top-level key); the full text is still parsed and validated at the end.
+"""
+
+import json
+from typing import List, Optional, Tuple
+
+# key -> event name emitted for each completed string under it
+_SCALAR_KEYS = {"title": "title"}
+_LIST_KEYS = {"ingredients": "ingredient", "steps": "step"}
+
+
+class RecipeStreamParser:
+    """
+    Feed completion chunks; get back ("title" | "ingredient" | "step", text)
+    events for values that just completed.
+    """
+
+    def __init__(self):
+        self.text_parts: List[str] = []
+        self._depth = 0           # nesting depth of {} and []
+        self._started = False     # seen the opening "{" of the object
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []  # raw characters of the current string
+        self._top_key: Optional[str] = None  # last key read at depth 1
+        self._expect_key = True    # at depth 1, next string is a key
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return "".join(self.text_parts)
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """
+        Consume a chunk of completion text
+
+        Returns:
+            Events for values completed within this chunk, in order
+        """
+        self.text_parts.append(chunk)
+        events: List[Tuple[str, str]] = []
+        for ch in chunk:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._buf.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                    self._buf.append(ch)
+                elif ch == '"':
+                    self._in_string = False
+                    self._end_string(events)
+                else:
+                    self._buf.append(ch)
+                continue
+
+            if not self._started:
+                # skip anything (e.g. a markdown fence) before the object
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._buf = []
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._top_key = None
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._top_key = None
+        return events
+
+    def _end_string(self, events: List[Tuple[str, str]]) -> None:
+        raw = "".join(self._buf)
+        try:
+            value = json.loads(f'"{raw}"')
+        except ValueError:
+            value = raw
+
+        if self._depth == 1:
+            if self._expect_key:
+                self._top_key = value
+            elif self._top_key in _SCALAR_KEYS:
+                events.append((_SCALAR_KEYS[self._top_key], value))
+        elif self._depth == 2 and self._top_key in _LIST_KEYS:
+            events.append((_LIST_KEYS[self._top_key], value))
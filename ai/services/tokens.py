@@ -0,0 +1,237 @@
+# app/services/tokens.py
+"""
+Local token counting and per-template token budgets.
+
+Every prompt is counted before it is sent so oversized requests are
+refused without paying for them, and each call asks for a max_tokens that
+fits what the template actually needs:
+
+- count_tokens: tiktoken when it is installed (TOKENIZER_ENCODING),
+  otherwise a local pre-tokenizer that splits text the way BPE
+  tokenizers do (words, 1-3 digit groups, punctuation runs) and prices
+  each piece; it errs on the high side, which is the safe direction for
+  budgets and rate limits
+- TOKEN_BUDGETS: per prompt template (one per route), the largest prompt
+  accepted and how many completion tokens to request. Completion size is
+  a fixed part plus a share per expected recipe (batch) or per input
+  token (extraction output is a cleaned copy of its input), capped and
+  never more than the context window leaves free
+- plan_tokens: prompt tokens + max_tokens for one prompt, or
+  TokenBudgetExceeded (surfaced as HTTP 413) when it does not fit
+
+Plain string prompts (not rendered from a template) are counted but have
+no budget and no max_tokens.
+"""
+
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, NamedTuple, Optional
+
+from ai.app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Chat formatting around each message, and the primer of the reply
+# (OpenAI's published accounting; close enough for Llama chat templates)
+MESSAGE_OVERHEAD = 4
+REPLY_OVERHEAD = 3
+
+# Same split as the GPT-4 / Llama 3 pre-tokenizers: contractions, letter
+# runs with their leading space, 1-3 digit groups, punctuation runs, newlines
+_PIECE_RE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|_+|\s*\n|\s+(?!\S)|\s+"
+)
+
+
+class TokenBudgetExceeded(ValueError):
+    """
+    A prompt does not fit its template's budget (surfaced as HTTP 413)
+
+    Attributes:
+        template: Template the prompt was rendered from
+        prompt_tokens: Estimated prompt tokens
+        limit: Largest prompt the budget allows
+    """
+
+    def __init__(self, template: str, prompt_tokens: int, limit: int):
+        super().__init__(
+            f"Prompt too large for {template}: ~{prompt_tokens} tokens, limit {limit}"
+        )
+        self.template = template
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    """
+    Token limits for one prompt template
+
+    Attributes:
+        max_prompt_tokens: Largest prompt (system + user + formatting) accepted
+        completion_tokens: Completion tokens always requested
+        completion_per_item: Extra completion tokens per expected recipe
+        completion_per_input_token: Extra completion tokens per user-message token
+        max_completion_tokens: Cap on max_tokens
+    """
+
+    max_prompt_tokens: int
+    completion_tokens: int
+    completion_per_item: int = 0
+    completion_per_input_token: float = 0.0
+    max_completion_tokens: int = 0
+
+    def completion_for(self, items: int, input_tokens: int) -> int:
+        wanted = (
+            self.completion_tokens
+            + self.completion_per_item * items
+            + math.ceil(self.completion_per_input_token * input_tokens)
+        )
+        return min(wanted, self.max_completion_tokens) if self.max_completion_tokens else wanted
+
+
+TOKEN_BUDGETS: Dict[str, TokenBudget] = {
+    # One recipe: ~300-600 tokens of JSON
+    "meal_suggestion": TokenBudget(1000, 900, max_completion_tokens=900),
+    # One recipe per slot (slots_per_prompt <= 7)
+    "batch_meal_suggestion": TokenBudget(2500, 100, completion_per_item=800, max_completion_tokens=6000),
+    # The answer is a cleaned-up copy of the pasted text. Any text the request
+    # model accepts (MAX_RECIPE_TEXT_LENGTH chars) fits: dense ingredient lists
+    # run ~0.35 tokens per char, plus ~450 for the system prompt
+    "recipe_extraction": TokenBudget(
+        math.ceil(settings.max_recipe_text_length * 0.5) + 600, 400,
+        completion_per_input_token=1.2, max_completion_tokens=3000,
+    ),
+    "supportive_message": TokenBudget(600, 150, max_completion_tokens=150),
+}
+
+
+def _parse_overrides(spec: str) -> Dict[str, int]:
+    """PROMPT_TOKEN_BUDGETS: "recipe_extraction:4000,meal_suggestion:1200" """
+    overrides = {}
+    for entry in spec.split(","):
+        name, _, value = entry.strip().partition(":")
+        if not name:
+            continue
+        try:
+            overrides[name.strip()] = int(value)
+        except ValueError:
+            logger.warning(f"Ignoring invalid PROMPT_TOKEN_BUDGETS entry: {entry!r}")
+    return overrides
+
+
+for _name, _limit in _parse_overrides(settings.prompt_token_budgets).items():
+    if _name in TOKEN_BUDGETS:
+        _budget = TOKEN_BUDGETS[_name]
+        TOKEN_BUDGETS[_name] = TokenBudget(
+            _limit, _budget.completion_tokens, _budget.completion_per_item,
+            _budget.completion_per_input_token, _budget.max_completion_tokens,
+        )
+    else:
+        logger.warning(f"PROMPT_TOKEN_BUDGETS names an unknown prompt template: {_name}")
+
+
+# -------------------------
+# Counting
+# -------------------------
+_ENCODER = None
+_ENCODER_LOADED = False
+
+
+def _encoder():
+    """The tiktoken encoding, or None to use the local estimate"""
+    global _ENCODER, _ENCODER_LOADED
+    if not _ENCODER_LOADED:
+        _ENCODER_LOADED = True
+        if settings.tokenizer_encoding and settings.tokenizer_encoding != "estimate":
+            try:
+                import tiktoken
+                _ENCODER = tiktoken.get_encoding(settings.tokenizer_encoding)
+            except ImportError:
+                logger.info("tiktoken not installed; using the local token estimate")
+            except Exception as e:  # noqa: BLE001 - unknown encoding, no cached BPE file offline
+                logger.warning(f"Tokenizer {settings.tokenizer_encoding!r} unavailable ({e}); using the local token estimate")
+    return _ENCODER
+
+
+def _piece_tokens(piece: str) -> int:
+    word = piece.lstrip(" ")
+    if not word or word.isspace():
+        return 1
+    if word[0].isalpha():
+        if word.isascii():
+            # Common English words are one token; long or rare ones split
+            return 1 if len(word) <= 7 else math.ceil(len(word) / 5)
+        return math.ceil(len(word) / 2)
+    if word[0].isdigit():
+        return 1
+    return math.ceil(len(word) / 2)
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens in text: exact with tiktoken, otherwise the local pre-tokenizer estimate"""
+    if not text:
+        return 0
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return sum(_piece_tokens(piece) for piece in _PIECE_RE.findall(text))
+
+
+# -------------------------
+# Budgeting
+# -------------------------
+class TokenPlan(NamedTuple):
+    """Token accounting for one prompt, decided before the provider call"""
+
+    template: str
+    prompt_tokens: int
+    max_tokens: Optional[int]
+
+
+def plan_tokens(prompt: str, system: str) -> TokenPlan:
+    """
+    Count a prompt and choose max_tokens for its completion
+
+    A prompts.Prompt carries its template name, the precounted size of its
+    static system message and the number of recipes expected; the plan is
+    memoized on it so retries and failover do not count it again.
+
+    Args:
+        prompt: The user message
+        system: The system message it is sent with
+
+    Raises:
+        TokenBudgetExceeded: If the prompt is over its template's budget or
+            leaves no room for the completion in LLM_CONTEXT_TOKENS
+    """
+    plan = getattr(prompt, "token_plan", None)
+    if plan is not None:
+        return plan
+
+    template = getattr(prompt, "template", "") or ""
+    system_tokens = getattr(prompt, "static_tokens", None)
+    if system_tokens is None:
+        system_tokens = estimate_tokens(system)
+    user_tokens = estimate_tokens(prompt)
+    prompt_tokens = system_tokens + user_tokens + 2 * MESSAGE_OVERHEAD + REPLY_OVERHEAD
+
+    budget = TOKEN_BUDGETS.get(template) if settings.enable_token_budgets else None
+    max_tokens = None
+    if budget is not None:
+        if prompt_tokens > budget.max_prompt_tokens:
+            raise TokenBudgetExceeded(template, prompt_tokens, budget.max_prompt_tokens)
+        max_tokens = budget.completion_for(getattr(prompt, "items", 1), user_tokens)
+        room = settings.llm_context_tokens - prompt_tokens
+        if room < min(max_tokens, budget.completion_tokens):
+            raise TokenBudgetExceeded(template, prompt_tokens, settings.llm_context_tokens - budget.completion_tokens)
+        max_tokens = min(max_tokens, room)
+
+    plan = TokenPlan(template, prompt_tokens, max_tokens)
+    try:
+        prompt.token_plan = plan
+    except AttributeError:
+        pass  # plain str prompt
+    return plan
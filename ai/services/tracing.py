@@ -0,0 +1,360 @@
+# app/services/tracing.py
+"""
+Lightweight per-request tracing.
+
+Each HTTP request gets a trace keyed by its X-Request-ID (sent by the Node
+backend's aiClient, or generated here). Code marks interesting sections
+with spans:
+
+    with span("llm.attempt", provider="groq"):
+        ...
+    with stage("normalize"):      # span + ai_stage_duration_seconds
+        ...
+
+Spans nest automatically (parent = enclosing span) and follow the request
+into asyncio tasks through contextvars. Outside a traced request, span()
+only measures time for the optional metric, so library code can be
+instrumented unconditionally.
+
+Finished traces are handed to a background thread and written as JSON
+lines (TRACING_EXPORTER=jsonl) or posted to an OTLP/HTTP collector
+(TRACING_EXPORTER=otlp, JSON encoding), so exporting never blocks a
+request. TracingMiddleware also returns a Server-Timing header with the
+per-stage durations, which browser dev tools display directly.
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional
+
+import httpx
+
+from ai.app.config import settings
+from ai.services.metrics import REQUEST_LLM_TOKENS, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_HEX32_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class Trace:
+    """Spans recorded for one request, plus the LLM tokens it used"""
+
+    __slots__ = ("request_id", "trace_id", "spans", "usage", "_lock")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        compact = request_id.replace("-", "").lower()
+        self.trace_id = (
+            compact if _HEX32_RE.match(compact)
+            else hashlib.sha256(request_id.encode("utf-8")).hexdigest()[:32]
+        )
+        self.spans: List[Dict[str, Any]] = []
+        self.usage: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(record)
+
+    def add_usage(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            for kind, tokens in counts.items():
+                self.usage[kind] = self.usage.get(kind, 0) + tokens
+
+    def server_timing(self) -> str:
+        """Server-Timing value: total milliseconds per span name, in first-seen order"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for record in self.spans:
+                if record["parent_id"] is None:
+                    continue  # the root request span is the whole response
+                totals[record["name"]] = totals.get(record["name"], 0.0) + record["duration_ms"]
+        return ", ".join(
+            f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)};dur={ms:.1f}" for name, ms in totals.items()
+        )
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("ai_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("ai_span", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    """Request ID of the trace active in this context, if any"""
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+def record_llm_usage(**counts: int) -> None:
+    """
+    Add LLM token counts to the active request (no-op outside one)
+
+    Kinds used by the LLM client: estimated_prompt (local count before the
+    call), prompt, completion and cached_prompt (provider-reported). The
+    totals end up on the http.request span as llm.<kind>_tokens and in
+    the ai_request_llm_tokens histogram.
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_usage(counts)
+
+
+class span:
+    """
+    Context manager recording one span in the active trace
+
+    Args:
+        name: Span name (e.g. "prompt", "llm.attempt")
+        metric: Optional histogram observing the duration labelled by name
+        **attributes: Extra key/values stored on the span
+    """
+
+    __slots__ = ("name", "attributes", "metric", "_trace", "_span_id", "_parent", "_token", "_start", "_wall")
+
+    def __init__(self, name: str, metric=None, **attributes: Any):
+        self.name = name
+        self.metric = metric
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "span":
+        self._trace = _current_trace.get()
+        if self._trace is not None:
+            self._span_id = f"{random.getrandbits(64):016x}"
+            self._parent = _current_span.get()
+            self._token = _current_span.set(self._span_id)
+            self._wall = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._start
+        if self.metric is not None:
+            self.metric.observe(duration, self.name)
+        if self._trace is not None:
+            _current_span.reset(self._token)
+            record = {
+                "name": self.name,
+                "span_id": self._span_id,
+                "parent_id": self._parent,
+                "start_unix_nano": self._wall,
+                "end_unix_nano": self._wall + int(duration * 1e9),
+                "duration_ms": round(duration * 1000, 3),
+                "attributes": self.attributes,
+                "status": "ok" if exc_type is None else "error",
+            }
+            if exc_type is not None:
+                record["error"] = f"{exc_type.__name__}: {exc}"[:500]
+            self._trace.add(record)
+        return False
+
+
+def stage(name: str) -> span:
+    """A span that also feeds the per-stage latency histogram"""
+    return span(name, metric=STAGE_SECONDS)
+
+
+async def run_in_trace(trace: Trace, awaitable: Awaitable[Any]) -> Any:
+    """
+    Await work with its spans and LLM usage recorded in trace
+
+    Used for work shared by several requests (coalesced LLM calls): it
+    records into a trace of its own, and every request that used the
+    result copies it in with adopt().
+    """
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return await awaitable
+
+
+def adopt(trace: Trace, **attributes: Any) -> None:
+    """
+    Copy the spans and LLM usage of a shared trace into the active request
+
+    Top-level spans of the shared trace are parented to the current span;
+    attributes are added to every copied span. No-op outside a request.
+    """
+    target = _current_trace.get()
+    if target is None or target is trace:
+        return
+    parent = _current_span.get()
+    with trace._lock:
+        records = list(trace.spans)
+        usage = dict(trace.usage)
+    for record in records:
+        target.add({
+            **record,
+            "parent_id": record["parent_id"] or parent,
+            "attributes": {**record["attributes"], **attributes},
+        })
+    target.add_usage(usage)
+
+
+# -------------------------
+# Export
+# -------------------------
+def to_otlp(trace: Trace, service_name: str = "ai-orchestrator") -> Dict[str, Any]:
+    """Encode a trace as an OTLP/HTTP JSON ExportTraceServiceRequest"""
+
+    def attr(key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    spans = []
+    for record in trace.spans:
+        otlp_span = {
+            "traceId": trace.trace_id,
+            "spanId": record["span_id"],
+            "name": record["name"],
+            "kind": 2 if record["parent_id"] is None else 1,  # SERVER for the root, else INTERNAL
+            "startTimeUnixNano": str(record["start_unix_nano"]),
+            "endTimeUnixNano": str(record["end_unix_nano"]),
+            "attributes": [attr("request.id", trace.request_id)]
+            + [attr(k, v) for k, v in record["attributes"].items()],
+            "status": {"code": 2, "message": record["error"]} if record["status"] == "error" else {"code": 1},
+        }
+        if record["parent_id"] is not None:
+            otlp_span["parentSpanId"] = record["parent_id"]
+        spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [attr("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "ai.services.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class _Exporter:
+    """Background thread writing finished traces; drops traces if it falls behind"""
+
+    def __init__(self, max_queue: int = 1000):
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def submit(self, trace: Trace) -> None:
+        if settings.tracing_exporter == "none" or not trace.spans:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Block until every submitted trace has been written"""
+        self._queue.join()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            try:
+                self._write(trace)
+            except Exception as e:  # noqa: BLE001
+                logger.debug(f"Trace export failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, trace: Trace) -> None:
+        exporter = settings.tracing_exporter
+        if exporter == "jsonl":
+            path = Path(settings.trace_jsonl_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(
+                {"request_id": trace.request_id, "trace_id": trace.trace_id, "spans": trace.spans},
+                ensure_ascii=False,
+            )
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        elif exporter == "otlp":
+            httpx.post(
+                settings.otlp_endpoint.rstrip("/") + "/v1/traces", json=to_otlp(trace), timeout=2.0
+            )
+
+
+EXPORTER = _Exporter()
+
+
+# -------------------------
+# Middleware
+# -------------------------
+class TracingMiddleware:
+    """
+    ASGI middleware opening a trace per HTTP request
+
+    - Uses the incoming X-Request-ID (from the Node aiClient) or creates one
+    - Echoes X-Request-ID and adds Server-Timing to the response
+    - Submits the finished trace to the configured exporter
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get("headers", ()):
+            if key == REQUEST_ID_HEADER:
+                candidate = value.decode("latin-1").strip()
+                if _REQUEST_ID_RE.match(candidate):
+                    request_id = candidate
+                break
+        trace = Trace(request_id or uuid.uuid4().hex)
+        trace_token = _current_trace.set(trace)
+        root = span("http.request", method=scope.get("method", ""), path=scope.get("path", ""))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((REQUEST_ID_HEADER, trace.request_id.encode("latin-1")))
+                if settings.server_timing:
+                    timing = trace.server_timing()
+                    total = (time.perf_counter() - root._start) * 1000
+                    value = f"{timing}, total;dur={total:.1f}" if timing else f"total;dur={total:.1f}"
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                message = {**message, "headers": headers}
+                root.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        try:
+            with root:
+                await self.app(scope, receive, send_wrapper)
+                route = scope.get("route")
+                if route is not None:
+                    root.set_attribute("http.route", route.path)
+                for kind, tokens in trace.usage.items():
+                    root.set_attribute(f"llm.{kind}_tokens", tokens)
+                    if route is not None:
+                        REQUEST_LLM_TOKENS.observe(tokens, route.path, kind)
+        finally:
+            _current_trace.reset(trace_token)
+            EXPORTER.submit(trace)
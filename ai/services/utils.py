@@ -4,21 +4,37 @@ Utilities: load canonical maps from project 'data' folder and provide
 ingredient parsing, normalization, and shopping list aggregation.
 
 Place the canonical JSON files at:
-  <project_root>/data/CanonicalMap.json
+  <project_root>/data/IngredientCanonicalMap.json
   <project_root>/data/UnitNormalizationMap.json
 
 This file provides:
 - parse_ingredient(line)
 - clean_ingredient_line(line)
 - normalize_ingredients(list[str])
+- ingredient_line_signals(line)  (quantity / unit / known ingredient flags)
+- canonical_ingredient_ids(text)  (canonical map keys mentioned in text)
+- scale_ingredients(list[str], factor)
+- load_canonical_maps(ingredients, units)  (reload / swap maps; clears caches)
+- ingredient_cache_stats()
+- parse_ingredients_batch(lines) -> IngredientColumns
 - aggregate_shopping_list(recipes: List[dict]) -> List[dict]
 """
 
 import json
+import math
+import os
 import re
+import tempfile
+from array import array
+from dataclasses import dataclass, field
 from fractions import Fraction
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ai.services.cache import LRUCache
+from ai.services.map_index import MapIndex, SourceIndex, load_index, read_sources
+from ai.services.matcher import VariantMatcher
 
 # -------------------------
 # Locate project data folder (supports 'data' or 'Data')
@@ -41,47 +57,117 @@ def _find_data_file(filename: str) -> Optional[Path]:
 # -------------------------
 # Load canonical maps
 # -------------------------
-CANONICAL_INGREDIENTS: Dict[str, Any] = {}
-UNIT_MAP: List[Dict[str, Any]] = []
+# The maps are compiled into a memory-mapped index (see map_index.py) that
+# is rebuilt automatically when the JSON files change. The default location
+# is the user cache dir, outside the source tree.
+def _default_map_index_path() -> Path:
+    cache_home = os.getenv("XDG_CACHE_HOME")
+    if not cache_home:
+        try:
+            cache_home = (Path.home() / ".cache").as_posix()
+        except RuntimeError:  # no home directory (e.g. some service accounts)
+            cache_home = tempfile.gettempdir()
+    return Path(cache_home) / "mindmama" / "canonical_maps.idx"
 
-_ing_path = _find_data_file("CanonicalMap.json")
-_units_path = _find_data_file("UnitNormalizationMap.json")
+MAP_INDEX_PATH = Path(os.getenv("MAP_INDEX_PATH") or _default_map_index_path())
 
-if _ing_path:
-    with open(_ing_path, "r", encoding="utf-8") as f:
-        CANONICAL_INGREDIENTS = json.load(f)
-else:
-    CANONICAL_INGREDIENTS = {}
+# Read-only views over the index; the JSON is only decoded if these are read
+CANONICAL_INGREDIENTS: Mapping[str, Any] = {}
+UNIT_MAP: Sequence[Dict[str, Any]] = []
 
-if _units_path:
-    with open(_units_path, "r", encoding="utf-8") as f:
-        UNIT_MAP = json.load(f).get("units", [])
-else:
-    UNIT_MAP = []
+_WS_RE = re.compile(r"\s+")
 
-# Pre-build lookup structures for fast normalization
+# Lookup structures for fast normalization, rebuilt by load_canonical_maps()
+_MAP_INDEX: Optional[Union[MapIndex, SourceIndex]] = None
 _UNIT_VARIANT_TO_CANON: Dict[str, str] = {}
-for unit_entry in UNIT_MAP:
-    canon = unit_entry.get("canonical")
-    for v in unit_entry.get("variations", []):
-        _UNIT_VARIANT_TO_CANON[v.lower()] = canon
-
-# Build ingredient variant -> canonical mapping (longer variants first)
-_ING_VARIANTS: List[Tuple[str, str]] = []
-for canonical, details in CANONICAL_INGREDIENTS.items():
-    for var in details.get("variations", []):
-        _ING_VARIANTS.append((var.lower(), canonical))
-_ING_VARIANTS.sort(key=lambda t: -len(t[0]))
+# All unit variants in one alternation (longest first so "tbsp" beats "t").
+# The matched text, lower-cased, is looked up in _UNIT_VARIANT_TO_CANON.
+_UNIT_RE: Optional["re.Pattern[str]"] = None         # anywhere, on word boundaries
+_UNIT_PREFIX_RE: Optional["re.Pattern[str]"] = None  # leading token(s) after the quantity
+# Canonical unit -> (dimension, factor to the dimension's base unit),
+# e.g. "tablespoon" -> ("volume", 14.7868). Units without a dimension
+# (clove, can, pinch, ...) are only ever summed with themselves.
+_UNIT_CONVERSIONS: Dict[str, Tuple[str, float]] = {}
+# Lines without a unit are counted in this dimension (with "piece")
+COUNT_DIMENSION = "count"
+# Ingredient variant -> canonical mapping (longer variants first)
+_ING_VARIANTS: Sequence[Tuple[str, str]] = []
+# One automaton over all variants: per-line matching cost no longer grows with the map
+_ING_MATCHER: Any = VariantMatcher([])
+# Bumped on every load; cached parse results are only valid for one version
+_MAPS_VERSION = 0
+
+def map_source_paths() -> Tuple[Optional[Path], Optional[Path]]:
+    """Paths of the ingredient and unit map JSON files (None if missing)"""
+    ing_path = _find_data_file("IngredientCanonicalMap.json") or _find_data_file("CanonicalMap.json")
+    return ing_path, _find_data_file("UnitNormalizationMap.json")
+
+def load_canonical_maps(
+    ingredients: Optional[Mapping[str, Any]] = None,
+    units: Optional[Sequence[Dict[str, Any]]] = None,
+) -> None:
+    """
+    Install the canonical ingredient and unit maps and rebuild all lookups.
+    With no arguments the maps come from the precompiled index of the data
+    folder files (built or refreshed if needed). Explicit maps are compiled
+    in memory.
+    Cached parse results from the previous maps are invalidated.
+    """
+    if ingredients is None and units is None:
+        _install(load_index(*map_source_paths(), MAP_INDEX_PATH))
+        return
+
+    if ingredients is None or units is None:
+        disk_ingredients, disk_units = read_sources(*map_source_paths())
+        ingredients = disk_ingredients if ingredients is None else ingredients
+        units = disk_units if units is None else units
+    _install(SourceIndex(ingredients, units))
+
+def _install(index: Union[MapIndex, SourceIndex]) -> None:
+    global CANONICAL_INGREDIENTS, UNIT_MAP, _MAP_INDEX, _UNIT_VARIANT_TO_CANON, _UNIT_RE, _UNIT_PREFIX_RE
+    global _UNIT_CONVERSIONS, _ING_VARIANTS, _ING_MATCHER, _MAPS_VERSION
+
+    unit_variants = index.unit_variants()
+    unit_re = unit_prefix_re = None
+    if unit_variants:
+        alternation = "|".join(re.escape(v).replace(r"\ ", r"\s+") for v, _ in unit_variants)
+        unit_re = re.compile(r"\b(" + alternation + r")\b", re.IGNORECASE)
+        unit_prefix_re = re.compile(r"\s*(" + alternation + r")(?=\s|$)", re.IGNORECASE)
+
+    CANONICAL_INGREDIENTS = index.canonical_ingredients
+    UNIT_MAP = index.unit_map
+    _MAP_INDEX = index
+    _UNIT_VARIANT_TO_CANON = dict(unit_variants)
+    _UNIT_RE = unit_re
+    _UNIT_PREFIX_RE = unit_prefix_re
+    _UNIT_CONVERSIONS = index.unit_conversions()
+    _ING_VARIANTS = index.ing_variants
+    _ING_MATCHER = index.matcher()
+    _MAPS_VERSION += 1
+
+def _unit_canon(m: "re.Match[str]") -> str:
+    return _UNIT_VARIANT_TO_CANON[_WS_RE.sub(" ", m.group(1).lower())]
+
+load_canonical_maps()
 
 # -------------------------
 # Parsing helpers
 # -------------------------
-_QTY_RE = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+\.\d+|\d+)\b")
+# Metric quantities are often written against their unit ("200g", "400ml")
+_QTY_RE = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+\.\d+|\d+)(?![\d/])")
+
+def _match_quantity(text: str) -> Optional["re.Match[str]"]:
+    """Leading quantity; a number glued to letters only counts when they are a unit"""
+    m = _QTY_RE.match(text)
+    if m and text[m.end():m.end() + 1].isalpha():
+        if _UNIT_PREFIX_RE is None or not _UNIT_PREFIX_RE.match(text, m.end()):
+            return None
+    return m
 
 def _parse_quantity(leading_text: str) -> Tuple[Optional[float], str]:
     if not leading_text:
         return None, leading_text
-    m = _QTY_RE.match(leading_text)
+    m = _match_quantity(leading_text)
     if not m:
         return None, leading_text
     qty_str = m.group(1)
@@ -99,23 +185,11 @@ def _parse_quantity(leading_text: str) -> Tuple[Optional[float], str]:
         return None, leading_text
 
 def _extract_unit_if_any(text: str) -> Tuple[Optional[str], str]:
-    if not text:
+    if not text or _UNIT_PREFIX_RE is None:
         return None, text
-    text_l = text.strip().lower()
-    tokens = text_l.split()
-    for length in (2, 1):
-        candidate = " ".join(tokens[:length])
-        if candidate in _UNIT_VARIANT_TO_CANON:
-            # remove the candidate from original text robustly
-            pattern = re.compile(re.escape(candidate), re.IGNORECASE)
-            original = text.strip()
-            m = pattern.match(original.lower())
-            if m:
-                remaining = original[m.end():].lstrip()
-            else:
-                # try to find first occurrence
-                remaining = pattern.sub("", original, count=1).lstrip()
-            return _UNIT_VARIANT_TO_CANON[candidate], remaining
+    m = _UNIT_PREFIX_RE.match(text)
+    if m:
+        return _unit_canon(m), text[m.end():].lstrip()
     return None, text
 
 # -------------------------
@@ -125,27 +199,51 @@ def normalize_ingredient_name(text: str) -> str:
     if not text:
         return text
     t = text.lower()
-    for variant, canonical in _ING_VARIANTS:
-        if variant in t:
-            pattern = re.compile(re.escape(variant), flags=re.IGNORECASE)
-            new = pattern.sub(canonical, text, count=1)
-            return re.sub(r"\s+", " ", new).strip()
-    return text.strip()
+    match = _ING_MATCHER.find_best(t)
+    if match is None:
+        return text.strip()
+    variant, canonical = match
+    if len(t) == len(text):
+        i = t.find(variant)
+        new = text[:i] + canonical + text[i + len(variant):]
+    else:
+        # lower() changed the length (rare unicode); fall back to a regex replace
+        new = re.sub(re.escape(variant), canonical, text, count=1, flags=re.IGNORECASE)
+    return _WS_RE.sub(" ", new).strip()
 
 def normalize_unit_in_text(text: str) -> str:
     # Replace the first unit variant occurrence with canonical if found
-    if not text:
+    if not text or _UNIT_RE is None:
         return text
-    # search for any variant
-    for var, canon in _UNIT_VARIANT_TO_CANON.items():
-        if re.search(r"\b" + re.escape(var) + r"\b", text, flags=re.IGNORECASE):
-            return re.sub(r"\b" + re.escape(var) + r"\b", canon, text, flags=re.IGNORECASE, count=1)
+    m = _UNIT_RE.search(text)
+    if m:
+        return text[:m.start()] + _unit_canon(m) + text[m.end():]
     return text
 
-def parse_ingredient(ingredient_line: str) -> Dict[str, Optional[Any]]:
+# -------------------------
+# Parsed-line cache (meal plans repeat the same lines constantly)
+# -------------------------
+_PARSE_CACHE = LRUCache(int(os.getenv("INGREDIENT_CACHE_SIZE", "4096")))
+_CLEAN_CACHE = LRUCache(int(os.getenv("INGREDIENT_CACHE_SIZE", "4096")))
+
+def ingredient_cache_stats() -> Dict[str, Dict[str, Optional[int]]]:
+    """Hit/miss/eviction counters for the parsed-line caches"""
+    return {"parse": _PARSE_CACHE.stats(), "clean": _CLEAN_CACHE.stats()}
+
+def parse_ingredient(ingredient_line: str) -> Mapping[str, Optional[Any]]:
     """
     Returns: { raw, quantity (float|None), unit (str|None), name (canonical if matched) }
+
+    Results are cached per raw line and returned as read-only mappings;
+    use dict(result) for a mutable copy.
     """
+    return _PARSE_CACHE.get_or_compute(
+        ingredient_line,
+        lambda: MappingProxyType(_parse_ingredient_uncached(ingredient_line)),
+        generation=_MAPS_VERSION,
+    )
+
+def _parse_ingredient_uncached(ingredient_line: str) -> Dict[str, Optional[Any]]:
     if not ingredient_line:
         return {"raw": ingredient_line, "quantity": None, "unit": None, "name": ""}
 
@@ -162,18 +260,56 @@ def parse_ingredient(ingredient_line: str) -> Dict[str, Optional[Any]]:
         name = name[3:].strip()
 
     # last chance: check for unit embedded in name (e.g., "1tbspolive oil")
-    if unit is None:
-        for var, canon in _UNIT_VARIANT_TO_CANON.items():
-            if var in name.lower():
-                unit = canon
-                name = re.sub(r"\b" + re.escape(var) + r"\b", "", name, flags=re.IGNORECASE).strip()
-                break
+    if unit is None and _UNIT_RE is not None:
+        m = _UNIT_RE.search(name)
+        if m:
+            unit = _unit_canon(m)
+            name = _WS_RE.sub(" ", name[:m.start()] + name[m.end():]).strip()
 
     canonical_name = normalize_ingredient_name(name)
 
     return {"raw": orig, "quantity": qty, "unit": unit, "name": canonical_name}
 
-def render_ingredient(parsed: Dict[str, Optional[Any]]) -> str:
+def ingredient_line_signals(line: str) -> Tuple[bool, bool, bool]:
+    """
+    Cheap evidence that a line is an ingredient line, from the same tables
+    parse_ingredient uses (so it follows load_canonical_maps reloads)
+
+    Returns:
+        (starts with a quantity, contains a known unit, mentions a known ingredient)
+    """
+    text = line.strip()
+    has_qty = _match_quantity(text) is not None
+    has_unit = _UNIT_RE is not None and _UNIT_RE.search(text) is not None
+    known = _ING_MATCHER.find_best(text.lower()) is not None
+    return has_qty, has_unit, known
+
+_ID_MATCHER: Optional[Tuple[int, VariantMatcher]] = None
+
+def canonical_ingredient_ids(text: str) -> List[str]:
+    """
+    Canonical ingredients (IngredientCanonicalMap.json keys) mentioned in
+    text by name or by variant, in order of first mention
+    """
+    global _ID_MATCHER
+    if _ID_MATCHER is None or _ID_MATCHER[0] != _MAPS_VERSION:
+        pairs = list(_ING_VARIANTS) + [(name.lower(), name) for name in CANONICAL_INGREDIENTS]
+        pairs.sort(key=lambda p: -len(p[0]))
+        _ID_MATCHER = (_MAPS_VERSION, VariantMatcher(pairs))
+    matcher = _ID_MATCHER[1]
+
+    found: Dict[str, int] = {}
+    t = text.lower()
+    while True:
+        match = matcher.find_best(t)
+        if match is None:
+            break
+        variant, canonical = match
+        found.setdefault(canonical, t.find(variant))
+        t = t.replace(variant, "\0" * len(variant))
+    return sorted(found, key=found.__getitem__)
+
+def render_ingredient(parsed: Mapping[str, Optional[Any]]) -> str:
     name = parsed.get("name") or ""
     qty = parsed.get("quantity")
     unit = parsed.get("unit")
@@ -201,8 +337,11 @@ def render_ingredient(parsed: Dict[str, Optional[Any]]) -> str:
     return f"{qty_str} {name}"
 
 def clean_ingredient_line(line: str) -> str:
-    parsed = parse_ingredient(line)
-    return render_ingredient(parsed)
+    return _CLEAN_CACHE.get_or_compute(
+        line,
+        lambda: render_ingredient(parse_ingredient(line)),
+        generation=_MAPS_VERSION,
+    )
 
 def normalize_ingredients(ingredients: List[str]) -> List[str]:
     out: List[str] = []
@@ -214,66 +353,182 @@ def normalize_ingredients(ingredients: List[str]) -> List[str]:
             out.append(ing.strip().lower())
     return out
 
+def scale_ingredients(ingredients: List[str], factor: float) -> List[str]:
+    """
+    Multiply the quantity of each line by factor (e.g. 4 servings -> 2 is 0.5);
+    lines without a quantity ("salt to taste") are kept as they are
+    """
+    if factor == 1:
+        return list(ingredients)
+    out: List[str] = []
+    for line in ingredients:
+        parsed = parse_ingredient(line)
+        if parsed["quantity"] is None:
+            out.append(line)
+        else:
+            out.append(render_ingredient(dict(parsed, quantity=parsed["quantity"] * factor)))
+    return out
+
+# -------------------------
+# Batch parsing: column-oriented results for large lists
+# -------------------------
+@dataclass
+class IngredientColumns:
+    """
+    Parsed ingredient lines stored column-wise (one row per input line)
+
+    - quantity[i]: parsed quantity, NaN when unknown
+    - unit_id[i]: index into units, -1 when the line has no unit
+    - canonical_id[i]: index into names (canonical name when the map
+      matched, else the cleaned name text)
+    """
+    quantity: "array[float]" = field(default_factory=lambda: array("d"))
+    unit_id: "array[int]" = field(default_factory=lambda: array("i"))
+    canonical_id: "array[int]" = field(default_factory=lambda: array("i"))
+    units: List[str] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+def parse_ingredients_batch(lines: Iterable[str]) -> IngredientColumns:
+    """
+    Parse many ingredient lines at once into IngredientColumns.
+    Each distinct line is parsed only once, however often it repeats.
+    """
+    cols = IngredientColumns()
+    unit_ids: Dict[str, int] = {}
+    name_ids: Dict[str, int] = {}
+    rows: Dict[Any, Tuple[float, int, int]] = {}
+
+    quantity_append = cols.quantity.append
+    unit_append = cols.unit_id.append
+    name_append = cols.canonical_id.append
+
+    for line in lines:
+        row = rows.get(line)
+        if row is None:
+            parsed = parse_ingredient(line)
+            qty = parsed.get("quantity")
+            unit = parsed.get("unit")
+            name = (parsed.get("name") or "").strip()
+
+            uid = -1
+            if unit is not None:
+                uid = unit_ids.get(unit, -1)
+                if uid == -1:
+                    uid = unit_ids[unit] = len(cols.units)
+                    cols.units.append(unit)
+            nid = name_ids.get(name)
+            if nid is None:
+                nid = name_ids[name] = len(cols.names)
+                cols.names.append(name)
+
+            row = (math.nan if qty is None else float(qty), uid, nid)
+            rows[line] = row
+
+        quantity_append(row[0])
+        unit_append(row[1])
+        name_append(row[2])
+    return cols
+
 # -------------------------
 # Aggregation: shopping list
 # -------------------------
 def aggregate_shopping_list(recipes: List[Dict]) -> List[Dict]:
     """
     Given a list of recipe dicts (each with 'ingredients': List[str]), return aggregated shopping list.
-    Output: List of dicts: { name: canonical_name, total_qty: float|None, unit: str|None, category: str }
+    Output: List of dicts: { name, total_qty: float|None, unit: str|None, unquantified_count: int, category }
     Aggregation strategy:
       - Parse each ingredient line into (name, qty, unit)
-      - Sum numeric quantities only for identical (name, unit)
-      - If some entries have missing qty or conflicting units, total_qty is set to None for that (name, unit group)
+      - Merge lines of the same ingredient whose units share a dimension
+        (volume, mass, count) by converting through the dimension's base unit;
+        "1 tablespoon" + "3 teaspoon" -> "2 tablespoon"
+      - Units without a dimension (clove, can, ...) only merge with the same unit
+      - total_qty sums the quantified lines; lines without a quantity are
+        counted in unquantified_count instead of wiping out the total
       - Category is taken from canonical map if available, else 'uncategorized'
     """
-    # map (name, unit) -> { total: float, has_unknown_qty: bool }
-    aggregates: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+    lines = [line for recipe in recipes for line in (recipe.get("ingredients", []) or [])]
+    return aggregate_ingredient_columns(parse_ingredients_batch(lines))
 
-    for recipe in recipes:
-        for line in recipe.get("ingredients", []) or []:
-            parsed = parse_ingredient(line)
-            name = (parsed.get("name") or "").strip()
-            unit = parsed.get("unit")
-            qty = parsed.get("quantity")
-
-            key = (name, unit)
-            if key not in aggregates:
-                aggregates[key] = {"total": 0.0, "count": 0, "has_unknown_qty": False}
-
-            if qty is None:
-                # mark unknown qty
-                aggregates[key]["has_unknown_qty"] = True
-                aggregates[key]["count"] += 1
-            else:
-                try:
-                    aggregates[key]["total"] += float(qty)
-                    aggregates[key]["count"] += 1
-                except Exception:
-                    aggregates[key]["has_unknown_qty"] = True
-                    aggregates[key]["count"] += 1
+def aggregate_ingredient_columns(cols: IngredientColumns) -> List[Dict]:
+    """
+    Aggregate IngredientColumns into a shopping list (see aggregate_shopping_list).
+    Single pass over the rows using integer ids; per-unit conversion data is
+    looked up once per distinct unit, not per line.
+    """
+    # Each unit id maps to a "slot": one per dimension, or its own slot when
+    # it has no dimension. Rows with no unit fall in the count dimension.
+    dims: Dict[str, int] = {COUNT_DIMENSION: 0}
+    unit_slot: List[int] = []
+    unit_factor: List[float] = []
+    for unit in cols.units:
+        conv = _UNIT_CONVERSIONS.get(unit)
+        if conv is None:
+            unit_slot.append(-1)  # filled in below, after all dimensions are known
+            unit_factor.append(1.0)
+        else:
+            unit_slot.append(dims.setdefault(conv[0], len(dims)))
+            unit_factor.append(conv[1])
+    n_dims = len(dims)
+    for uid, slot in enumerate(unit_slot):
+        if slot == -1:
+            unit_slot[uid] = n_dims + uid
+    stride = n_dims + len(cols.units)
+
+    # (name_id, slot) -> group index; per-group state kept in parallel lists
+    groups: Dict[int, int] = {}
+    group_name: List[int] = []
+    totals: List[float] = []          # quantified amount, in base units
+    quantified: List[int] = []
+    unquantified: List[int] = []
+    display_unit: List[int] = []      # largest unit seen (-1 = no unit)
+    display_factor: List[float] = []
+
+    for qty, uid, nid in zip(cols.quantity, cols.unit_id, cols.canonical_id):
+        if uid >= 0:
+            slot, factor = unit_slot[uid], unit_factor[uid]
+        else:
+            slot, factor = 0, 1.0
+        key = nid * stride + slot
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = len(group_name)
+            group_name.append(nid)
+            totals.append(0.0)
+            quantified.append(0)
+            unquantified.append(0)
+            display_unit.append(uid)
+            display_factor.append(factor)
+        elif factor > display_factor[g]:
+            display_unit[g] = uid
+            display_factor[g] = factor
+
+        if qty != qty:  # NaN: unknown quantity
+            unquantified[g] += 1
+        else:
+            totals[g] += qty * factor
+            quantified[g] += 1
 
     # Build result list
+    categories = _MAP_INDEX.categories()
     result: List[Dict[str, Optional[Any]]] = []
-    for (name, unit), info in aggregates.items():
-        canonical_name = name or ""
+    for g, nid in enumerate(group_name):
+        canonical_name = cols.names[nid]
         # Lookup category
-        category = "uncategorized"
-        if canonical_name and canonical_name in CANONICAL_INGREDIENTS:
-            category = CANONICAL_INGREDIENTS[canonical_name].get("category", "uncategorized")
+        category = categories.get(canonical_name, "uncategorized") if canonical_name else "uncategorized"
 
         total_qty = None
-        if info["has_unknown_qty"]:
-            # If any unknown qty present, set total_qty to None (ambiguous)
-            total_qty = None
-        else:
-            # All items had numeric qty; present the summed total
-            total_qty = round(info["total"], 3) if info["total"] != 0 else None
+        if quantified[g]:
+            total_qty = round(totals[g] / display_factor[g], 3)
 
+        uid = display_unit[g]
         result.append({
             "name": canonical_name,
             "total_qty": total_qty,
-            "unit": unit,
+            "unit": cols.units[uid] if uid >= 0 else None,
+            "unquantified_count": unquantified[g],
             "category": category
         })
 
@@ -287,11 +542,20 @@ def aggregate_shopping_list(recipes: List[Dict]) -> List[Dict]:
 def shopping_list_from_recipes(recipes: List[Dict]) -> List[Dict]:
     """
     Wrapper: normalize ingredients first, then aggregate.
+    Each distinct raw line is normalized once and each distinct normalized
+    line is parsed once for aggregation.
     """
     # normalize ingredient strings in-place if needed
+    rendered: Dict[Any, str] = {}
     for recipe in recipes:
         if "ingredients" in recipe and isinstance(recipe["ingredients"], list):
-            recipe["ingredients"] = normalize_ingredients(recipe["ingredients"])
+            out = []
+            for ing in recipe["ingredients"]:
+                cleaned = rendered.get(ing)
+                if cleaned is None:
+                    cleaned = rendered[ing] = normalize_ingredients([ing])[0]
+                out.append(cleaned)
+            recipe["ingredients"] = out
     return aggregate_shopping_list(recipes)
 
 # -------------------------
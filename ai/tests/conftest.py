@@ -0,0 +1,40 @@
+"""
+Shared test fixtures
+Run with: pytest tests/
+
+main builds its LLM client at import, so a placeholder key is set first;
+no test sends it to a provider.
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("GROQ_API_KEY", "gsk_test")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from ai.app import main  # noqa: E402
+from ai.services.llm_client import AsyncLLMClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    """HTTP client for the app"""
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Serve the app's LLM calls from the local fake provider
+
+    The response cache and the recipe corpus are off, so every request
+    reaches the returned client (see its .client.stats()).
+    """
+    monkeypatch.setattr(main.settings, "use_fake_llm", True)
+    llm = AsyncLLMClient()
+    monkeypatch.setattr(main, "llm_client", llm)
+    monkeypatch.setattr(main, "response_cache", None)
+    monkeypatch.setattr(main, "recipe_corpus", None)
+    return llm
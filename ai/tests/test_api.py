@@ -1,19 +1,30 @@
 """
 API Tests for AI Orchestrator
 Run with: pytest tests/
+
+LLM calls are served by the local fake provider (services/fake_provider.py).
+Set LIVE_LLM_TESTS=true to run them against the provider configured in .env.
 """
 
+import os
+
 import pytest
-from fastapi.testclient import TestClient
-from ai.app.main import app
 
-client = TestClient(app)
+
+LIVE = os.getenv("LIVE_LLM_TESTS", "").strip().lower() in ("1", "true", "yes", "y")
+
+
+@pytest.fixture(autouse=True)
+def offline(request):
+    """Serve LLM calls from the fake provider unless LIVE_LLM_TESTS is set"""
+    if not LIVE:
+        request.getfixturevalue("fake_llm")
 
 
 class TestHealthCheck:
     """Test health check endpoint"""
     
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test that health check returns 200"""
         response = client.get("/")
         assert response.status_code == 200
@@ -23,7 +34,7 @@ class TestHealthCheck:
 class TestMealSuggestion:
     """Test meal suggestion endpoint"""
     
-    def test_suggest_meal_basic(self):
+    def test_suggest_meal_basic(self, client):
         """Test basic meal suggestion"""
         response = client.post(
             "/ai/suggest-meal",
@@ -41,7 +52,7 @@ class TestMealSuggestion:
         assert isinstance(data["ingredients"], list)
         assert isinstance(data["steps"], list)
     
-    def test_suggest_meal_with_restrictions(self):
+    def test_suggest_meal_with_restrictions(self, client):
         """Test meal suggestion with dietary restrictions"""
         response = client.post(
             "/ai/suggest-meal",
@@ -57,7 +68,7 @@ class TestMealSuggestion:
         assert len(data["ingredients"]) > 0
         assert len(data["steps"]) > 0
     
-    def test_suggest_meal_invalid_data(self):
+    def test_suggest_meal_invalid_data(self, client):
         """Test that invalid data returns error"""
         response = client.post(
             "/ai/suggest-meal",
@@ -73,7 +84,7 @@ class TestMealSuggestion:
 class TestRecipeExtraction:
     """Test recipe extraction endpoint"""
     
-    def test_extract_simple_recipe(self):
+    def test_extract_simple_recipe(self, client):
         """Test extracting a simple recipe"""
         recipe_text = """
         Spaghetti Carbonara
@@ -101,7 +112,7 @@ class TestRecipeExtraction:
         assert len(data["ingredients"]) >= 4
         assert len(data["steps"]) >= 4
     
-    def test_extract_recipe_empty_text(self):
+    def test_extract_recipe_empty_text(self, client):
         """Test that empty recipe text returns error"""
         response = client.post(
             "/ai/extract-recipe",
@@ -113,7 +124,7 @@ class TestRecipeExtraction:
 class TestSupportiveMessage:
     """Test supportive message endpoint"""
     
-    def test_generate_message_no_context(self):
+    def test_generate_message_no_context(self, client):
         """Test message generation without context"""
         response = client.post(
             "/ai/generate-message",
@@ -124,7 +135,7 @@ class TestSupportiveMessage:
         assert "message" in data
         assert len(data["message"]) > 0
     
-    def test_generate_message_with_context(self):
+    def test_generate_message_with_context(self, client):
         """Test message generation with context"""
         response = client.post(
             "/ai/generate-message",
@@ -138,7 +149,7 @@ class TestSupportiveMessage:
 class TestTestEndpoint:
     """Test the test endpoint"""
     
-    def test_test_endpoint(self):
+    def test_test_endpoint(self, client):
         """Test that test endpoint works"""
         response = client.get("/ai/test")
         # Should return either a recipe or an error dict
@@ -152,7 +163,7 @@ class TestTestEndpoint:
 class TestShoppingListGeneration:
     """Test shopping list generation endpoint"""
     
-    def test_generate_shopping_list_basic(self):
+    def test_generate_shopping_list_basic(self, client):
         """Test basic shopping list generation"""
         recipes = [
             {
@@ -182,7 +193,7 @@ class TestShoppingListGeneration:
             assert "unit" in item
             assert "category" in item
     
-    def test_generate_shopping_list_with_variations(self):
+    def test_generate_shopping_list_with_variations(self, client):
         """Test shopping list with ingredient variations"""
         recipes = [
             {
@@ -202,14 +213,14 @@ class TestShoppingListGeneration:
         # Should normalize and aggregate
         assert len(shopping_list) >= 2  # At least tomatoes and olive oil
     
-    def test_generate_shopping_list_empty_recipes(self):
+    def test_generate_shopping_list_empty_recipes(self, client):
         """Test shopping list with empty recipe list"""
         response = client.post("/ai/generate-shopping-list", json=[])
         assert response.status_code == 200
         shopping_list = response.json()
         assert shopping_list == []
     
-    def test_generate_shopping_list_missing_ingredients(self):
+    def test_generate_shopping_list_missing_ingredients(self, client):
         """Test shopping list when recipe is missing ingredients"""
         recipes = [
             {
@@ -230,7 +241,7 @@ class TestShoppingListGeneration:
 class TestIntegration:
     """Full integration tests"""
     
-    def test_full_meal_planning_flow(self):
+    def test_full_meal_planning_flow(self, client):
         """Test complete flow: suggest -> extract -> message"""
         # 1. Suggest a meal
         suggest_response = client.post(
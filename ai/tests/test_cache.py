@@ -0,0 +1,163 @@
+"""
+Cache Tests
+Run with: pytest tests/
+"""
+
+import threading
+import time
+
+import pytest
+
+from ai.services import utils
+from ai.services.cache import (
+    CacheBackend,
+    LRUCache,
+    MemoryBackend,
+    ResponseCache,
+    SQLiteBackend,
+    build_response_cache,
+    make_cache_key,
+)
+
+
+class TestLRUCache:
+    """Test the bounded LRU cache"""
+
+    def test_evicts_least_recently_used(self):
+        """Oldest untouched entry is evicted first and counted"""
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "b" is now least recently used
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1, "evictions": 1}
+
+    def test_generation_change_clears_entries(self):
+        """A new generation invalidates everything computed under the old one"""
+        cache = LRUCache(maxsize=8)
+        assert cache.get_or_compute("k", lambda: "v1", generation=1) == "v1"
+        assert cache.get_or_compute("k", lambda: "v2", generation=1) == "v1"
+        assert cache.get_or_compute("k", lambda: "v2", generation=2) == "v2"
+
+    def test_concurrent_access(self):
+        """Many threads hammering a small cache never exceed its bound"""
+        cache = LRUCache(maxsize=16)
+
+        def worker(offset):
+            for i in range(2000):
+                key = (i + offset) % 40
+                assert cache.get_or_compute(key, lambda: key * 2) == key * 2
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = cache.stats()
+        assert stats["size"] <= 16
+        assert stats["hits"] + stats["misses"] == 8 * 2000
+
+
+class TestParsedLineCache:
+    """Test caching of parsed ingredient lines"""
+
+    def test_repeated_lines_hit_cache(self):
+        """Parsing the same line twice returns the cached object"""
+        first = utils.parse_ingredient("1 cup basmati rice for the cache test")
+        before = utils.ingredient_cache_stats()["parse"]["hits"]
+        second = utils.parse_ingredient("1 cup basmati rice for the cache test")
+        assert second is first
+        assert utils.ingredient_cache_stats()["parse"]["hits"] == before + 1
+
+    def test_results_are_read_only(self):
+        """Callers cannot corrupt a cached entry"""
+        parsed = utils.parse_ingredient("2 tablespoons olive oil")
+        with pytest.raises(TypeError):
+            parsed["quantity"] = 99
+        assert utils.parse_ingredient("2 tablespoons olive oil")["quantity"] == 2.0
+
+    def test_map_reload_invalidates_cache(self):
+        """Swapping the canonical maps drops results computed with the old ones"""
+        original_ingredients = utils.CANONICAL_INGREDIENTS
+        original_units = utils.UNIT_MAP
+        line = "3 zorblax fruits"
+        assert utils.clean_ingredient_line(line) == "3 zorblax fruits"
+        try:
+            utils.load_canonical_maps(
+                {"zorblax": {"variations": ["zorblax fruits"], "category": "produce"}},
+                original_units,
+            )
+            assert utils.clean_ingredient_line(line) == "3 zorblax"
+        finally:
+            utils.load_canonical_maps(original_ingredients, original_units)
+        assert utils.clean_ingredient_line(line) == "3 zorblax fruits"
+
+
+class TestResponseCache:
+    """Test the TTL response cache and its backends"""
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def backend(self, request, tmp_path):
+        if request.param == "memory":
+            return MemoryBackend(max_entries=2)
+        return SQLiteBackend((tmp_path / "cache.sqlite3").as_posix(), max_entries=2)
+
+    def test_hit_and_miss_counters(self, backend):
+        """Stored values come back and lookups are counted"""
+        cache = ResponseCache(backend, ttl_seconds=60)
+        assert cache.get("k") is None
+        cache.set("k", {"title": "Soup", "ingredients": ["1 cup rice"]})
+        assert cache.get("k") == {"title": "Soup", "ingredients": ["1 cup rice"]}
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_entries_expire_after_ttl(self, backend):
+        """Expired entries are dropped and reported as misses"""
+        cache = ResponseCache(backend, ttl_seconds=0.05)
+        cache.set("k", {"v": 1})
+        time.sleep(0.1)
+        assert cache.get("k") is None
+        assert cache.stats()["expirations"] == 1
+        assert len(backend) == 0
+
+    def test_size_bound_evicts_least_recently_used(self, backend):
+        """The backend never holds more than max_entries"""
+        cache = ResponseCache(backend, ttl_seconds=60)
+        cache.set("a", 1)
+        time.sleep(0.01)
+        cache.set("b", 2)
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_sqlite_backend_persists(self, tmp_path):
+        """Entries written by one cache are visible to a new one on the same file"""
+        path = (tmp_path / "cache.sqlite3").as_posix()
+        build_response_cache("sqlite", sqlite_path=path).set("k", {"v": 1})
+        assert build_response_cache("sqlite", sqlite_path=path).get("k") == {"v": 1}
+
+    def test_unknown_backend_rejected(self):
+        """Misconfigured backends fail loudly"""
+        with pytest.raises(ValueError):
+            build_response_cache("redis")
+
+    def test_incomplete_backend_rejected(self):
+        """A backend missing part of the interface fails when built, not on first use"""
+
+        class GetOnly(CacheBackend):
+            def get(self, key):
+                return None
+
+        with pytest.raises(TypeError):
+            GetOnly()
+
+    def test_cache_key_ignores_dict_order(self):
+        """Keys depend on content, not on insertion order"""
+        assert make_cache_key("ns", {"a": 1, "b": [1, 2]}) == make_cache_key("ns", {"b": [1, 2], "a": 1})
+        assert make_cache_key("ns", {"a": 1}) != make_cache_key("other", {"a": 1})
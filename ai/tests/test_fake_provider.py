@@ -0,0 +1,130 @@
+"""
+Fake Provider Tests
+Run with: pytest tests/
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from ai.app.prompts import (
+    get_batch_meal_suggestion_prompt,
+    get_meal_suggestion_prompt,
+    get_recipe_extraction_prompt,
+)
+from ai.services.fake_provider import FakeAPIError, FakeLLM, parse_latency
+from ai.services.llm_client import AsyncLLMClient
+from ai.services.retry import RetryBudget, RetryPolicy, classify_error
+
+
+def _messages(prompt):
+    system = getattr(prompt, "system", "JSON only")
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+
+def _content(fake, prompt):
+    return fake.chat.completions.create(messages=_messages(prompt)).choices[0].message.content
+
+
+class TestLatency:
+    """Test FAKE_LLM_LATENCY parsing and sampling"""
+
+    def test_supported_specs(self):
+        assert parse_latency("0") == ("fixed", (0.0,))
+        assert parse_latency("fixed:50") == ("fixed", (50.0,))
+        assert parse_latency("uniform:20,200") == ("uniform", (20.0, 200.0))
+        assert parse_latency("lognormal:300,0.5") == ("lognormal", (300.0, 0.5))
+
+    @pytest.mark.parametrize("spec", ["gamma:1,2", "uniform:20", "fixed:abc", "fixed:-5"])
+    def test_invalid_specs_rejected(self, spec):
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+    def test_samples_stay_in_range(self):
+        fake = FakeLLM(latency="uniform:20,40")
+        samples = [fake._sample_latency() for _ in range(200)]
+        assert all(0.02 <= s <= 0.04 for s in samples)
+
+
+class TestAnswers:
+    """Test the JSON bodies returned per prompt kind"""
+
+    def test_meal_suggestion_respects_time_limit(self):
+        prompt = get_meal_suggestion_prompt("lunch", 4, 45, [], None)
+        recipe = json.loads(_content(FakeLLM(), prompt))
+        assert "lunch" in recipe["title"]
+        assert recipe["prep_time"] + recipe["cook_time"] <= 45
+        assert len(recipe["ingredients"]) == 5
+
+    def test_batch_answers_one_recipe_per_slot(self):
+        slots = [
+            {"meal_type": "breakfast", "num_people": 1, "time_available": 10},
+            {"meal_type": "dinner", "num_people": 3, "time_available": 60},
+        ]
+        recipes = json.loads(_content(FakeLLM(), get_batch_meal_suggestion_prompt(slots)))["recipes"]
+        assert [r["title"].endswith(f"({s['meal_type']})") for r, s in zip(recipes, slots)] == [True, True]
+
+    def test_extraction_lifts_bullets_and_steps(self):
+        text = "Pancakes\nPrep time: 5\n- 1 cup flour\n- 2 eggs\n1. Whisk\n2. Fry"
+        recipe = json.loads(_content(FakeLLM(), get_recipe_extraction_prompt(text)))
+        assert recipe == {
+            "title": "Pancakes",
+            "ingredients": ["1 cup flour", "2 eggs"],
+            "steps": ["Whisk", "Fry"],
+            "prep_time": 5,
+            "cook_time": None,
+        }
+
+    def test_same_seed_same_answers(self):
+        prompt = get_meal_suggestion_prompt("dinner", 2, 30, [], None)
+        first = [_content(FakeLLM(seed=7), prompt) for _ in range(3)]
+        assert first == [_content(FakeLLM(seed=7), prompt) for _ in range(3)]
+
+    def test_usage_reported(self):
+        response = FakeLLM().chat.completions.create(messages=_messages("Suggest a dinner recipe"))
+        assert response.usage.prompt_tokens > 0
+        assert response.usage.total_tokens == response.usage.prompt_tokens + response.usage.completion_tokens
+
+
+class TestFaults:
+    """Test injected errors and malformed output"""
+
+    def test_errors_look_like_provider_errors(self):
+        fake = FakeLLM(error_rate=1.0)
+        kinds = set()
+        for _ in range(30):
+            with pytest.raises(FakeAPIError) as info:
+                fake.chat.completions.create(messages=_messages("hi"))
+            kinds.add(classify_error(info.value))
+        assert kinds <= {"server", "rate_limit", "timeout"} and len(kinds) > 1
+        assert fake.stats()["errors"] == 30
+
+    def test_client_recovers_from_faults(self, monkeypatch):
+        monkeypatch.setattr("ai.services.llm_client.settings.use_fake_llm", True)
+        llm = AsyncLLMClient()
+        llm.coalesce = False
+        llm.max_retries = 10
+        llm.retry_policy = RetryPolicy(base_delay=0.0, max_delay=0.0)
+        llm.retry_budget = RetryBudget(ratio=1.0, min_per_second=100)
+        llm.backends[0].breaker.failure_threshold = 1000
+        llm.client = FakeLLM(asynchronous=True, error_rate=0.2, malformed_rate=0.5, seed=3)
+        prompt = get_meal_suggestion_prompt("dinner", 2, 30, [], None)
+
+        async def run():
+            return [await llm.call_llm(prompt) for _ in range(20)]
+
+        results = asyncio.run(run())
+        assert all("title" in r for r in results)
+        assert llm.provider == "fake"
+        assert llm.client.stats()["malformed"] > 0
+
+    def test_stream_yields_full_answer(self):
+        fake = FakeLLM(asynchronous=True)
+        prompt = get_meal_suggestion_prompt("dinner", 2, 30, [], None)
+
+        async def run():
+            stream = await fake.chat.completions.create(messages=_messages(prompt), stream=True)
+            return "".join([chunk.choices[0].delta.content async for chunk in stream])
+
+        assert "title" in json.loads(asyncio.run(run()))
@@ -0,0 +1,85 @@
+"""
+JSON Repair Tests
+Run with: pytest tests/
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from ai.services.json_repair import json_repair_stats, repair_json
+from ai.services.llm_client import AsyncLLMClient
+
+
+class TestRepairJson:
+    """Test local repair of almost-JSON model output"""
+
+    def test_strips_markdown_fence(self):
+        parsed, fixes = repair_json('```json\n{"title": "Soup"}\n```')
+        assert parsed == {"title": "Soup"}
+        assert fixes == ["fences"]
+
+    def test_extracts_object_from_prose(self):
+        parsed, fixes = repair_json('Sure! Here is your recipe: {"title": "Soup"} Enjoy!')
+        assert parsed == {"title": "Soup"}
+        assert "extracted" in fixes
+
+    def test_removes_trailing_commas(self):
+        parsed, fixes = repair_json('{"ingredients": ["rice", "salt",], "steps": ["Boil",],}')
+        assert parsed == {"ingredients": ["rice", "salt"], "steps": ["Boil"]}
+        assert fixes == ["trailing_commas"]
+
+    def test_commas_and_braces_inside_strings_untouched(self):
+        parsed, _ = repair_json('```\n{"step": "Mix, then add {sauce},]", "n": [1,],}\n```')
+        assert parsed == {"step": "Mix, then add {sauce},]", "n": [1]}
+
+    @pytest.mark.parametrize("text, expected", [
+        ('{"title": "Soup", "ingredients": ["1 cup rice", "salt"',
+         {"title": "Soup", "ingredients": ["1 cup rice", "salt"]}),
+        ('{"title": "Soup", "ingredients": ["1 cup rice", "sal',
+         {"title": "Soup", "ingredients": ["1 cup rice", "sal"]}),
+        ('{"title": "Soup", "ingredients": ["1 cup rice"], "steps": ',
+         {"title": "Soup", "ingredients": ["1 cup rice"]}),
+        ('{"title": "Soup", "vegan": tr',
+         {"title": "Soup"}),
+    ])
+    def test_closes_truncated_output(self, text, expected):
+        parsed, fixes = repair_json(text)
+        assert parsed == expected
+        assert "truncated" in fixes
+
+    def test_unrepairable_raises(self):
+        with pytest.raises(ValueError):
+            repair_json("I cannot help with that.")
+
+
+class TestParseContentRepair:
+    """Test that the client repairs before spending a retry"""
+
+    def test_repaired_output_needs_no_retry(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+        client = AsyncLLMClient()
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            content = '```json\n{"title": "Soup", "steps": ["Boil",],}\n```'
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        before = json_repair_stats()["repaired"]
+
+        assert asyncio.run(client.call_llm("p")) == {"title": "Soup", "steps": ["Boil"]}
+        assert len(calls) == 1
+        assert json_repair_stats()["repaired"] == before + 1
+
+    def test_unrepairable_output_still_raises_decode_error(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+        client = AsyncLLMClient()
+        with pytest.raises(json.JSONDecodeError) as info:
+            client.parse_content("no json here")
+        assert info.value.doc == "no json here"
@@ -0,0 +1,501 @@
+"""
+LLM Client Tests
+Run with: pytest tests/
+
+These tests swap the provider SDK for an in-process stub, so they never
+touch the network and need no real API key.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from ai.services import llm_client as llm_client_module
+from ai.services import tracing
+from ai.services.llm_client import AsyncLLMClient, LLMClient
+from ai.services.metrics import LLM_IN_FLIGHT, LLM_RETRIES
+from ai.services.retry import CircuitOpenError
+
+
+def _completion(content: str):
+    """Build an object shaped like a chat completion response"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+
+
+class _StubCompletions:
+    """Async stand-in for client.chat.completions"""
+
+    def __init__(self, replies, delay=0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        reply = self.replies[min(self.calls, len(self.replies)) - 1]
+        if isinstance(reply, Exception):
+            raise reply
+        if kwargs.get("stream"):
+            return _chunks(reply)
+        return _completion(reply)
+
+
+async def _chunks(content: str):
+    """Stream a reply as two chunk objects shaped like a chat completion stream"""
+    middle = len(content) // 2
+    for part in (content[:middle], content[middle:]):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+
+
+def _stream(client, prompt="p"):
+    async def run():
+        return "".join([delta async for delta in client.stream_llm(prompt)])
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def async_client(monkeypatch):
+    """AsyncLLMClient wired to a stub provider"""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+
+    def _make(replies, delay=0.0):
+        client = AsyncLLMClient()
+        stub = _StubCompletions(replies, delay)
+        client.client = SimpleNamespace(chat=SimpleNamespace(completions=stub))
+        return client, stub
+
+    return _make
+
+
+class TestAsyncLLMClient:
+    """Test the awaitable LLM client"""
+
+    def test_call_llm_returns_parsed_json(self, async_client):
+        """A valid completion is parsed into a dict"""
+        client, stub = async_client([json.dumps({"title": "Soup"})])
+        result = asyncio.run(client.call_llm("prompt"))
+        assert result == {"title": "Soup"}
+        assert stub.calls == 1
+
+    def test_retry_backoff_does_not_block_event_loop(self, async_client, monkeypatch):
+        """Other coroutines keep running while a call waits to retry"""
+        monkeypatch.setattr(AsyncLLMClient, "_retry_delay", lambda self, *a: 0.2)
+        client, _ = async_client(["not json", json.dumps({"ok": True})])
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        async def run():
+            return await asyncio.gather(client.call_llm("prompt"), ticker())
+
+        result, _ = asyncio.run(run())
+        assert result == {"ok": True}
+        assert len(ticks) == 5
+        assert ticks[-1] - ticks[0] < 0.2
+
+    def test_many_calls_in_flight_concurrently(self, async_client):
+        """Hundreds of slow calls overlap instead of running back to back"""
+        client, stub = async_client([json.dumps({"ok": True})], delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(client.call_llm(f"p{i}") for i in range(200)))
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 200
+        assert stub.calls == 200
+        assert elapsed < 2.0
+
+    def test_invalid_json_raises_after_retries(self, async_client, monkeypatch):
+        """Invalid JSON on every attempt surfaces as ValueError"""
+        monkeypatch.setattr(AsyncLLMClient, "_retry_delay", _no_wait_retry_delay())
+        client, stub = async_client(["not json"])
+        with pytest.raises(ValueError):
+            asyncio.run(client.call_llm("prompt"))
+        assert stub.calls == client.max_retries
+
+
+class TestRequestCoalescing:
+    """Test single-flight coalescing of identical prompts"""
+
+    def test_identical_concurrent_prompts_share_one_call(self, async_client):
+        """Fifty identical prompts in flight together cost one provider call"""
+        client, stub = async_client([json.dumps({"ingredients": ["1 cup rice"]})], delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(client.call_llm("same prompt") for _ in range(50)))
+
+        results = asyncio.run(run())
+        assert stub.calls == 1
+        assert all(r == {"ingredients": ["1 cup rice"]} for r in results)
+        assert client.single_flight.stats()["deduplicated"] == 49
+
+    def test_callers_get_independent_copies(self, async_client):
+        """Mutating one caller's result does not leak into another's"""
+        client, _ = async_client([json.dumps({"ingredients": ["1 cup rice"]})], delay=0.01)
+
+        async def run():
+            return await asyncio.gather(client.call_llm("p"), client.call_llm("p"))
+
+        first, second = asyncio.run(run())
+        first["ingredients"].append("salt")
+        assert second["ingredients"] == ["1 cup rice"]
+
+    def test_followers_trace_the_shared_call(self, async_client):
+        """Every coalesced request gets the LLM attempt span and token usage"""
+        client, stub = async_client([json.dumps({"ok": True})], delay=0.01)
+        traces = [tracing.Trace(f"req-{i}") for i in range(3)]
+
+        async def request(trace):
+            tracing._current_trace.set(trace)
+            with tracing.span("llm"):
+                return await client.call_llm("p")
+
+        async def run():
+            await asyncio.gather(*(request(trace) for trace in traces))
+
+        asyncio.run(run())
+        assert stub.calls == 1
+        for i, trace in enumerate(traces):
+            parent = next(r for r in trace.spans if r["name"] == "llm")
+            attempt = next(r for r in trace.spans if r["name"] == "llm.attempt")
+            assert attempt["parent_id"] == parent["span_id"]
+            assert attempt["attributes"].get("llm.coalesced", False) is (i > 0)
+            assert trace.usage["estimated_prompt"] > 0
+            assert "llm.attempt" in trace.server_timing()
+
+    def test_sequential_calls_are_not_coalesced(self, async_client):
+        """Only calls overlapping in time are shared"""
+        client, stub = async_client([json.dumps({"ok": True})])
+
+        async def run():
+            await client.call_llm("p")
+            await client.call_llm("p")
+
+        asyncio.run(run())
+        assert stub.calls == 2
+
+    def test_coalescing_can_be_disabled(self, async_client):
+        """With coalescing off every call reaches the provider"""
+        client, stub = async_client([json.dumps({"ok": True})], delay=0.01)
+        client.coalesce = False
+
+        async def run():
+            return await asyncio.gather(*(client.call_llm("p") for _ in range(5)))
+
+        asyncio.run(run())
+        assert stub.calls == 5
+
+
+@pytest.fixture
+def two_providers(monkeypatch):
+    """AsyncLLMClient with OpenAI primary and Groq secondary, both stubbed"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+    for name in ("openai", "groq"):
+        monkeypatch.setattr(
+            AsyncLLMClient, f"_init_{name}",
+            lambda self, name=name: llm_client_module.ProviderBackend(name, None, f"{name}-model"),
+        )
+
+    def _make(primary, secondary):
+        client = AsyncLLMClient()
+        client.coalesce = False
+        stubs = []
+        for backend, (replies, delay) in zip(client.backends, (primary, secondary)):
+            stub = _StubCompletions(replies, delay)
+            backend.client = SimpleNamespace(chat=SimpleNamespace(completions=stub))
+            stubs.append(stub)
+        return client, stubs
+
+    return _make
+
+
+class TestProviderFailover:
+    """Test failover and hedging across OpenAI and Groq"""
+
+    def test_both_providers_configured(self, two_providers):
+        """With both keys set, OpenAI is primary and Groq is kept as backup"""
+        client, _ = two_providers(([json.dumps({"ok": True})], 0), ([json.dumps({"ok": True})], 0))
+        assert [b.name for b in client.backends] == ["openai", "groq"]
+        assert client.provider == "openai"
+
+    def test_error_fails_over_without_waiting(self, two_providers, monkeypatch):
+        """A primary error is answered by the secondary in the same attempt"""
+        monkeypatch.setattr(AsyncLLMClient, "_retry_delay", lambda self, *a: pytest.fail("retried"))
+        client, (primary, secondary) = two_providers(
+            ([Exception("503 from openai")], 0), ([json.dumps({"from": "groq"})], 0)
+        )
+        assert asyncio.run(client.call_llm("p")) == {"from": "groq"}
+        assert (primary.calls, secondary.calls) == (1, 1)
+        assert client.backends[0].failures == 1
+
+    def test_failover_can_be_disabled(self, two_providers, monkeypatch):
+        """With failover off only the primary is used"""
+        monkeypatch.setattr(AsyncLLMClient, "_retry_delay", _no_wait_retry_delay())
+        client, (primary, secondary) = two_providers(
+            ([Exception("down")], 0), ([json.dumps({"ok": True})], 0)
+        )
+        client.failover = False
+        with pytest.raises(Exception):
+            asyncio.run(client.call_llm("p"))
+        assert secondary.calls == 0
+
+    def test_retries_counted_per_provider(self, two_providers, monkeypatch):
+        """A retry is labelled with the provider whose failure caused it"""
+        monkeypatch.setattr(AsyncLLMClient, "_retry_delay", _no_wait_retry_delay())
+        error = Exception("503 Service Unavailable")
+        kind = llm_client_module.classify_error(error)
+        before = {name: LLM_RETRIES.value(name, kind) for name in ("openai", "groq")}
+
+        client, _ = two_providers(([error, json.dumps({"ok": True})], 0), ([json.dumps({"ok": True})], 0))
+        client.failover = False
+        asyncio.run(client.call_llm("p"))
+        client, _ = two_providers(([error], 0), ([error, json.dumps({"ok": True})], 0))
+        asyncio.run(client.call_llm("p"))
+
+        assert LLM_RETRIES.value("openai", kind) == before["openai"] + 1
+        assert LLM_RETRIES.value("groq", kind) == before["groq"] + 1
+
+    def test_stream_fails_over_before_first_delta(self, two_providers):
+        """A stream that cannot start on the primary is served by the secondary"""
+        client, (primary, secondary) = two_providers(
+            ([Exception("503 from openai")], 0), ([json.dumps({"from": "groq"})], 0)
+        )
+        assert client.parse_content(_stream(client)) == {"from": "groq"}
+        assert (primary.calls, secondary.calls) == (1, 1)
+        assert client.backends[0].failures == 1
+        assert len(client.backends[1].latencies) == 1
+        assert LLM_IN_FLIGHT.value("openai") == LLM_IN_FLIGHT.value("groq") == 0
+
+    def test_stream_skips_open_circuit(self, two_providers):
+        """Streams are not sent to a provider whose breaker is open"""
+        client, (primary, secondary) = two_providers(
+            ([json.dumps({"from": "openai"})], 0), ([json.dumps({"from": "groq"})], 0)
+        )
+        for _ in range(client.backends[0].breaker.failure_threshold):
+            client.backends[0].breaker.record_failure()
+        assert client.parse_content(_stream(client)) == {"from": "groq"}
+        assert primary.calls == 0
+
+        for _ in range(client.backends[1].breaker.failure_threshold):
+            client.backends[1].breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            _stream(client)
+        assert secondary.calls == 1
+
+    def test_slow_primary_is_hedged(self, two_providers):
+        """Past the primary's p95 the secondary is asked and the first answer wins"""
+        client, (primary, secondary) = two_providers(
+            ([json.dumps({"from": "openai"})], 0.5), ([json.dumps({"from": "groq"})], 0)
+        )
+        client.hedge = True
+        for _ in range(20):
+            client.backends[0].record_success(0.02)
+
+        start = time.perf_counter()
+        assert asyncio.run(client.call_llm("p")) == {"from": "groq"}
+        assert time.perf_counter() - start < 0.45
+        assert client.provider_stats()["hedging"]["hedges_sent"] == 1
+        assert client.hedge_wins == 1
+
+    def test_no_hedging_before_enough_samples(self, two_providers):
+        """Without latency history the primary is simply awaited"""
+        client, (_, secondary) = two_providers(
+            ([json.dumps({"from": "openai"})], 0.05), ([json.dumps({"from": "groq"})], 0)
+        )
+        client.hedge = True
+        assert asyncio.run(client.call_llm("p")) == {"from": "openai"}
+        assert secondary.calls == 0
+
+    def test_latency_percentile(self):
+        """Percentiles come from the recent latency window"""
+        backend = llm_client_module.ProviderBackend("groq", None, "m", window=100)
+        for ms in range(1, 101):
+            backend.record_success(ms / 1000)
+        assert backend.latency_percentile(95) == pytest.approx(0.095)
+        assert backend.latency_percentile(50) == pytest.approx(0.050)
+
+
+class TestRateLimiter:
+    """Test the client-side request/token limiter"""
+
+    def test_waits_for_request_bucket(self):
+        """With the request bucket empty, the next call waits for refill"""
+        limiter = llm_client_module.RateLimiter(requests_per_minute=600)
+        limiter.requests.level = 0
+
+        async def run():
+            start = time.perf_counter()
+            async with limiter.slot(10):
+                return time.perf_counter() - start
+
+        assert 0.05 < asyncio.run(run()) < 0.5
+
+    def test_callers_admitted_in_arrival_order(self):
+        """Queued callers are served first come, first served"""
+        limiter = llm_client_module.RateLimiter(max_concurrency=1)
+        order = []
+
+        async def caller(i):
+            async with limiter.slot(1):
+                order.append(i)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            tasks = []
+            for i in range(5):
+                tasks.append(asyncio.ensure_future(caller(i)))
+                await asyncio.sleep(0)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_full_queue_sheds_load(self):
+        """Beyond max_queue waiting callers, new calls are rejected at once"""
+        limiter = llm_client_module.RateLimiter(max_concurrency=1, max_queue=1)
+
+        async def hold():
+            async with limiter.slot(1):
+                await asyncio.sleep(0.1)
+
+        async def run():
+            first = asyncio.ensure_future(hold())
+            await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(hold())
+            await asyncio.sleep(0.01)
+            with pytest.raises(llm_client_module.RateLimitExceeded, match="queue full"):
+                await limiter.acquire(1)
+            await asyncio.gather(first, second)
+
+        asyncio.run(run())
+        assert limiter.stats()["rejected"] == 1
+
+    def test_exhausted_token_quota_rejected_without_waiting(self):
+        """A call that could not be admitted within max_wait fails immediately"""
+        limiter = llm_client_module.RateLimiter(tokens_per_minute=600, max_wait_seconds=1)
+        limiter.tokens.level = -600  # a minute of debt from an underestimate
+
+        start = time.perf_counter()
+        with pytest.raises(llm_client_module.RateLimitExceeded):
+            asyncio.run(limiter.acquire(100))
+        assert time.perf_counter() - start < 0.5
+
+    def test_client_reports_unavailable_when_shed(self, async_client):
+        """A shed call surfaces as ProviderUnavailableError (HTTP 503)"""
+        client, stub = async_client([json.dumps({"ok": True})])
+        client.backends[0].limiter = llm_client_module.RateLimiter(
+            tokens_per_minute=100, max_wait_seconds=0.1
+        )
+        client.backends[0].limiter.tokens.level = 0
+        with pytest.raises(llm_client_module.ProviderUnavailableError):
+            asyncio.run(client.call_llm("p" * 400))
+        assert stub.calls == 0
+
+
+class _ChatCompletionHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the provider's chat completions endpoint"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        self.server.peers.append(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({
+            "id": "chatcmpl-local",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "local",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps({"ok": True})},
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_provider(monkeypatch):
+    """Run the stand-in server and point the Groq SDK at it with fresh pools"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatCompletionHandler)
+    server.peers = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+    monkeypatch.setenv("GROQ_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(llm_client_module, "_HTTP_CLIENTS", {})
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestConnectionPooling:
+    """Test that provider calls reuse pooled keep-alive connections"""
+
+    def test_sync_calls_reuse_one_connection(self, local_provider):
+        """Sequential calls from separate clients share one TCP connection"""
+        for _ in range(2):
+            client = LLMClient()
+            for _ in range(3):
+                assert client.call_llm("prompt") == {"ok": True}
+        assert len(local_provider.peers) == 6
+        assert len(set(local_provider.peers)) == 1
+
+    def test_async_calls_reuse_connections(self, local_provider):
+        """A burst reuses pooled connections on the next burst"""
+        client = AsyncLLMClient()
+        client.coalesce = False
+
+        async def run():
+            await asyncio.gather(*(client.call_llm(f"p{i}") for i in range(4)))
+            first_burst = set(local_provider.peers)
+            await asyncio.gather(*(client.call_llm(f"q{i}") for i in range(4)))
+            return first_burst
+
+        first_burst = asyncio.run(run())
+        assert len(local_provider.peers) == 8
+        assert set(local_provider.peers) == first_burst
+
+    def test_pool_limits_come_from_settings(self, monkeypatch):
+        """Pool size is configured through Settings"""
+        monkeypatch.setattr(llm_client_module, "_HTTP_CLIENTS", {})
+        monkeypatch.setattr(llm_client_module.settings, "http_max_connections", 7)
+        client = llm_client_module.get_http_client()
+        assert client is llm_client_module.get_http_client()
+        pool = client._transport._pool
+        assert pool._max_connections == 7
+
+
+def _no_wait_retry_delay():
+    """Keep the real give-up behaviour but skip the pauses"""
+    original = AsyncLLMClient._retry_delay
+
+    def _delay(self, attempt, error, content):
+        original(self, attempt, error, content)
+        return 0.0
+
+    return _delay
@@ -0,0 +1,129 @@
+"""
+Canonical Map Index Tests
+Run with: pytest tests/
+"""
+
+import json
+import random
+
+import pytest
+
+from ai.services import map_index, utils
+from ai.services.map_index import MapIndex, SourceIndex, build_index, load_index
+from ai.services.matcher import CompiledMatcher, VariantMatcher
+
+INGREDIENTS = {
+    "tomato": {"variations": ["tomatoes", "cherry tomato"], "category": "produce"},
+    "olive oil": {"variations": ["extra virgin olive oil", "evoo"], "category": "pantry"},
+}
+UNITS = [
+    {"canonical": "teaspoon", "variations": ["tsp", "t"], "dimension": "volume", "factor": 4.92892},
+    {"canonical": "clove", "variations": ["cloves", "clove"]},
+]
+
+
+@pytest.fixture
+def sources(tmp_path):
+    ing_path = tmp_path / "IngredientCanonicalMap.json"
+    units_path = tmp_path / "UnitNormalizationMap.json"
+    ing_path.write_text(json.dumps(INGREDIENTS))
+    units_path.write_text(json.dumps({"units": UNITS}))
+    return ing_path, units_path, tmp_path / "cache" / "maps.idx"
+
+
+class TestCompiledMatcher:
+    """Test the row-displaced table form of the variant automaton"""
+
+    def test_same_results_as_automaton(self):
+        matcher = VariantMatcher(list(utils._ING_VARIANTS))
+        compiled = CompiledMatcher.from_matcher(matcher)
+        rng = random.Random(3)
+        words = [v for v, _ in utils._ING_VARIANTS] + ["of", "2 cups", "fresh", "xyz", "é"]
+        for _ in range(3000):
+            line = " ".join(rng.choice(words) for _ in range(3))
+            line = line[rng.randrange(len(line)):]
+            assert compiled.find_best(line) == matcher.find_best(line)
+
+    def test_table_smaller_than_dense(self):
+        matcher = VariantMatcher(list(utils._ING_VARIANTS))
+        alphabet, table = matcher.compile()
+        states = table[0]
+        assert states == len(matcher._goto)
+        assert len(table) < states * (len(alphabet) + 2) // 2
+
+    def test_characters_outside_alphabet_reset(self):
+        compiled = CompiledMatcher.from_matcher(VariantMatcher([("abc", "x")]))
+        assert compiled.find_best("ab!abc") == ("abc", "x")
+        assert compiled.find_best("ab!c") is None
+
+
+class TestIndexFormat:
+    """Test building and reading the binary index"""
+
+    def test_round_trip(self):
+        index = MapIndex(build_index(INGREDIENTS, UNITS))
+        assert list(index.ing_variants) == [
+            ("extra virgin olive oil", "olive oil"), ("cherry tomato", "tomato"),
+            ("tomatoes", "tomato"), ("evoo", "olive oil"),
+        ]
+        assert index.unit_variants() == [("cloves", "clove"), ("clove", "clove"), ("tsp", "teaspoon"), ("t", "teaspoon")]
+        assert index.unit_conversions() == {"teaspoon": ("volume", 4.92892)}
+        assert index.categories() == {"tomato": "produce", "olive oil": "pantry"}
+        assert index.matcher().find_best("2 cherry tomatoes") == ("cherry tomato", "tomato")
+        assert index.canonical_ingredients["tomato"]["category"] == "produce"
+        assert index.unit_map[1]["canonical"] == "clove"
+
+    def test_other_format_version_rejected(self, monkeypatch):
+        data = build_index(INGREDIENTS, UNITS)
+        monkeypatch.setattr(map_index, "FORMAT_VERSION", map_index.FORMAT_VERSION + 1)
+        with pytest.raises(ValueError):
+            MapIndex(data)
+
+
+class TestLoadIndex:
+    """Test lazy build, reuse and automatic rebuild of the index file"""
+
+    def test_built_once_then_reused(self, sources):
+        ing_path, units_path, index_path = sources
+        first = load_index(ing_path, units_path, index_path)
+        assert index_path.exists()
+        built_at = index_path.stat().st_mtime_ns
+
+        second = load_index(ing_path, units_path, index_path)
+        assert index_path.stat().st_mtime_ns == built_at
+        assert second.source_hash == first.source_hash
+        assert second.categories() == {"tomato": "produce", "olive oil": "pantry"}
+
+    def test_rebuilt_when_source_changes(self, sources):
+        ing_path, units_path, index_path = sources
+        load_index(ing_path, units_path, index_path)
+        changed = dict(INGREDIENTS, basil={"variations": ["fresh basil"], "category": "herbs"})
+        ing_path.write_text(json.dumps(changed))
+
+        index = load_index(ing_path, units_path, index_path)
+        assert index.matcher().find_best("a fresh basil leaf") == ("fresh basil", "basil")
+        assert index.source_hash == map_index.source_hash(ing_path, units_path)
+
+    def test_corrupt_index_rebuilt(self, sources):
+        ing_path, units_path, index_path = sources
+        index_path.parent.mkdir(parents=True)
+        index_path.write_bytes(b"not an index")
+        index = load_index(ing_path, units_path, index_path)
+        assert len(index.ing_variants) == 4
+        assert MapIndex.open(index_path).source_hash == index.source_hash
+
+    def test_unwritable_dir_compiles_in_memory(self, sources):
+        ing_path, units_path, index_path = sources
+        index_path.parent.write_text("a file, not a directory")
+        index = load_index(ing_path, units_path, index_path)
+        assert isinstance(index, SourceIndex)
+        assert isinstance(index.matcher(), VariantMatcher)
+        assert index.matcher().find_best("2 cherry tomatoes") == ("cherry tomato", "tomato")
+        assert index.unit_conversions() == {"teaspoon": ("volume", 4.92892)}
+        assert index.source_hash == map_index.source_hash(ing_path, units_path)
+
+    def test_utils_uses_index(self):
+        """utils.py serves lookups straight from the mapped index"""
+        assert utils._ING_MATCHER is utils._MAP_INDEX.matcher()
+        assert utils.parse_ingredient("2 tsp cherry tomatoes")["unit"] == "teaspoon"
+        assert utils.aggregate_shopping_list([{"ingredients": ["2 tomatoes"]}])[0]["category"] == "produce"
@@ -0,0 +1,136 @@
+"""
+Batch Meal Suggestion Tests
+Run with: pytest tests/
+
+The LLM client is replaced by a local stub, so no API key is used.
+"""
+
+import asyncio
+
+import pytest
+
+from ai.app import main
+from ai.app.models import MealSuggestionRequest
+from ai.services.cache import build_response_cache
+
+
+def _recipe(title):
+    return {
+        "title": title,
+        "ingredients": ["1 cup rice", "2 tablespoons olive oil"],
+        "steps": ["Cook rice", "Serve"],
+        "prep_time": 5,
+        "cook_time": 15,
+    }
+
+
+@pytest.fixture
+def fake_llm(fake_llm, monkeypatch):
+    """Replace the LLM call; records prompts and tracks peak concurrency"""
+    state = {"prompts": [], "in_flight": 0, "peak": 0, "fail_on": None}
+
+    async def call_llm(prompt):
+        state["prompts"].append(prompt)
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        try:
+            await asyncio.sleep(0.02)
+            if state["fail_on"] and state["fail_on"] in prompt:
+                raise Exception("provider exploded")
+            if prompt.template == "batch_meal_suggestion":
+                count = prompt.count(" people, max ")
+                return {"recipes": [_recipe(f"Packed {i}") for i in range(count)]}
+            return _recipe("Single")
+        finally:
+            state["in_flight"] -= 1
+
+    monkeypatch.setattr(fake_llm, "call_llm", call_llm)
+    return state
+
+
+def _slots(n, meal_type="dinner"):
+    """n different slots (identical slots avoid each other's dishes, see TestRepeatedSlots)"""
+    return [{"meal_type": meal_type, "num_people": 2, "time_available": 30 + i} for i in range(n)]
+
+
+class TestMealSuggestionBatch:
+    """Test POST /ai/suggest-meals/batch"""
+
+    def test_one_result_per_slot_in_order(self, client, fake_llm):
+        """Every slot gets a recipe and results keep request order"""
+        response = client.post("/ai/suggest-meals/batch", json={"items": _slots(5)})
+        assert response.status_code == 200
+        data = response.json()
+        assert [r["index"] for r in data["results"]] == [0, 1, 2, 3, 4]
+        assert data["succeeded"] == 5 and data["failed"] == 0
+        assert all(r["recipe"]["title"] == "Single" for r in data["results"])
+
+    def test_concurrency_is_capped(self, client, fake_llm):
+        """No more than max_concurrency LLM calls run at once"""
+        response = client.post(
+            "/ai/suggest-meals/batch", json={"items": _slots(12), "max_concurrency": 3}
+        )
+        assert response.status_code == 200
+        assert fake_llm["peak"] <= 3
+        assert len(fake_llm["prompts"]) == 12
+
+    def test_slots_packed_into_fewer_prompts(self, client, fake_llm):
+        """slots_per_prompt packs several slots into each LLM call"""
+        response = client.post(
+            "/ai/suggest-meals/batch", json={"items": _slots(7), "slots_per_prompt": 3}
+        )
+        data = response.json()
+        assert data["succeeded"] == 7
+        assert len(fake_llm["prompts"]) == 3  # 3 + 3 + 1
+
+    def test_failed_slot_does_not_fail_batch(self, client, fake_llm):
+        """A failing slot reports an error while the others succeed"""
+        fake_llm["fail_on"] = "Suggest a lunch"
+        items = _slots(2) + _slots(1, meal_type="lunch")
+        response = client.post("/ai/suggest-meals/batch", json={"items": items})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["succeeded"] == 2 and data["failed"] == 1
+        assert data["results"][2]["recipe"] is None
+        assert "provider exploded" in data["results"][2]["error"]
+
+    def test_empty_batch_rejected(self, client, fake_llm):
+        """A batch must contain at least one slot"""
+        response = client.post("/ai/suggest-meals/batch", json={"items": []})
+        assert response.status_code == 422
+
+
+class TestRepeatedSlots:
+    """Test identical slots in one batch"""
+
+    def test_identical_slots_asked_for_together(self, client, fake_llm):
+        """A week of the same dinner is one packed prompt, not seven coalesced calls"""
+        items = [{"meal_type": "dinner", "num_people": 2, "time_available": 30}] * 7
+        response = client.post("/ai/suggest-meals/batch", json={"items": items, "slots_per_prompt": 7})
+        data = response.json()
+        assert data["succeeded"] == 7
+        assert len(fake_llm["prompts"]) == 1
+        assert fake_llm["prompts"][0].template == "batch_meal_suggestion"
+        assert len({r["recipe"]["title"] for r in data["results"]}) == 7
+
+    def test_one_slot_per_prompt_asked_in_turn(self, client, fake_llm):
+        """slots_per_prompt=1 asks for identical slots one at a time, each avoiding the last"""
+        items = [{"meal_type": "dinner", "num_people": 2, "time_available": 30}] * 3
+        response = client.post("/ai/suggest-meals/batch", json={"items": items, "slots_per_prompt": 1})
+        assert response.json()["succeeded"] == 3
+        prompts = fake_llm["prompts"]
+        assert [p.count(" people, max ") for p in prompts] == [1, 1, 1]
+        assert "Already planned" not in prompts[0]
+        assert "Already planned, suggest different dishes: Packed 0" in prompts[1]
+        assert fake_llm["peak"] == 1
+
+    def test_cached_slot_not_repeated(self, client, fake_llm, monkeypatch):
+        """Only the first identical slot is reused; the others avoid its dish"""
+        slot = {"meal_type": "dinner", "num_people": 2, "time_available": 30}
+        monkeypatch.setattr(main, "response_cache", build_response_cache("memory", 60, 10))
+        main.response_cache.set(main._meal_suggestion_cache_key(MealSuggestionRequest(**slot)), _recipe("Cached"))
+
+        response = client.post("/ai/suggest-meals/batch", json={"items": [slot] * 3, "slots_per_prompt": 7})
+        titles = [r["recipe"]["title"] for r in response.json()["results"]]
+        assert titles == ["Cached", "Packed 0", "Packed 1"]
+        assert "Already planned, suggest different dishes: Cached" in fake_llm["prompts"][0]
@@ -0,0 +1,139 @@
+"""
+Metrics Tests
+Run with: pytest tests/
+
+The LLM client is replaced by a local stub, so no API key is used.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ai.services import metrics
+from ai.services.llm_client import AsyncLLMClient
+from ai.services.retry import RetryPolicy
+
+
+def _sample(text, line_prefix):
+    """Value of the first exposition line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+class TestRegistry:
+    """Test metric types and the text exposition format"""
+
+    def test_counter_and_gauge_render(self):
+        registry = metrics.Registry()
+        calls = registry.register(metrics.Counter("t_calls_total", "Calls", ("provider",)))
+        in_flight = registry.register(metrics.Gauge("t_in_flight", "In flight"))
+        calls.inc("groq")
+        calls.inc("groq", amount=2)
+        in_flight.inc()
+        in_flight.inc()
+        in_flight.dec()
+
+        text = registry.render()
+        assert "# TYPE t_calls_total counter" in text
+        assert 't_calls_total{provider="groq"} 3' in text
+        assert "t_in_flight 1" in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        latency = registry.register(metrics.Histogram("t_seconds", "Latency", ("stage",), buckets=(0.1, 1.0)))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.observe(value, "llm_call")
+
+        text = registry.render()
+        assert 't_seconds_bucket{stage="llm_call",le="0.1"} 1' in text
+        assert 't_seconds_bucket{stage="llm_call",le="1"} 3' in text
+        assert 't_seconds_bucket{stage="llm_call",le="+Inf"} 4' in text
+        assert 't_seconds_count{stage="llm_call"} 4' in text
+        assert _sample(text, 't_seconds_sum{stage="llm_call"}') == pytest.approx(6.05)
+
+    def test_label_values_are_escaped(self):
+        registry = metrics.Registry()
+        errors = registry.register(metrics.Counter("t_errors_total", "Errors", ("detail",)))
+        errors.inc('say "hi"\n')
+        assert 't_errors_total{detail="say \\"hi\\"\\n"} 1' in registry.render()
+
+    def test_wrong_label_count_rejected(self):
+        with pytest.raises(ValueError):
+            metrics.Counter("t_bad_total", "Bad", ("provider",)).inc()
+
+
+class TestMetricsEndpoint:
+    """Test GET /metrics"""
+
+    @pytest.fixture
+    def fake_llm(self, fake_llm, monkeypatch):
+        async def call_llm(prompt):
+            return {
+                "title": "Soup",
+                "ingredients": ["1 cup rice"],
+                "steps": ["Boil"],
+                "prep_time": 5,
+                "cook_time": 10,
+            }
+
+        monkeypatch.setattr(fake_llm, "call_llm", call_llm)
+
+    def test_route_and_stage_latencies_exposed(self, client, fake_llm):
+        before = metrics.STAGE_SECONDS.count("validate")
+        response = client.post(
+            "/ai/suggest-meal", json={"meal_type": "dinner", "num_people": 2, "time_available": 30}
+        )
+        assert response.status_code == 200
+        assert metrics.STAGE_SECONDS.count("validate") == before + 1
+
+        scrape = client.get("/metrics")
+        assert scrape.status_code == 200
+        assert scrape.headers["content-type"].startswith("text/plain")
+        text = scrape.text
+        assert _sample(text, 'ai_http_request_duration_seconds_count{method="POST",route="/ai/suggest-meal",status="200"}') >= 1
+        for stage in ("prompt", "llm_call", "normalize", "validate"):
+            assert f'ai_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert "ai_http_requests_in_flight" in text
+        assert "ai_json_repaired_total" in text
+
+    def test_unknown_paths_share_one_label(self, client):
+        client.get("/no/such/path/123")
+        assert 'route="unmatched"' in client.get("/metrics").text
+        assert "/no/such/path/123" not in client.get("/metrics").text
+
+
+class TestLLMMetrics:
+    """Test provider attempt, retry and token counters"""
+
+    def test_attempts_retries_and_tokens_counted(self, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+        llm = AsyncLLMClient()
+        llm.coalesce = False
+        llm.retry_policy = RetryPolicy(base_delay=0.0, max_delay=0.0)
+        replies = [asyncio.TimeoutError(), '{"ok": true}']
+
+        async def create(**kwargs):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+                usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30, total_tokens=150),
+            )
+
+        llm.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        timeouts = metrics.LLM_ATTEMPTS.value("groq", "timeout")
+        successes = metrics.LLM_ATTEMPTS.value("groq", "success")
+        completion_tokens = metrics.LLM_TOKENS.value("groq", "completion")
+        retries = metrics.LLM_RETRIES.value("groq", "timeout")
+
+        assert asyncio.run(llm.call_llm("p")) == {"ok": True}
+        assert metrics.LLM_ATTEMPTS.value("groq", "timeout") == timeouts + 1
+        assert metrics.LLM_ATTEMPTS.value("groq", "success") == successes + 1
+        assert metrics.LLM_TOKENS.value("groq", "completion") == completion_tokens + 30
+        assert metrics.LLM_RETRIES.value("groq", "timeout") == retries + 1
+        assert metrics.LLM_IN_FLIGHT.value("groq") == 0
@@ -0,0 +1,94 @@
+"""
+Prompt Template Tests
+Run with: pytest tests/
+"""
+
+import asyncio
+
+import pytest
+
+from ai.app.prompts import (
+    MEAL_SUGGESTION,
+    TEMPLATES,
+    get_batch_meal_suggestion_prompt,
+    get_meal_suggestion_prompt,
+    get_recipe_extraction_prompt,
+    get_supportive_message_prompt,
+    prefix_stats,
+)
+from ai.services.llm_client import SYSTEM_PROMPT, AsyncLLMClient
+from ai.services.metrics import LLM_TOKENS
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr("ai.services.llm_client.settings.use_fake_llm", True)
+    client = AsyncLLMClient()
+    client.coalesce = False
+    return client
+
+
+class TestStaticPrefix:
+    """Test that variable request data stays out of the system message"""
+
+    def test_system_message_is_byte_identical_across_requests(self):
+        first = get_meal_suggestion_prompt("dinner", 2, 30, ["vegan"], "spicy")
+        second = get_meal_suggestion_prompt("breakfast", 6, 10)
+        assert first.system == second.system == MEAL_SUGGESTION.system
+        assert first.system.startswith(SYSTEM_PROMPT)
+        for value in ("dinner", "vegan", "spicy", "30"):
+            assert value not in first.system
+        assert "Servings: 2 people" in first and "vegan" in first
+
+    def test_rules_and_schema_live_in_the_prefix(self):
+        prompts = [
+            get_meal_suggestion_prompt("lunch", 4, 45),
+            get_batch_meal_suggestion_prompt([{"meal_type": "lunch", "num_people": 1, "time_available": 20}]),
+            get_recipe_extraction_prompt("Pancakes\n- 1 cup flour"),
+            get_supportive_message_prompt("first week back at work"),
+        ]
+        for prompt in prompts:
+            assert "Return ONLY" in prompt.system
+            assert "Return ONLY" not in prompt
+            assert len(prompt) < len(prompt.system)
+
+    def test_braces_in_user_text_are_kept(self):
+        prompt = get_recipe_extraction_prompt("Sauce {secret}\n- 1 cup {stock}")
+        assert prompt.endswith("Sauce {secret}\n- 1 cup {stock}")
+
+    def test_missing_field_rejected(self):
+        with pytest.raises(KeyError):
+            MEAL_SUGGESTION.render(meal_type="dinner")
+
+    def test_prefix_stats_cover_every_template(self):
+        stats = prefix_stats()
+        assert set(stats) == set(TEMPLATES)
+        for name, entry in stats.items():
+            assert entry["static_tokens"] == TEMPLATES[name].static_tokens > 50
+            assert len(entry["digest"]) == 16
+
+
+class TestClientLayout:
+    """Test how the LLM client sends template prompts"""
+
+    def test_messages_use_template_system(self, llm):
+        prompt = get_recipe_extraction_prompt("Toast\n- 1 slice bread")
+        system, user = llm._build_messages(prompt)
+        assert system == {"role": "system", "content": prompt.system}
+        assert user == {"role": "user", "content": "RECIPE TEXT:\nToast\n- 1 slice bread"}
+        assert llm._build_messages("plain")[0]["content"] == SYSTEM_PROMPT
+
+    def test_coalescing_key_includes_system(self, llm):
+        prompt = get_recipe_extraction_prompt("Toast")
+        assert llm._prompt_key(prompt) != llm._prompt_key(str(prompt))
+        assert llm._prompt_key(prompt) == llm._prompt_key(get_recipe_extraction_prompt("Toast"))
+
+    def test_repeated_prefix_reported_as_cached(self, llm):
+        before = LLM_TOKENS.value("fake", "cached_prompt")
+
+        async def run():
+            for people in (2, 3):
+                await llm.call_llm(get_meal_suggestion_prompt("dinner", people, 30))
+
+        asyncio.run(run())
+        assert LLM_TOKENS.value("fake", "cached_prompt") - before == MEAL_SUGGESTION.static_tokens
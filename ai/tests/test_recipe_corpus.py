@@ -0,0 +1,167 @@
+"""
+Recipe Corpus Tests
+Run with: pytest tests/
+
+LLM calls are served by the local fake provider, so no API key is used.
+"""
+
+import pytest
+
+from ai.app import main
+from ai.services.recipe_corpus import RecipeCorpus, normalize_tags
+from ai.services.utils import canonical_ingredient_ids
+
+
+PASTA = {
+    "title": "Tomato Pasta",
+    "ingredients": ["400 gram pasta", "4 tomato", "2 clove garlic", "Salt to taste"],
+    "steps": ["Boil the pasta", "Cook the tomatoes with the garlic", "Toss together"],
+    "prep_time": 5,
+    "cook_time": 15,
+}
+OMELETTE = {
+    "title": "Cheese Omelette",
+    "ingredients": ["3 egg", "50 gram cheese"],
+    "steps": ["Beat the eggs", "Cook with the cheese"],
+    "prep_time": 5,
+    "cook_time": 5,
+}
+REQUEST = {"meal_type": "dinner", "num_people": 2, "time_available": 30, "dietary_restrictions": ["vegetarian"]}
+
+
+@pytest.fixture
+def corpus():
+    return RecipeCorpus(":memory:")
+
+
+@pytest.fixture
+def fake_llm(fake_llm, monkeypatch):
+    """The fake provider behind a throwaway corpus"""
+    monkeypatch.setattr(main, "recipe_corpus", RecipeCorpus(":memory:"))
+    return fake_llm
+
+
+class TestIndex:
+    """Test what a stored recipe matches"""
+
+    def test_ingredient_ids_from_lines_and_preferences(self):
+        assert canonical_ingredient_ids("400 gram pasta\n4 tomatoes\n2 garlic cloves") == ["pasta", "tomato", "garlic"]
+        assert canonical_ingredient_ids("Italian, family-friendly") == []
+
+    def test_tags_normalized(self):
+        assert normalize_tags(["Gluten Free", "gluten-free", " Vegan ", ""]) == ["gluten-free", "vegan"]
+
+    def test_match_on_meal_type_time_and_tags(self, corpus):
+        corpus.add(PASTA, "Dinner", 2, 30, ["Vegetarian"])
+        assert corpus.find("dinner", 2, 20, ["vegetarian"])["title"] == "Tomato Pasta"
+        assert corpus.find("dinner", 2, 45, ["Vegetarian"])["title"] == "Tomato Pasta"
+        assert corpus.find("lunch", 2, 30, ["vegetarian"]) is None
+        assert corpus.find("dinner", 2, 15, ["vegetarian"]) is None
+
+    def test_tags_must_match_exactly(self, corpus):
+        corpus.add(PASTA, "dinner", 2, 30, ["vegetarian"])
+        assert corpus.find("dinner", 2, 30) is None
+        assert corpus.find("dinner", 2, 30, ["vegan"]) is None
+        assert corpus.find("dinner", 2, 30, ["vegetarian", "gluten-free"]) is None
+
+    def test_same_recipe_under_other_tags_kept_apart(self, corpus):
+        assert corpus.add(PASTA, "dinner", 2, 30, ["vegan"])
+        assert corpus.add(PASTA, "dinner", 2, 30, ["gluten-free"])
+        assert not corpus.add(PASTA, "dinner", 2, 30, ["Vegan"])
+        assert len(corpus) == 2
+        assert corpus.find("dinner", 2, 30, ["vegan", "gluten-free"]) is None
+        assert corpus.find("dinner", 2, 30, ["gluten-free"]) is not None
+
+    def test_preferences_must_name_known_ingredients(self, corpus):
+        corpus.add(PASTA, "dinner", 2, 30)
+        assert corpus.find("dinner", 2, 30, preferences="something with tomatoes")["title"] == "Tomato Pasta"
+        assert corpus.find("dinner", 2, 30, preferences="something with chicken") is None
+        assert corpus.find("dinner", 2, 30, preferences="Italian, family-friendly") is None
+
+    @pytest.mark.parametrize("preferences", [
+        "no chicken please",
+        "allergic to milk",
+        "without tomatoes",
+        "pasta, but avoid garlic",
+        "dairy-free pasta",
+        "my kids don't eat tomatoes",
+    ])
+    def test_exclusions_are_a_miss(self, corpus, preferences):
+        corpus.add(PASTA, "dinner", 2, 30)
+        corpus.add(dict(OMELETTE, ingredients=["3 egg", "100 ml milk"]), "dinner", 2, 30)
+        assert corpus.find("dinner", 2, 30, preferences=preferences) is None
+        assert corpus.stats()["hits"] == 0
+
+    def test_missing_times_use_requested_time(self, corpus):
+        corpus.add(dict(PASTA, prep_time=None, cook_time=None), "dinner", 2, 45)
+        assert corpus.find("dinner", 2, 30) is None
+        assert corpus.find("dinner", 2, 45) is not None
+
+
+class TestRetrieval:
+    """Test scaling, rotation, eviction and persistence"""
+
+    def test_quantities_scaled_to_servings(self, corpus):
+        corpus.add(PASTA, "dinner", 2, 30)
+        recipe = corpus.find("dinner", 4, 30)
+        assert recipe["ingredients"] == ["800 gram pasta", "8 tomato", "4 clove garlic", "Salt to taste"]
+
+    def test_same_servings_preferred(self, corpus):
+        corpus.add(PASTA, "breakfast", 4, 30)
+        corpus.add(OMELETTE, "breakfast", 2, 30)
+        assert corpus.find("breakfast", 2, 30)["title"] == "Cheese Omelette"
+
+    def test_repeated_requests_rotate(self, corpus):
+        corpus.add(PASTA, "dinner", 2, 30)
+        corpus.add(dict(PASTA, title="Garlic Pasta"), "dinner", 2, 30)
+        titles = [corpus.find("dinner", 2, 30)["title"] for _ in range(3)]
+        assert titles[0] != titles[1] and titles[0] == titles[2]
+
+    def test_least_recently_served_evicted(self):
+        corpus = RecipeCorpus(":memory:", max_entries=2)
+        corpus.add(PASTA, "dinner", 2, 30)
+        corpus.add(OMELETTE, "breakfast", 2, 30)
+        corpus.find("dinner", 2, 30)
+        corpus.add(dict(OMELETTE, title="Plain Omelette"), "breakfast", 2, 30)
+        assert corpus.find("dinner", 2, 30)["title"] == "Tomato Pasta"
+        assert corpus.find("breakfast", 2, 30)["title"] == "Plain Omelette"
+        assert corpus.stats()["evictions"] == 1
+
+    def test_survives_restart(self, tmp_path):
+        path = (tmp_path / "recipes.sqlite3").as_posix()
+        RecipeCorpus(path).add(PASTA, "dinner", 2, 30, ["vegetarian"])
+        assert RecipeCorpus(path).find("dinner", 2, 30, ["vegetarian"])["title"] == "Tomato Pasta"
+
+
+class TestRoute:
+    """Test the corpus in front of /ai/suggest-meal"""
+
+    def test_second_request_served_from_corpus(self, client, fake_llm):
+        first = client.post("/ai/suggest-meal", json=REQUEST)
+        assert first.status_code == 200
+        assert fake_llm.client.stats()["calls"] == 1
+        assert len(main.recipe_corpus) == 1
+
+        second = client.post("/ai/suggest-meal", json=dict(REQUEST, num_people=4))
+        assert second.status_code == 200
+        assert second.json()["title"] == first.json()["title"]
+        assert fake_llm.client.stats()["calls"] == 1
+        assert main.recipe_corpus.stats()["hits"] == 1
+
+    def test_allergy_wording_goes_to_llm(self, client, fake_llm):
+        main.recipe_corpus.add(dict(PASTA, ingredients=["400 gram pasta", "200 ml milk"]), "dinner", 2, 30, ["vegetarian"])
+        response = client.post("/ai/suggest-meal", json=dict(REQUEST, preferences="pasta, allergic to milk"))
+        assert response.status_code == 200
+        assert fake_llm.client.stats()["calls"] == 1
+
+    def test_variety_always_generates(self, client, fake_llm):
+        client.post("/ai/suggest-meal", json=REQUEST)
+        response = client.post("/ai/suggest-meal", json=dict(REQUEST, variety=True))
+        assert response.status_code == 200
+        assert fake_llm.client.stats()["calls"] == 2
+
+    def test_batch_slots_served_from_corpus(self, client, fake_llm):
+        client.post("/ai/suggest-meal", json=REQUEST)
+        response = client.post("/ai/suggest-meals/batch", json={"items": [REQUEST, dict(REQUEST, meal_type="lunch")]})
+        assert response.json()["succeeded"] == 2
+        assert fake_llm.client.stats()["calls"] == 2
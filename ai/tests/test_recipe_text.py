@@ -0,0 +1,165 @@
+"""
+Recipe Text Reducer Tests
+Run with: pytest tests/
+
+LLM calls are served by the local fake provider, so no API key is used.
+"""
+
+import pytest
+
+from ai.app import main
+from ai.services import recipe_text
+from ai.services.metrics import TEXT_REDUCER_OUTCOMES
+from ai.services.recipe_text import classify_line, heading_kind, reduce_recipe_text
+
+
+BLOG_PAGE = """\
+Skip to content
+Home » Recipes » Dinner
+The Best Weeknight Chicken Curry
+Jump to Recipe
+Print Recipe
+Table of Contents
+Ingredients
+Instructions
+FAQ
+When I was a kid my grandmother used to make this curry every Sunday, and the whole house smelled of spices for hours afterwards.
+It took me years to get it right, and honestly I burned the onions more times than I would like to admit before I figured out the trick.
+Advertisement
+This version is quick enough for a Tuesday night and uses things you probably already have in the pantry, which is the whole point.
+My kids love it with rice, my husband prefers naan, and I could eat it straight from the pot with a spoon while standing at the stove.
+Why you will love this recipe
+It is ready in thirty minutes, it freezes well, and it is easy to double for a crowd or for meal prep on the weekend.
+Weeknight Chicken Curry
+A creamy, mild curry the whole family will love.
+Prep Time: 10 minutes
+Cook Time: 20 minutes
+Servings: 4
+Ingredients
+2 tablespoons olive oil
+1 onion, diced
+3 cloves garlic, minced
+500g chicken breast, cubed
+2 tablespoons curry powder
+400ml coconut milk
+1 cup rice
+Salt to taste
+Instructions
+1. Heat the oil in a large pan over medium heat.
+2. Add the onion and cook until soft, about 5 minutes.
+3. Add the garlic and curry powder and stir for 1 minute.
+4. Add the chicken and brown on all sides.
+5. Pour in the coconut milk, simmer for 15 minutes and season with salt.
+6. Serve with rice.
+Notes
+You can swap the chicken for chickpeas to make it vegetarian. Leftovers keep for 3 days in the fridge.
+Nutrition
+Calories: 520kcal | Protein: 35g | Fat: 28g
+Did you make this recipe? Tag us on Instagram!
+Comments
+Sarah says: This was delicious, my whole family loved it and I will be making it again next week for sure!
+Reply
+Tom says: I added some spinach at the end and it was great. Thanks for sharing such an easy recipe with us.
+"""
+
+STORY = (
+    "We spent the summer at the lake and every evening someone cooked something different for the whole group.\n"
+    * 12
+)
+
+
+class TestClassifier:
+    """Test the heading and line heuristics"""
+
+    @pytest.mark.parametrize("line, kind", [
+        ("Ingredients", "ingredients"),
+        ("## What You'll Need:", "ingredients"),
+        ("Directions", "steps"),
+        ("Instructions (serves 4)", "steps"),
+        ("Nutrition Facts", "noise"),
+        ("Leave a Reply", "noise"),
+        ("Ingredients are the heart of every good dish", None),
+    ])
+    def test_headings(self, line, kind):
+        assert heading_kind(line)[0] == kind
+
+    def test_inline_heading(self):
+        assert heading_kind("Ingredients: 2 eggs, 1 cup flour") == ("ingredients", "2 eggs, 1 cup flour")
+
+    @pytest.mark.parametrize("line, kind", [
+        ("2 tablespoons olive oil", "ingredient"),
+        ("- 500g chicken breast, cubed", "ingredient"),
+        ("½ cup sugar", "ingredient"),
+        ("Salt to taste", "ingredient"),
+        ("3. Add the garlic and stir.", "step"),
+        ("Preheat the oven to 180C.", "step"),
+        ("Prep Time: 10 minutes", "meta"),
+        ("Servings: 4", "meta"),
+        ("It took me years to get it right, and honestly I burned the onions more times than I like.", "prose"),
+        ("Weeknight dinners", "short"),
+    ])
+    def test_lines(self, line, kind):
+        assert classify_line(line) == kind
+
+
+class TestReduce:
+    """Test reduction and the full-text fallback"""
+
+    def test_blog_page_reduced_to_recipe(self):
+        result = reduce_recipe_text(BLOG_PAGE)
+        assert result.reduced and result.reason == "reduced"
+        assert result.confidence == 1.0
+        assert result.reduction > 0.5
+        assert result.title == "Weeknight Chicken Curry"
+        assert result.meta == ["Prep Time: 10 minutes", "Cook Time: 20 minutes", "Servings: 4"]
+        assert result.ingredients[0] == "2 tablespoons olive oil" and result.ingredients[-1] == "Salt to taste"
+        assert len(result.ingredients) == 8
+        assert result.steps[-1] == "Serve with rice."
+        assert len(result.steps) == 6
+        for dropped in ("grandmother", "Advertisement", "Sarah says", "Calories", "chickpeas"):
+            assert dropped not in result.text
+        assert "- 400ml coconut milk" in result.text and "2. Add the onion" in result.text
+
+    def test_largest_ingredient_section_wins_over_table_of_contents(self):
+        result = reduce_recipe_text(BLOG_PAGE)
+        assert "Instructions" not in result.ingredients
+
+    def test_low_confidence_keeps_full_text(self):
+        text = STORY + "Mix everything you have and hope for the best."
+        result = reduce_recipe_text(text)
+        assert not result.reduced and result.reason == "low_confidence"
+        assert result.text == text and result.reduction == 0.0
+
+    def test_short_text_kept(self):
+        text = "Pancakes\n- 1 cup flour\n- 2 eggs\n1. Whisk\n2. Fry"
+        result = reduce_recipe_text(text)
+        assert result.reason == "short" and result.text == text
+        assert result.ingredients == ["1 cup flour", "2 eggs"] and result.steps == ["Whisk", "Fry"]
+
+    def test_clean_recipe_not_rewritten(self, monkeypatch):
+        monkeypatch.setattr(recipe_text.settings, "text_reducer_min_chars", 0)
+        text = "Toast\nIngredients\n- 2 slices bread\n- 1 tbsp butter\n- 1 pinch salt\nSteps\n1. Toast\n2. Butter"
+        result = reduce_recipe_text(text)
+        assert result.reason == "no_gain" and result.text == text
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(recipe_text.settings, "enable_text_reducer", False)
+        result = reduce_recipe_text(BLOG_PAGE)
+        assert result.reason == "disabled" and result.text == BLOG_PAGE
+
+
+class TestRoute:
+    """Test the reducer in front of /ai/extract-recipe"""
+
+    def test_prompt_built_from_reduced_text(self, client, fake_llm, monkeypatch):
+        monkeypatch.setattr(main.settings, "enable_rule_extractor", False)
+        prompts = []
+        original = main.get_recipe_extraction_prompt
+        monkeypatch.setattr(main, "get_recipe_extraction_prompt", lambda text: prompts.append(text) or original(text))
+        before = TEXT_REDUCER_OUTCOMES.value("reduced")
+
+        response = client.post("/ai/extract-recipe", json={"recipe_text": BLOG_PAGE})
+        assert response.status_code == 200
+        assert response.json()["ingredients"]
+        assert prompts[0] == reduce_recipe_text(BLOG_PAGE).text
+        assert TEXT_REDUCER_OUTCOMES.value("reduced") == before + 1
@@ -0,0 +1,181 @@
+"""
+Retry Policy Tests
+Run with: pytest tests/
+
+Provider errors are imitated with small exception classes carrying the
+same status_code / response attributes as the OpenAI and Groq SDK errors.
+"""
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from ai.app import main
+from ai.services import llm_client as llm_client_module
+from ai.services.llm_client import AsyncLLMClient
+from ai.services.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+    retry_after_seconds,
+)
+
+
+class APIStatusError(Exception):
+    """Shaped like the SDKs' APIStatusError"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = httpx.Response(status_code, headers=headers or {})
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class TestClassifyError:
+    """Test sorting failures into retryable and fatal kinds"""
+
+    @pytest.mark.parametrize("error, kind", [
+        (APIStatusError(429), "rate_limit"),
+        (APIStatusError(503), "server"),
+        (APIStatusError(401), "auth"),
+        (APIStatusError(400), "bad_request"),
+        (APITimeoutError("slow"), "timeout"),
+        (asyncio.TimeoutError(), "timeout"),
+        (httpx.ConnectError("refused"), "connection"),
+        (json.JSONDecodeError("bad", "x", 0), "invalid_json"),
+        (RuntimeError("?"), "unknown"),
+    ])
+    def test_kinds(self, error, kind):
+        assert classify_error(error) == kind
+
+    def test_retry_after_header(self):
+        """Retry-After in seconds and retry-after-ms are both read"""
+        assert retry_after_seconds(APIStatusError(429, {"retry-after": "3"})) == 3.0
+        assert retry_after_seconds(APIStatusError(429, {"retry-after-ms": "250"})) == 0.25
+        assert retry_after_seconds(APIStatusError(500)) is None
+
+
+class TestRetryPolicy:
+    """Test backoff with jitter"""
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Delays stay within [0, min(max, base * 2^n)] and vary"""
+        policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+        delays = [policy.delay(attempt) for attempt in (0, 1, 5) for _ in range(50)]
+        assert all(0.0 <= d <= 0.5 for d in delays[:50])
+        assert all(0.0 <= d <= 2.0 for d in delays[100:])
+        assert len(set(delays[:50])) > 1
+
+    def test_retry_after_is_a_floor(self):
+        """The provider's hint is respected, or retrying is abandoned if too long"""
+        policy = RetryPolicy(base_delay=0.01, max_delay=5.0)
+        assert policy.delay(0, APIStatusError(429, {"retry-after": "1"})) >= 1.0
+        assert policy.delay(0, APIStatusError(429, {"retry-after": "60"})) is None
+
+
+class TestRetryBudget:
+    """Test the process-wide retry budget"""
+
+    def test_retries_limited_to_ratio_of_requests(self):
+        budget = RetryBudget(ratio=0.1, min_per_second=0.0, window_seconds=60)
+        for _ in range(20):
+            budget.record_request()
+        granted = sum(budget.try_acquire() for _ in range(10))
+        assert granted == 2
+        assert budget.stats()["rejected"] == 8
+
+
+class TestCircuitBreaker:
+    """Test breaker state transitions"""
+
+    def test_opens_after_threshold_then_probes(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+        time.sleep(0.06)
+        assert breaker.allow()  # one probe
+        assert breaker.state == "half_open"
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.stats()["opened"] == 2
+
+
+def _stub_client(monkeypatch, replies):
+    """AsyncLLMClient on Groq whose provider answers with the given replies in order"""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+    monkeypatch.setattr(llm_client_module, "RETRY_BUDGET", RetryBudget())
+    client = AsyncLLMClient()
+    client.retry_policy = RetryPolicy(base_delay=0.0, max_delay=0.0)
+    calls = []
+
+    async def create(**kwargs):
+        reply = replies[min(len(calls), len(replies) - 1)]
+        calls.append(kwargs)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return client, calls
+
+
+class TestClientRetries:
+    """Test the retry policy as applied by the LLM client"""
+
+    def test_auth_error_is_not_retried(self, monkeypatch):
+        client, calls = _stub_client(monkeypatch, [APIStatusError(401)])
+        with pytest.raises(Exception, match="auth errors are not retried"):
+            asyncio.run(client.call_llm("p"))
+        assert len(calls) == 1
+
+    def test_server_error_is_retried(self, monkeypatch):
+        client, calls = _stub_client(monkeypatch, [APIStatusError(502), json.dumps({"ok": True})])
+        assert asyncio.run(client.call_llm("p")) == {"ok": True}
+        assert len(calls) == 2
+
+    def test_open_circuit_fails_fast(self, monkeypatch):
+        """Once the breaker opens, calls fail without reaching the provider"""
+        monkeypatch.setattr(llm_client_module.settings, "circuit_failure_threshold", 2)
+        client, calls = _stub_client(monkeypatch, [APIStatusError(503)])
+        client.max_retries = 5
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(client.call_llm("p"))
+        assert len(calls) == 2
+        assert client.provider_stats()["backends"][0]["circuit"]["state"] == "open"
+
+
+class TestUnavailableResponse:
+    """Test how the API reports an unavailable provider"""
+
+    def test_open_circuit_returns_503(self, client, monkeypatch):
+        async def call_llm(prompt):
+            raise CircuitOpenError("groq circuit breaker is open", retry_after=12.4)
+
+        monkeypatch.setattr(main.llm_client, "call_llm", call_llm)
+        monkeypatch.setattr(main, "response_cache", None)
+        response = client.post("/ai/generate-message", json={})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "12"
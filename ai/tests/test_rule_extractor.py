@@ -0,0 +1,102 @@
+"""
+Rule-Based Extraction Tests
+Run with: pytest tests/
+
+LLM calls are served by the local fake provider, so no API key is used.
+"""
+
+import pytest
+
+from ai.app.models import RecipeDraft, RecipeExtractionRequest
+from ai.services import rule_extractor
+from ai.services.metrics import RULE_EXTRACTOR_OUTCOMES
+from ai.services.recipe_text import reduce_recipe_text
+from ai.services.rule_extractor import extract_with_rules, parse_minutes
+from ai.services.utils import parse_ingredient
+
+
+CARBONARA = RecipeExtractionRequest.model_config["json_schema_extra"]["example"]["recipe_text"]
+UNSTRUCTURED = (
+    "My mom's soup: you fry an onion in butter until it smells good, throw in whatever vegetables "
+    "are around and some stock, and let it bubble away for a while before blending it smooth."
+)
+
+
+def _extract(text):
+    return extract_with_rules(reduce_recipe_text(text))
+
+
+class TestExtract:
+    """Test the local parser and its confidence"""
+
+    def test_structured_recipe_accepted(self):
+        result = _extract(CARBONARA)
+        assert result.accepted and result.reason == "accepted"
+        assert result.confidence >= 0.9
+        recipe = RecipeDraft(**result.draft)
+        assert recipe.title == "Spaghetti Carbonara"
+        assert len(recipe.ingredients) == 6 and len(recipe.steps) == 8
+        assert recipe.ingredients[0] == "400 gram pasta"
+        assert recipe.steps[-1] == "Season with salt and pepper, serve immediately"
+
+    def test_times_read_from_meta_lines(self):
+        text = "Toast\nPrep Time: 5 mins\nCook time: 1 hour 10 minutes\nIngredients\n- 2 slices bread\n- 1 tbsp butter\nMethod\n1. Toast the bread\n2. Spread the butter"
+        draft = _extract(text).draft
+        assert (draft["prep_time"], draft["cook_time"]) == (5, 70)
+
+    @pytest.mark.parametrize("line, minutes", [
+        ("Prep time: 15 minutes", 15),
+        ("Cook Time: 1 hr 30 mins", 90),
+        ("Bake time: 1.5 hours", 90),
+        ("Prep time: 5", 5),
+        ("Cook time: overnight", None),
+    ])
+    def test_parse_minutes(self, line, minutes):
+        assert parse_minutes(line) == minutes
+
+    def test_inline_ingredient_list(self):
+        result = _extract("Banana Bread\nIngredients: 3 bananas, 2 cups flour, 1 egg\nMethod\nMash the bananas, mix in the rest and bake.")
+        assert result.accepted
+        assert result.draft["ingredients"] == ["3 banana", "2 cup flour", "1 egg"]
+
+    def test_unstructured_text_goes_to_llm(self):
+        result = _extract(UNSTRUCTURED)
+        assert not result.accepted and result.reason == "incomplete"
+        assert {"ingredients", "steps"} <= set(result.missing)
+
+    def test_missing_title_goes_to_llm(self):
+        result = _extract("Ingredients\n- 2 eggs\n- 1 tbsp butter\nSteps\n1. Beat the eggs\n2. Cook in butter")
+        assert result.reason == "incomplete" and result.missing == ["title"]
+
+    def test_threshold_from_settings(self, monkeypatch):
+        monkeypatch.setattr(rule_extractor.settings, "rule_extractor_min_confidence", 1.0)
+        result = _extract("Pancakes\nIngredients\n- 1 cup flour\n- 2 eggs\nSteps\n1. Whisk\n2. Fry")
+        assert result.reason == "low_confidence" and result.confidence < 1.0
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(rule_extractor.settings, "enable_rule_extractor", False)
+        assert _extract(CARBONARA).reason == "disabled"
+
+    def test_glued_metric_quantities_parse(self):
+        assert dict(parse_ingredient("200g bacon")) == {"raw": "200g bacon", "quantity": 200.0, "unit": "gram", "name": "bacon"}
+        assert parse_ingredient("2nd egg")["quantity"] is None
+
+
+class TestRoute:
+    """Test which path serves /ai/extract-recipe"""
+
+    def test_structured_text_served_without_llm(self, client, fake_llm):
+        before = RULE_EXTRACTOR_OUTCOMES.value("accepted")
+        response = client.post("/ai/extract-recipe", json={"recipe_text": CARBONARA})
+        assert response.status_code == 200
+        assert response.headers["X-Extraction-Path"] == "rules"
+        assert response.json()["title"] == "Spaghetti Carbonara"
+        assert fake_llm.client.stats()["calls"] == 0
+        assert RULE_EXTRACTOR_OUTCOMES.value("accepted") == before + 1
+
+    def test_low_confidence_falls_back_to_llm(self, client, fake_llm):
+        text = "Pancakes\n- 1 cup flour\n- 2 eggs\n1. Whisk\n2. Fry"
+        response = client.post("/ai/extract-recipe", json={"recipe_text": text})
+        assert response.status_code == 200
+        assert response.headers["X-Extraction-Path"] == "llm"
+        assert fake_llm.client.stats()["calls"] == 1
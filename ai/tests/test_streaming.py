@@ -0,0 +1,112 @@
+"""
+Streaming Recipe Tests
+Run with: pytest tests/
+
+The LLM stream is replaced by a local stub, so no API key is used.
+"""
+
+import json
+
+import pytest
+
+from ai.app import main
+from ai.services.streaming import RecipeStreamParser
+
+
+RECIPE = {
+    "title": 'Mum\'s "Quick" Stir-Fry',
+    "ingredients": ["2 chicken breasts", "1 cup rice", "2 tbsp soy sauce"],
+    "steps": ["Cut chicken, then fry", "Serve over rice"],
+    "prep_time": 10,
+    "cook_time": 15,
+}
+
+
+def _feed_in_chunks(text, size):
+    parser = RecipeStreamParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+class TestRecipeStreamParser:
+    """Test the incremental recipe JSON scanner"""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 1000])
+    def test_events_independent_of_chunking(self, size):
+        """The same events come out however the text is split"""
+        text = json.dumps(RECIPE, indent=2)
+        parser, events = _feed_in_chunks(text, size)
+        assert events == [
+            ("title", RECIPE["title"]),
+            ("ingredient", "2 chicken breasts"),
+            ("ingredient", "1 cup rice"),
+            ("ingredient", "2 tbsp soy sauce"),
+            ("step", "Cut chicken, then fry"),
+            ("step", "Serve over rice"),
+        ]
+        assert json.loads(parser.text) == RECIPE
+
+    def test_events_emitted_before_completion_ends(self):
+        """The title is reported while the rest is still streaming"""
+        parser = RecipeStreamParser()
+        assert parser.feed('{"title": "Soup", "ingredients": ["1 cup ') == [("title", "Soup")]
+        assert parser.feed('stock", "salt"') == [("ingredient", "1 cup stock"), ("ingredient", "salt")]
+
+    def test_ignores_preamble_and_other_keys(self):
+        """Text before the object and unrelated keys produce no events"""
+        text = '```json\n{"notes": ["skip me"], "meta": {"title": "nested"}, "steps": ["Boil"]}\n```'
+        _, events = _feed_in_chunks(text, 4)
+        assert events == [("step", "Boil")]
+
+
+class TestSuggestMealStream:
+    """Test POST /ai/suggest-meal/stream"""
+
+    @pytest.fixture
+    def fake_stream(self, monkeypatch):
+        async def stream_llm(prompt):
+            text = json.dumps(RECIPE)
+            for i in range(0, len(text), 5):
+                yield text[i:i + 5]
+
+        monkeypatch.setattr(main.llm_client, "stream_llm", stream_llm)
+        monkeypatch.setattr(main, "response_cache", None)
+
+    def _events(self, response):
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            lines = dict(line.split(": ", 1) for line in block.splitlines())
+            events.append((lines["event"], json.loads(lines["data"])))
+        return events
+
+    def test_streams_parts_then_final_recipe(self, client, fake_stream):
+        """Title, ingredients and steps arrive as events, then the validated recipe"""
+        response = client.post(
+            "/ai/suggest-meal/stream",
+            json={"meal_type": "dinner", "num_people": 2, "time_available": 30},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self._events(response)
+        kinds = [kind for kind, _ in events]
+        assert kinds == ["title", "ingredient", "ingredient", "ingredient", "step", "step", "recipe"]
+        assert events[0][1] == {"title": RECIPE["title"]}
+        assert events[3][1] == {"index": 2, "text": "2 tablespoon soy sauce"}
+        assert events[-1][1]["ingredients"][2] == "2 tablespoon soy sauce"
+
+    def test_invalid_output_reports_error_event(self, client, monkeypatch):
+        """A completion that is not valid JSON ends with an error event"""
+        async def stream_llm(prompt):
+            yield '{"title": "Broken", "ingredients": ['
+
+        monkeypatch.setattr(main.llm_client, "stream_llm", stream_llm)
+        monkeypatch.setattr(main, "response_cache", None)
+        response = client.post(
+            "/ai/suggest-meal/stream",
+            json={"meal_type": "dinner", "num_people": 2, "time_available": 30},
+        )
+        events = self._events(response)
+        assert events[0] == ("title", {"title": "Broken"})
+        assert events[-1][0] == "error"
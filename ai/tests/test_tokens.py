@@ -0,0 +1,163 @@
+"""
+Token Accounting Tests
+Run with: pytest tests/
+
+LLM calls are served by the local fake provider, so no API key is used.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from ai.app.config import MAX_RECIPE_TEXT_LENGTH
+from ai.app.prompts import (
+    get_batch_meal_suggestion_prompt,
+    get_meal_suggestion_prompt,
+    get_recipe_extraction_prompt,
+)
+from ai.services import llm_client, tokens, tracing
+from ai.services.llm_client import SYSTEM_PROMPT, AsyncLLMClient
+from ai.services.metrics import REQUEST_LLM_TOKENS
+from ai.services.tokens import TokenBudget, TokenBudgetExceeded, estimate_tokens, plan_tokens
+
+
+RECIPE_TEXT = "Pancakes\nPrep time: 5\n- 1 cup flour\n- 2 eggs\n- 250ml milk\n1. Whisk\n2. Fry"
+
+
+def _plan(prompt):
+    return plan_tokens(prompt, getattr(prompt, "system", SYSTEM_PROMPT))
+
+
+class TestEstimate:
+    """Test the local token estimate"""
+
+    def test_common_words_are_single_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("Hello world") == 2
+        assert estimate_tokens("2 cups of rice") == 4
+
+    def test_long_numbers_split_in_digit_groups(self):
+        assert estimate_tokens("1234567") == 3
+
+    def test_close_to_four_characters_per_token_on_prose(self):
+        text = get_recipe_extraction_prompt(RECIPE_TEXT).system
+        assert len(text) / 5 < estimate_tokens(text) < len(text) / 3
+
+    def test_static_prefix_precounted(self):
+        prompt = get_meal_suggestion_prompt("dinner", 2, 30)
+        assert prompt.static_tokens == estimate_tokens(prompt.system)
+
+
+class TestPlan:
+    """Test budgets and max_tokens per template"""
+
+    def test_meal_suggestion_gets_fixed_completion(self):
+        plan = _plan(get_meal_suggestion_prompt("dinner", 2, 30))
+        assert plan.template == "meal_suggestion"
+        assert plan.max_tokens == tokens.TOKEN_BUDGETS["meal_suggestion"].max_completion_tokens
+        assert plan.prompt_tokens > estimate_tokens(SYSTEM_PROMPT)
+
+    def test_batch_completion_scales_with_slots(self):
+        slot = {"meal_type": "lunch", "num_people": 2, "time_available": 30}
+        two = _plan(get_batch_meal_suggestion_prompt([slot] * 2)).max_tokens
+        five = _plan(get_batch_meal_suggestion_prompt([slot] * 5)).max_tokens
+        assert five - two == 3 * tokens.TOKEN_BUDGETS["batch_meal_suggestion"].completion_per_item
+
+    def test_extraction_completion_scales_with_input(self):
+        short = _plan(get_recipe_extraction_prompt(RECIPE_TEXT)).max_tokens
+        longer = _plan(get_recipe_extraction_prompt(RECIPE_TEXT * 5)).max_tokens
+        assert short < longer <= tokens.TOKEN_BUDGETS["recipe_extraction"].max_completion_tokens
+
+    def test_longest_accepted_extraction_fits(self):
+        """Dense text at MAX_RECIPE_TEXT_LENGTH is within the extraction budget"""
+        line = "- 1 1/2 tbsp (22ml) extra-virgin olive oil, divided; 3/4 cup (180g) Parmigiano-Reggiano, grated\n"
+        text = (line * (MAX_RECIPE_TEXT_LENGTH // len(line) + 1))[:MAX_RECIPE_TEXT_LENGTH]
+        assert _plan(get_recipe_extraction_prompt(text)).max_tokens > 0
+
+    def test_over_budget_refused(self, monkeypatch):
+        monkeypatch.setitem(tokens.TOKEN_BUDGETS, "recipe_extraction", TokenBudget(500, 400))
+        with pytest.raises(TokenBudgetExceeded) as info:
+            _plan(get_recipe_extraction_prompt("1 cup flour\n" * 200))
+        assert info.value.limit == 500 and info.value.prompt_tokens > 500
+
+    def test_completion_clamped_to_context_window(self, monkeypatch):
+        prompt = get_meal_suggestion_prompt("dinner", 2, 30)
+        monkeypatch.setattr(tokens.settings, "llm_context_tokens", _plan(prompt).prompt_tokens + 1000)
+        assert _plan(get_meal_suggestion_prompt("dinner", 2, 30)).max_tokens == 900
+        monkeypatch.setattr(tokens.settings, "llm_context_tokens", _plan(prompt).prompt_tokens + 500)
+        with pytest.raises(TokenBudgetExceeded):
+            _plan(get_meal_suggestion_prompt("dinner", 2, 30))
+
+    def test_plain_prompts_and_disabled_budgets_have_no_max_tokens(self, monkeypatch):
+        assert _plan("Return {} as JSON").max_tokens is None
+        monkeypatch.setattr(tokens.settings, "enable_token_budgets", False)
+        assert _plan(get_meal_suggestion_prompt("dinner", 2, 30)).max_tokens is None
+
+    def test_max_tokens_sent_to_provider(self, fake_llm):
+        prompt = get_recipe_extraction_prompt(RECIPE_TEXT)
+        kwargs = fake_llm._completion_kwargs(prompt)
+        assert kwargs["max_tokens"] == _plan(prompt).max_tokens
+
+
+    def test_plain_prompt_counted_once_per_call(self, monkeypatch):
+        """Retries and usage recording reuse the call's plan instead of recounting the prompt"""
+        calls = []
+        monkeypatch.setattr(llm_client, "plan_tokens", lambda *a: calls.append(a) or plan_tokens(*a))
+        monkeypatch.setattr(AsyncLLMClient, "_retry_delay", lambda self, *a: 0.0)
+        monkeypatch.setattr(llm_client.settings, "use_fake_llm", True)
+        llm = AsyncLLMClient()
+        replies = iter([Exception("503"), None])
+        create = llm.client.chat.completions.create
+
+        async def flaky(**kwargs):
+            error = next(replies)
+            if error is not None:
+                raise error
+            return await create(**kwargs)
+
+        llm.backends[0].client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=flaky)))
+        asyncio.run(llm.call_llm('Return {"ok": true} as JSON'))
+        assert len(calls) == 1
+
+
+class TestRoutes:
+    """Test budgets and usage recording through the API"""
+
+    def test_oversized_extraction_refused_without_provider_call(self, client, fake_llm, monkeypatch):
+        monkeypatch.setitem(tokens.TOKEN_BUDGETS, "recipe_extraction", TokenBudget(500, 400))
+        response = client.post("/ai/extract-recipe", json={"recipe_text": "- 1 cup flour\n" * 200})
+        assert response.status_code == 413
+        assert "too large" in response.json()["detail"]
+        assert fake_llm.client.stats()["calls"] == 0
+
+    def test_text_over_max_length_rejected(self, client, fake_llm):
+        """Text longer than MAX_RECIPE_TEXT_LENGTH fails validation instead of the token budget"""
+        response = client.post("/ai/extract-recipe", json={"recipe_text": "x" * (MAX_RECIPE_TEXT_LENGTH + 1)})
+        assert response.status_code == 422
+        assert fake_llm.client.stats()["calls"] == 0
+
+    def test_oversized_stream_refused_before_events(self, client, fake_llm, monkeypatch):
+        monkeypatch.setitem(tokens.TOKEN_BUDGETS, "meal_suggestion", TokenBudget(100, 900))
+        response = client.post(
+            "/ai/suggest-meal/stream", json={"meal_type": "dinner", "num_people": 2, "time_available": 30}
+        )
+        assert response.status_code == 413
+
+    def test_usage_recorded_per_request(self, client, fake_llm, monkeypatch, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        monkeypatch.setattr(tracing.settings, "tracing_exporter", "jsonl")
+        monkeypatch.setattr(tracing.settings, "trace_jsonl_path", path.as_posix())
+        before = REQUEST_LLM_TOKENS.count("/ai/extract-recipe", "completion")
+
+        response = client.post("/ai/extract-recipe", json={"recipe_text": RECIPE_TEXT})
+        assert response.status_code == 200
+        tracing.EXPORTER.flush()
+
+        spans = {s["name"]: s for s in json.loads(path.read_text().splitlines()[-1])["spans"]}
+        root, attempt = spans["http.request"]["attributes"], spans["llm.attempt"]["attributes"]
+        assert root["llm.prompt_tokens"] == attempt["llm.prompt_tokens"] > 0
+        assert root["llm.completion_tokens"] == attempt["llm.completion_tokens"] > 0
+        assert root["llm.estimated_prompt_tokens"] == _plan(get_recipe_extraction_prompt(RECIPE_TEXT)).prompt_tokens
+        assert REQUEST_LLM_TOKENS.count("/ai/extract-recipe", "completion") == before + 1
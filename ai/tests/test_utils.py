@@ -0,0 +1,170 @@
+"""
+Ingredient Utility Tests
+Run with: pytest tests/
+"""
+
+import random
+import re
+
+import pytest
+
+from ai.services import utils
+from ai.services.matcher import VariantMatcher
+
+
+def _linear_scan_normalize(text: str) -> str:
+    """Reference implementation: the original linear scan over _ING_VARIANTS"""
+    if not text:
+        return text
+    t = text.lower()
+    for variant, canonical in utils._ING_VARIANTS:
+        if variant in t:
+            pattern = re.compile(re.escape(variant), flags=re.IGNORECASE)
+            new = pattern.sub(canonical, text, count=1)
+            return re.sub(r"\s+", " ", new).strip()
+    return text.strip()
+
+
+class TestVariantMatcher:
+    """Test the Aho-Corasick variant matcher"""
+
+    def test_longest_variant_wins(self):
+        """Among overlapping variants the earliest (longest) pattern wins"""
+        matcher = VariantMatcher([("vine tomato", "tomato"), ("tomatoes", "tomato"), ("tom", "x")])
+        assert matcher.find_best("2 vine tomatoes") == ("vine tomato", "tomato")
+        assert matcher.find_best("3 tomatoes") == ("tomatoes", "tomato")
+        assert matcher.find_best("a tomb") == ("tom", "x")
+        assert matcher.find_best("rice") is None
+
+    def test_match_through_failure_links(self):
+        """Patterns that are suffixes of a partial match are still found"""
+        matcher = VariantMatcher([("abcd", "long"), ("bc", "short")])
+        assert matcher.find_best("xabcx") == ("bc", "short")
+
+
+class TestNormalizeIngredientName:
+    """Test canonical ingredient name normalization"""
+
+    def test_canonical_map_is_loaded(self):
+        """The bundled IngredientCanonicalMap.json is picked up"""
+        assert "tomato" in utils.CANONICAL_INGREDIENTS
+        assert len(utils._ING_MATCHER) == len(utils._ING_VARIANTS)
+
+    def test_known_variants(self):
+        """Common variants map to their canonical name"""
+        assert utils.normalize_ingredient_name("Baby Spinach") == "spinach"
+        assert utils.normalize_ingredient_name("rice") == "rice"
+        assert utils.normalize_ingredient_name("  unknown thing  ") == "unknown thing"
+
+    def test_matches_linear_scan(self):
+        """The automaton gives exactly the same output as the old linear scan"""
+        rng = random.Random(42)
+        variants = [v for v, _ in utils._ING_VARIANTS]
+        fillers = ["", "fresh", "2 cups", "chopped", "of", "large", "Organic", "to taste"]
+        lines = []
+        for _ in range(2000):
+            parts = [rng.choice(fillers), rng.choice(variants), rng.choice(fillers)]
+            if rng.random() < 0.3:
+                parts.insert(1, rng.choice(variants).upper())
+            lines.append("  ".join(parts))
+        for line in lines:
+            assert utils.normalize_ingredient_name(line) == _linear_scan_normalize(line)
+
+
+class TestUnitDetection:
+    """Test the precompiled unit alternation"""
+
+    def test_leading_unit(self):
+        """A unit right after the quantity is detected and stripped"""
+        parsed = utils.parse_ingredient("2 Tbsp olive oil")
+        assert parsed["quantity"] == 2.0
+        assert parsed["unit"] == "tablespoon"
+
+    def test_longest_variant_first(self):
+        """Longer variants win over their prefixes ("tablespoons" over "t")"""
+        assert utils.normalize_unit_in_text("2 tablespoons sugar") == "2 tablespoon sugar"
+        assert utils.normalize_unit_in_text("1 cups flour") == "1 cup flour"
+
+    def test_units_match_whole_words_only(self):
+        """Letters inside words are not mistaken for units"""
+        for line in ("2 tomatoes", "3 eggs", "salt to taste"):
+            assert utils.parse_ingredient(line)["unit"] is None
+            assert utils.normalize_unit_in_text(line) == line
+
+    def test_embedded_unit_fallback(self):
+        """A unit later in the line is still found and removed from the name"""
+        parsed = utils.parse_ingredient("fresh tsp basil")
+        assert parsed["unit"] == "teaspoon"
+        assert parsed["name"] == "basil"
+
+
+class TestBatchParsing:
+    """Test column-oriented batch parsing and aggregation"""
+
+    def test_columns_and_deduplication(self):
+        """Repeated lines share ids; unknowns are NaN / -1"""
+        cols = utils.parse_ingredients_batch(["1 cup rice", "salt to taste", "1 cup rice", ""])
+        assert len(cols) == 4
+        assert cols.quantity[0] == 1.0 and cols.quantity[2] == 1.0
+        assert cols.quantity[1] != cols.quantity[1]  # NaN
+        assert cols.units[cols.unit_id[0]] == "cup"
+        assert cols.unit_id[1] == -1
+        assert cols.canonical_id[0] == cols.canonical_id[2]
+        assert cols.names[cols.canonical_id[0]] == "rice"
+
+    def test_shopping_list_from_recipes(self):
+        """Recipes are normalized in place and aggregated"""
+        recipes = [
+            {"ingredients": ["1 tbsp olive oil", "1 cup rice"]},
+            {"ingredients": ["2 tablespoons olive oil", "1 cup rice"]},
+        ]
+        shopping = utils.shopping_list_from_recipes(recipes)
+        assert recipes[0]["ingredients"] == ["1 tablespoon oil", "1 cup rice"]
+        rows = {(r["name"], r["unit"]): r["total_qty"] for r in shopping}
+        assert rows[("oil", "tablespoon")] == 3.0
+        assert rows[("rice", "cup")] == 2.0
+
+
+class TestUnitConversionAggregation:
+    """Test unit-conversion-aware shopping list aggregation"""
+
+    def _rows(self, *lines):
+        shopping = utils.aggregate_shopping_list([{"ingredients": list(lines)}])
+        return {r["name"]: r for r in shopping}
+
+    def test_compatible_volume_units_merge(self):
+        """Tablespoons and teaspoons of the same ingredient become one row"""
+        rows = self._rows("1 tablespoon olive oil", "3 teaspoon olive oil")
+        assert len(rows) == 1
+        assert rows["oil"]["unit"] == "tablespoon"
+        assert rows["oil"]["total_qty"] == pytest.approx(2.0)
+
+    def test_mass_units_merge_into_largest_unit(self):
+        """Grams and kilograms merge and are shown in the larger unit"""
+        rows = self._rows("500 g rice", "1 kg rice")
+        assert rows["rice"]["unit"] == "kilogram"
+        assert rows["rice"]["total_qty"] == pytest.approx(1.5)
+
+    def test_different_dimensions_stay_separate(self):
+        """Volume and mass amounts of the same ingredient are not mixed"""
+        shopping = utils.aggregate_shopping_list([{"ingredients": ["1 cup rice", "200 g rice"]}])
+        assert sorted(r["unit"] for r in shopping) == ["cup", "gram"]
+
+    def test_unquantified_lines_do_not_wipe_total(self):
+        """Lines without a quantity are counted separately"""
+        rows = self._rows("2 tomatoes", "3 tomatoes", "tomatoes")
+        assert rows["tomato"]["total_qty"] == 5.0
+        assert rows["tomato"]["unquantified_count"] == 1
+
+    def test_zero_quantities_keep_a_numeric_total(self):
+        """A quantified total of 0 is reported as 0, not as unknown"""
+        shopping = utils.aggregate_shopping_list([{"ingredients": ["0 cup sugar", "0 cup sugar"]}])
+        assert [(r["total_qty"], r["unit"]) for r in shopping] == [(0.0, "cup")]
+
+    def test_units_without_dimension_only_merge_with_themselves(self):
+        """Cans and cloves are summed per unit, never converted"""
+        shopping = utils.aggregate_shopping_list(
+            [{"ingredients": ["1 can chickpeas", "2 cans chickpeas", "1 clove chickpeas"]}]
+        )
+        totals = {r["unit"]: r["total_qty"] for r in shopping}
+        assert totals == {"can": 3.0, "clove": 1.0}
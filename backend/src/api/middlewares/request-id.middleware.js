@@ -0,0 +1,18 @@
+import { AsyncLocalStorage } from "node:async_hooks";
+import { randomUUID } from "node:crypto";
+
+// Holds the current request's ID for code that has no access to `req`
+// (e.g. services calling the AI orchestrator through aiClient).
+const requestContext = new AsyncLocalStorage();
+
+export function getRequestId() {
+  return requestContext.getStore()?.requestId;
+}
+
+export function requestIdMiddleware(req, res, next) {
+  const incoming = req.get("X-Request-ID");
+  const requestId = incoming && /^[A-Za-z0-9._:-]{1,128}$/.test(incoming) ? incoming : randomUUID();
+  req.requestId = requestId;
+  res.set("X-Request-ID", requestId);
+  requestContext.run({ requestId }, next);
+}
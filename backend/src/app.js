@@ -5,9 +5,11 @@ import recipesRouter from "./api/routes/recipes.routes.js";
 import shoppingListRoutes from "./api/routes/shopping-list.routes.js";
 //import todayRoutes from "./api/routes/today.routes.js";
 import { errorMiddleware } from "./api/middlewares/error.middleware.js";
+import { requestIdMiddleware } from "./api/middlewares/request-id.middleware.js";
 
 const app = express();
 
+app.use(requestIdMiddleware);
 app.use(express.json());
 
 app.use("/plans", plansRouter);
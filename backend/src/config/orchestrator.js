@@ -1,5 +1,7 @@
 import axios from "axios";
+import { randomUUID } from "node:crypto";
 import { getEnv } from "./env.js";
+import { getRequestId } from "../api/middlewares/request-id.middleware.js";
 
 const env = getEnv();
 
@@ -9,3 +11,9 @@ export const aiClient = axios.create({
   baseURL: env.AI_URL,
   timeout: 20000,
 });
+
+// Propagate the incoming request's ID so AI traces line up with backend logs
+aiClient.interceptors.request.use((config) => {
+  config.headers["X-Request-ID"] = getRequestId() || randomUUID();
+  return config;
+});